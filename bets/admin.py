@@ -1,7 +1,30 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from django.db.models import Sum, Count, Avg
+from django.db.models import Count, Avg, DecimalField, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from .analytics import bet_summary
 from .models import Sport, Competition, Team, Bookmaker, BetType, Bet
+from .settlement import settle_bets
+
+
+def bet_subquery(field, aggregate, output_field=None):
+    """
+    Correlated subquery aggregating the bets whose `field` points at the outer row.
+    Only evaluated for the rows of the current page and, unlike a JOIN + GROUP BY,
+    several of them can be combined without multiplying rows.
+    """
+    bets = (
+        Bet.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(value=aggregate)
+        .values('value')
+    )
+    return Subquery(bets, output_field=output_field)
+
+
+def bet_count_subquery(field):
+    return Coalesce(bet_subquery(field, Count('pk'), IntegerField()), 0)
 
 
 @admin.register(Sport)
@@ -11,9 +34,13 @@ class SportAdmin(admin.ModelAdmin):
     search_fields = ['name', 'code']
     ordering = ['name']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_total_bets=bet_count_subquery('sport'))
+
     def total_bets(self, obj):
-        return obj.bets.count()
+        return obj._total_bets
     total_bets.short_description = 'Total Bets'
+    total_bets.admin_order_field = '_total_bets'
 
 
 @admin.register(Competition)
@@ -64,9 +91,13 @@ class CompetitionAdmin(admin.ModelAdmin):
     competition_type_display.short_description = 'Type'
     competition_type_display.admin_order_field = 'competition_type'
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_total_bets=bet_count_subquery('competition'))
+
     def total_bets(self, obj):
-        return obj.bets.count()
+        return obj._total_bets
     total_bets.short_description = 'Total Bets'
+    total_bets.admin_order_field = '_total_bets'
 
 
 @admin.register(Team)
@@ -76,9 +107,15 @@ class TeamAdmin(admin.ModelAdmin):
     search_fields = ['name', 'short_name', 'country']
     ordering = ['sport__name', 'name']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            _total_bets=bet_count_subquery('home_team') + bet_count_subquery('away_team')
+        )
+
     def total_bets(self, obj):
-        return obj.home_bets.count() + obj.away_bets.count()
+        return obj._total_bets
     total_bets.short_description = 'Total Bets'
+    total_bets.admin_order_field = '_total_bets'
 
 
 @admin.register(Bookmaker)
@@ -88,14 +125,24 @@ class BookmakerAdmin(admin.ModelAdmin):
     search_fields = ['name', 'website']
     ordering = ['name']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            _total_bets=bet_count_subquery('bookmaker'),
+            _avg_odds=bet_subquery(
+                'bookmaker', Avg('bookmaker_odds'), DecimalField(max_digits=6, decimal_places=2)
+            ),
+        )
+
     def total_bets(self, obj):
-        return obj.bets.count()
+        return obj._total_bets
     total_bets.short_description = 'Total Bets'
+    total_bets.admin_order_field = '_total_bets'
 
     def avg_odds(self, obj):
-        avg = obj.bets.aggregate(Avg('bookmaker_odds'))['bookmaker_odds__avg']
+        avg = obj._avg_odds
         return f"{avg:.2f}" if avg else "0.00"
     avg_odds.short_description = 'Avg Odds'
+    avg_odds.admin_order_field = '_avg_odds'
 
 
 @admin.register(BetType)
@@ -127,28 +174,89 @@ class BetTypeAdmin(admin.ModelAdmin):
     category_display.short_description = 'Category'
     category_display.admin_order_field = 'category'
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_total_bets=bet_count_subquery('bet_type'))
+
     def total_bets(self, obj):
-        return obj.bets.count()
+        return obj._total_bets
     total_bets.short_description = 'Total Bets'
+    total_bets.admin_order_field = '_total_bets'
+
+
+class CompetitionListFilter(admin.RelatedFieldListFilter):
+    """Competition filter whose choices load the sport (used by __str__) in the same query"""
+
+    def field_choices(self, field, request, model_admin):
+        ordering = self.field_admin_ordering(field, request, model_admin)
+        competitions = Competition.objects.select_related('sport')
+        if ordering:
+            competitions = competitions.order_by(*ordering)
+        return [(competition.pk, str(competition)) for competition in competitions]
+
+
+class ExpectedValueFilter(admin.SimpleListFilter):
+    """Filter bets by the sign of their stored Expected Value"""
+    title = 'Expected Value'
+    parameter_name = 'ev'
+
+    def lookups(self, request, model_admin):
+        return [
+            ('positive', 'Positive EV'),
+            ('neutral', 'Neutral EV'),
+            ('negative', 'Negative EV'),
+        ]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'positive':
+            return queryset.filter(expected_value__gt=0)
+        if self.value() == 'neutral':
+            return queryset.filter(expected_value=0)
+        if self.value() == 'negative':
+            return queryset.filter(expected_value__lt=0)
+        return queryset
+
+
+class ImpliedProbabilityFilter(admin.SimpleListFilter):
+    """Filter bets by ranges of the stored implied probability"""
+    title = 'Implied Probability'
+    parameter_name = 'implied'
+
+    RANGES = {
+        '0-25': (0, 25),
+        '25-50': (25, 50),
+        '50-75': (50, 75),
+        '75-100': (75, 101),
+    }
+
+    def lookups(self, request, model_admin):
+        return [(key, f'{key}%') for key in self.RANGES]
+
+    def queryset(self, request, queryset):
+        if self.value() in self.RANGES:
+            low, high = self.RANGES[self.value()]
+            return queryset.filter(implied_probability__gte=low, implied_probability__lt=high)
+        return queryset
 
 
 @admin.register(Bet)
 class BetAdmin(admin.ModelAdmin):
     list_display = [
         'bet_summary', 'sport', 'competition_info', 'stake_display', 
-        'odds_display', 'outcome_display', 'profit_loss_display', 
-        'roi_display', 'date'
+        'odds_display', 'expected_value_display', 'outcome_display',
+        'profit_loss_display', 'roi_display', 'date'
     ]
     list_filter = [
-        'outcome', 'sport', 'competition', 'bookmaker', 
+        'outcome', 'sport', ('competition', CompetitionListFilter), 'bookmaker', 
         'confidence_level', 'date', 'bet_type__category',
-        'competition__division', 'competition__competition_type'
+        'competition__division', 'competition__competition_type',
+        ExpectedValueFilter, ImpliedProbabilityFilter,
     ]
     search_fields = [
         'home_team__name', 'away_team__name', 'bet_type__name', 
         'bet_description', 'notes'
     ]
     ordering = ['-date', '-created_at']
+    list_select_related = ['sport', 'competition', 'home_team', 'away_team', 'bet_type']
     
     fieldsets = (
         ('Match Information', {
@@ -256,53 +364,42 @@ class BetAdmin(admin.ModelAdmin):
             roi
         )
     roi_display.short_description = 'ROI'
+    roi_display.admin_order_field = 'roi'
 
     # Read-only calculated fields for admin
     def implied_probability_display(self, obj):
         return f"{obj.implied_probability}%"
     implied_probability_display.short_description = 'Implied Probability'
+    implied_probability_display.admin_order_field = 'implied_probability'
 
     def expected_value_display(self, obj):
         ev = obj.expected_value
         color = 'green' if ev > 0 else 'red' if ev < 0 else 'black'
         return format_html('<span style="color: {};">€{}</span>', color, ev)
     expected_value_display.short_description = 'Expected Value'
+    expected_value_display.admin_order_field = 'expected_value'
 
     def bookmaker_edge_display(self, obj):
         edge = obj.bookmaker_edge
         return f"{edge}%"
     bookmaker_edge_display.short_description = 'Bookmaker Edge'
+    bookmaker_edge_display.admin_order_field = 'bookmaker_edge'
 
     # Custom actions
     actions = ['mark_as_won', 'mark_as_lost', 'mark_as_void']
 
     def mark_as_won(self, request, queryset):
-        updated = 0
-        for bet in queryset:
-            if bet.outcome == 'pending':
-                bet.outcome = 'win'
-                bet.save()
-                updated += 1
+        updated = settle_bets(queryset, 'win')
         self.message_user(request, f'{updated} bets marked as won.')
     mark_as_won.short_description = "Mark selected bets as won"
 
     def mark_as_lost(self, request, queryset):
-        updated = 0
-        for bet in queryset:
-            if bet.outcome == 'pending':
-                bet.outcome = 'loss'
-                bet.save()
-                updated += 1
+        updated = settle_bets(queryset, 'loss')
         self.message_user(request, f'{updated} bets marked as lost.')
     mark_as_lost.short_description = "Mark selected bets as lost"
 
     def mark_as_void(self, request, queryset):
-        updated = 0
-        for bet in queryset:
-            if bet.outcome == 'pending':
-                bet.outcome = 'void'
-                bet.save()
-                updated += 1
+        updated = settle_bets(queryset, 'void')
         self.message_user(request, f'{updated} bets marked as void.')
     mark_as_void.short_description = "Mark selected bets as void"
 
@@ -315,20 +412,8 @@ class BetAdmin(admin.ModelAdmin):
         except (AttributeError, KeyError):
             return response
 
-        metrics = {
-            'total_bets': qs.count(),
-            'total_staked': qs.aggregate(Sum('stake'))['stake__sum'] or 0,
-            'total_profit_loss': qs.exclude(outcome='pending').aggregate(
-                Sum('profit_loss'))['profit_loss__sum'] or 0,
-            'avg_odds': qs.aggregate(Avg('bookmaker_odds'))['bookmaker_odds__avg'] or 0,
-            'win_rate': 0,
-        }
-
-        # Calculate win rate
-        completed_bets = qs.exclude(outcome='pending')
-        if completed_bets.count() > 0:
-            wins = completed_bets.filter(outcome='win').count()
-            metrics['win_rate'] = round((wins / completed_bets.count()) * 100, 2)
+        # One conditional aggregate (sampled on very large PostgreSQL result sets)
+        metrics = bet_summary(qs)
 
         response.context_data['summary'] = metrics
         return response
@@ -342,7 +427,9 @@ class BetAdmin(admin.ModelAdmin):
             base_readonly.extend([
                 'implied_probability_display', 
                 'expected_value_display', 
-                'bookmaker_edge_display'
+                'bookmaker_edge_display',
+                'closing_odds',
+                'clv',
             ])
         
         return base_readonly
@@ -352,13 +439,13 @@ class BetAdmin(admin.ModelAdmin):
         base_fieldsets = [
             ('Match Information', {
                 'fields': (
-                    'date', 'sport', 'competition', 
+                    'date', 'kickoff', 'sport', 'competition', 
                     ('home_team', 'away_team'), 'neutral_ground'
                 )
             }),
             ('Bet Details', {
                 'fields': (
-                    'bet_type', 'bet_description', 
+                    'bet_type', 'selection', 'bet_description', 
                     'estimated_probability', 'confidence_level'
                 )
             }),
@@ -379,7 +466,10 @@ class BetAdmin(admin.ModelAdmin):
         # Only show analytics for existing objects
         if obj:
             analytics_fieldset = ('Analytics (Read-only)', {
-                'fields': ('implied_probability_display', 'expected_value_display', 'bookmaker_edge_display'),
+                'fields': (
+                    'implied_probability_display', 'expected_value_display', 'bookmaker_edge_display',
+                    'closing_odds', 'clv',
+                ),
                 'classes': ('collapse',),
                 'description': 'These values are automatically calculated'
             })
@@ -0,0 +1,676 @@
+# bets/analytics.py
+"""
+Aggregation queries backing the dashboard and the chart-data endpoints.
+
+Every metric is computed in the database with grouped, conditional
+aggregates over BetDailyRollup, so the number of queries stays constant and
+the rows scanned grow with days x segments rather than with bets.
+
+bets.columnar provides the same functions computed with NumPy over an
+in-memory snapshot of the Bet table; get_backend() returns the one selected
+by settings.BETS_ANALYTICS_BACKEND.
+"""
+from datetime import timedelta
+from decimal import Decimal
+import json
+import math
+import sys
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.models import (
+    Avg, Case, Count, ExpressionWrapper, F, FloatField, Q, Sum, Value, Variance, When, Window,
+)
+from django.db.models.functions import Cast, Floor, Greatest, Least, Ln, Round, TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import SETTLED_OUTCOMES, Bet, BetDailyRollup, BetType
+
+
+COMPLETED = Q(outcome__in=SETTLED_OUTCOMES)
+PENDING = Q(outcome='pending')
+WON = Q(outcome='win')
+
+
+def _percentage(part, total):
+    """Return part/total as a percentage rounded to 2 decimals (0 when total is 0)"""
+    if not total:
+        return 0
+    return round((float(part or 0) / float(total)) * 100, 2)
+
+
+def headline_metrics(now=None):
+    """
+    Headline dashboard metrics and the trend windows (the last 30 days, and the 30 days before).
+
+    The windows start at now - 30/60 days. Whole days inside them come from the rollups; the
+    bets of the two days the window starts fall on are split at the exact time with a second,
+    index-range query over Bet.
+    """
+    now = now or timezone.now()
+    thirty_days_ago = now - timedelta(days=30)
+    sixty_days_ago = now - timedelta(days=60)
+    recent_day = timezone.localdate(thirty_days_ago)
+    previous_day = timezone.localdate(sixty_days_ago)
+    recent = Q(day__gt=recent_day)
+    previous = Q(day__gt=previous_day, day__lt=recent_day)
+
+    totals = BetDailyRollup.objects.aggregate(
+        total_bets=Sum('bet_count'),
+        total_staked=Sum('stake_sum'),
+        total_profit_loss=Sum('profit_loss_sum', filter=COMPLETED),
+        completed_bets=Sum('bet_count', filter=COMPLETED),
+        wins=Sum('bet_count', filter=WON),
+        pending_bets=Sum('bet_count', filter=PENDING),
+        pending_stake=Sum('stake_sum', filter=PENDING),
+        odds_sum=Sum('odds_sum'),
+        expected_value_sum=Sum('expected_value_sum'),
+        recent_profit_loss=Sum('profit_loss_sum', filter=recent & COMPLETED),
+        recent_staked=Sum('stake_sum', filter=recent),
+        previous_profit_loss=Sum('profit_loss_sum', filter=previous & COMPLETED),
+    )
+
+    recent_bets = Q(date__gte=thirty_days_ago)
+    previous_bets = Q(date__gte=sixty_days_ago, date__lt=thirty_days_ago)
+    boundary = Bet.objects.filter(BetDailyRollup.days_filter({recent_day, previous_day})).aggregate(
+        recent_profit_loss=Sum('profit_loss', filter=recent_bets & COMPLETED),
+        recent_staked=Sum('stake', filter=recent_bets),
+        previous_profit_loss=Sum('profit_loss', filter=previous_bets & COMPLETED),
+    )
+    for field, value in boundary.items():
+        if value is not None:
+            totals[field] = (totals[field] or Decimal('0')) + value
+    return _finalise_headline(totals)
+
+
+def _finalise_headline(totals):
+    """Turn raw aggregate totals into the values rendered by the dashboard"""
+    total_staked = totals['total_staked'] or Decimal('0')
+    total_profit_loss = totals['total_profit_loss'] or Decimal('0')
+    recent_profit_loss = totals['recent_profit_loss'] or Decimal('0')
+    previous_profit_loss = totals['previous_profit_loss'] or Decimal('0')
+
+    # Tendência de lucro face aos 30 dias anteriores
+    if previous_profit_loss != 0:
+        profit_trend = round(
+            ((float(recent_profit_loss) - float(previous_profit_loss)) / float(abs(previous_profit_loss))) * 100, 2
+        )
+    elif recent_profit_loss > 0:
+        profit_trend = 100
+    else:
+        profit_trend = 0
+
+    total_bets = totals['total_bets'] or 0
+    avg_odds = float(totals['odds_sum']) / total_bets if total_bets else 0
+    avg_expected_value = float(totals['expected_value_sum']) / total_bets if total_bets else 0
+
+    return {
+        'total_bets': total_bets,
+        'total_staked': total_staked,
+        'total_profit_loss': total_profit_loss,
+        'win_rate': _percentage(totals['wins'], totals['completed_bets']),
+        'roi': _percentage(total_profit_loss, total_staked),
+        'pending_bets': totals['pending_bets'] or 0,
+        'pending_stake': totals['pending_stake'] or Decimal('0'),
+        'avg_odds': round(avg_odds, 2),
+        'avg_expected_value': round(avg_expected_value, 2),
+        'recent_profit_loss': recent_profit_loss,
+        'recent_staked': totals['recent_staked'] or Decimal('0'),
+        'profit_trend': profit_trend,
+    }
+
+
+def sport_breakdown(limit=5):
+    """Completed-bet count, profit and win rate per sport, ordered by sport name"""
+    rows = (
+        BetDailyRollup.objects.filter(COMPLETED)
+        .values('sport_id', 'sport__name')
+        .annotate(
+            total_bets=Sum('bet_count'),
+            profit_loss=Sum('profit_loss_sum'),
+            wins=Sum('bet_count', filter=WON),
+        )
+        .order_by('sport__name')[:limit]
+    )
+    return [
+        {
+            'sport_id': row['sport_id'],
+            'sport_name': row['sport__name'],
+            'total_bets': row['total_bets'],
+            'profit_loss': row['profit_loss'] or Decimal('0'),
+            'win_rate': _percentage(row['wins'], row['total_bets']),
+        }
+        for row in rows
+    ]
+
+
+def bookmaker_breakdown(limit=5):
+    """Completed bets, profit and total volume per bookmaker, ordered by volume"""
+    rows = (
+        BetDailyRollup.objects.values('bookmaker_id', 'bookmaker__name')
+        .annotate(
+            total_bets=Sum('bet_count', filter=COMPLETED),
+            profit_loss=Sum('profit_loss_sum', filter=COMPLETED),
+            total_staked=Sum('stake_sum'),
+        )
+        .filter(total_bets__gt=0)
+        .order_by('-total_staked')[:limit]
+    )
+    return [
+        {
+            'bookmaker_id': row['bookmaker_id'],
+            'bookmaker_name': row['bookmaker__name'],
+            'total_bets': row['total_bets'],
+            'total_staked': row['total_staked'] or Decimal('0'),
+            'profit_loss': row['profit_loss'] or Decimal('0'),
+        }
+        for row in rows
+    ]
+
+
+TRUNC_FUNCTIONS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def bucket_start(day, interval):
+    """First day of the day/week/month bucket containing day"""
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def iter_buckets(start_date, end_date, interval):
+    """Yield the start date of every bucket between two dates (inclusive)"""
+    current = bucket_start(start_date, interval)
+    while current <= end_date:
+        yield current
+        if interval == 'day':
+            current += timedelta(days=1)
+        elif interval == 'week':
+            current += timedelta(weeks=1)
+        elif current.month == 12:
+            current = current.replace(year=current.year + 1, month=1)
+        else:
+            current = current.replace(month=current.month + 1)
+
+
+def profit_series(start_date, end_date, interval='day'):
+    """
+    Completed-bet profit per day/week/month bucket with a running cumulative total.
+
+    Bucketing and the cumulative sum are both done in SQL with window functions
+    over the rollup rows, so the result is one row per bucket that has bets.
+    """
+    bucket = TRUNC_FUNCTIONS[interval]('day')
+    rows = (
+        BetDailyRollup.objects.filter(COMPLETED, day__gte=start_date, day__lte=end_date)
+        .annotate(bucket=bucket)
+        .annotate(
+            profit_loss=Window(Sum('profit_loss_sum'), partition_by=F('bucket')),
+            total_bets=Window(Sum('bet_count'), partition_by=F('bucket')),
+            # Default RANGE frame includes every row of the current bucket
+            cumulative=Window(Sum('profit_loss_sum'), order_by=F('bucket').asc()),
+        )
+        .values('bucket', 'profit_loss', 'total_bets', 'cumulative')
+        .distinct()
+        .order_by('bucket')
+    )
+    return {row['bucket']: row for row in rows}
+
+
+def monthly_summary(start_date, end_date):
+    """Completed-bet count, wins, stake and profit per calendar month in one grouped query"""
+    return list(
+        BetDailyRollup.objects.filter(COMPLETED, day__gte=start_date, day__lte=end_date)
+        .annotate(month=TruncMonth('day'))
+        .values('month')
+        .annotate(
+            total_bets=Sum('bet_count'),
+            wins=Sum('bet_count', filter=WON),
+            total_staked=Sum('stake_sum'),
+            profit_loss=Sum('profit_loss_sum'),
+        )
+        .order_by('month')
+    )
+
+
+# Dimensions served by segment_roi(): source model, group-by field and label field.
+# Everything except confidence_level is part of the rollup key.
+ROI_DIMENSIONS = {
+    'sport': {'source': 'rollup', 'key': 'sport_id', 'label': 'sport__name'},
+    'competition': {'source': 'rollup', 'key': 'competition_id', 'label': 'competition__name'},
+    'bookmaker': {'source': 'rollup', 'key': 'bookmaker_id', 'label': 'bookmaker__name'},
+    'category': {
+        'source': 'rollup', 'key': 'bet_type_category', 'label': None,
+        'choices': dict(BetType.CATEGORY_CHOICES),
+    },
+    'confidence_level': {'source': 'bet', 'key': 'confidence_level', 'label': None},
+}
+
+# Column names of the count/stake/profit measures for each source
+_MEASURES = {
+    'rollup': (BetDailyRollup, 'bet_count', 'stake_sum', 'profit_loss_sum'),
+    'bet': (Bet, None, 'stake', 'profit_loss'),
+}
+
+# Decimal places of the ROI used to rank segments; ties below this are broken by the segment key
+ROI_ORDER_PLACES = 6
+
+
+def segment_roi(by='sport', limit=10):
+    """
+    Completed-bet ROI per segment of the given dimension, best first.
+
+    Grouping, the ROI computation, ordering and the limit all happen in a
+    single SQL query.
+    """
+    dimension = ROI_DIMENSIONS[by]
+    model, count_field, stake_field, profit_field = _MEASURES[dimension['source']]
+    group_by = [dimension['key']] + ([dimension['label']] if dimension['label'] else [])
+
+    total_bets = Sum(count_field) if count_field else Count('id')
+    rows = (
+        model.objects.filter(COMPLETED)
+        .values(*group_by)
+        .annotate(
+            total_bets=total_bets,
+            total_staked=Sum(stake_field),
+            profit_loss=Sum(profit_field),
+        )
+        .filter(total_staked__gt=0)
+        .annotate(
+            roi=ExpressionWrapper(
+                Cast('profit_loss', FloatField()) * 100 / Cast('total_staked', FloatField()),
+                output_field=FloatField(),
+            )
+        )
+        .order_by(Round('roi', ROI_ORDER_PLACES).desc(), dimension['key'])[:limit]
+    )
+
+    segments = []
+    for row in rows:
+        key = row[dimension['key']]
+        if dimension['label']:
+            label = row[dimension['label']]
+        elif 'choices' in dimension:
+            label = dimension['choices'].get(key, key)
+        else:
+            label = str(key)
+        segments.append({
+            'key': key,
+            'label': label,
+            'roi': round(row['roi'], 2),
+            'total_bets': row['total_bets'],
+            'staked': float(row['total_staked']),
+            'profit': float(row['profit_loss'] or 0),
+        })
+    return segments
+
+
+def bankroll_history(initial=0, max_points=500):
+    """
+    Bankroll curve, drawdowns and win/loss streaks of all settled bets.
+
+    One streaming pass over (date, profit_loss, outcome) of the settled bets in
+    date order, plus a count query to size the downsampling buckets. The curve
+    keeps the lowest and highest point of every bucket (so peaks and troughs
+    survive) and at most max_points points. Push and void bets neither extend
+    nor break a streak.
+    """
+    settled = Bet.objects.filter(COMPLETED)
+    total = settled.count()
+    bucket_size = max(math.ceil(total / max(max_points // 2, 1)), 1)
+
+    balance = peak = float(initial)
+    peak_date = None
+    max_drawdown = {'amount': 0.0, 'percentage': None, 'peak_date': None, 'trough_date': None}
+    underwater_bets = longest_bets = longest_days = 0
+    streak_outcome, streak = None, 0
+    longest_streak = {'win': 0, 'loss': 0}
+    curve = []
+    low = high = None
+    last_date = None
+
+    rows = settled.order_by('date', 'id').values_list('date', 'profit_loss', 'outcome')
+    for index, (date, profit_loss, outcome) in enumerate(rows.iterator(chunk_size=5000)):
+        balance += float(profit_loss)
+        if peak_date is None:
+            peak_date = date
+        if balance >= peak:
+            if underwater_bets:
+                longest_days = max(longest_days, (date - peak_date).days)
+            peak, peak_date, underwater_bets = balance, date, 0
+        else:
+            underwater_bets += 1
+            longest_bets = max(longest_bets, underwater_bets)
+            if peak - balance > max_drawdown['amount']:
+                max_drawdown = {
+                    'amount': peak - balance,
+                    'percentage': _percentage(peak - balance, peak) if peak > 0 else None,
+                    'peak_date': peak_date,
+                    'trough_date': date,
+                }
+
+        if outcome in longest_streak:
+            streak = streak + 1 if outcome == streak_outcome else 1
+            streak_outcome = outcome
+            longest_streak[outcome] = max(longest_streak[outcome], streak)
+
+        point = (index, date, balance, peak)
+        if low is None or balance < low[2]:
+            low = point
+        if high is None or balance > high[2]:
+            high = point
+        if (index + 1) % bucket_size == 0:
+            curve.extend(sorted({low, high}))
+            low = high = None
+        last_date = date
+
+    if low is not None:
+        curve.extend(sorted({low, high}))
+    if underwater_bets:
+        # Still below the peak: the drawdown has lasted until the latest settled bet
+        longest_days = max(longest_days, (last_date - peak_date).days)
+
+    def local_day(value):
+        return timezone.localtime(value).date().isoformat() if value else None
+
+    return {
+        'settled_bets': total,
+        'initial_bankroll': round(float(initial), 2),
+        'final_bankroll': round(balance, 2),
+        'peak_bankroll': round(peak, 2),
+        'current_drawdown': round(peak - balance, 2),
+        'max_drawdown': {
+            'amount': round(max_drawdown['amount'], 2),
+            'percentage': max_drawdown['percentage'],
+            'peak_date': local_day(max_drawdown['peak_date']),
+            'trough_date': local_day(max_drawdown['trough_date']),
+        },
+        'longest_drawdown': {'days': longest_days, 'bets': longest_bets},
+        'streaks': {
+            'longest_win': longest_streak['win'],
+            'longest_loss': longest_streak['loss'],
+            'current': {'outcome': streak_outcome, 'length': streak},
+        },
+        'curve': {
+            'labels': [local_day(date) for _, date, _, _ in curve],
+            'bankroll': [round(value, 2) for _, _, value, _ in curve],
+            'peak': [round(value, 2) for _, _, _, value in curve],
+        },
+    }
+
+
+def performance_summary():
+    """
+    ROI, yield, expected value, hit rate and profit variance of all bets in one query.
+
+    ROI is total profit over total stake of completed bets; yield is the mean
+    per-bet return (profit / stake), so every bet weighs the same whatever its stake.
+    """
+    per_bet_return = Cast('profit_loss', FloatField()) / Cast('stake', FloatField())
+    totals = Bet.objects.aggregate(
+        total_bets=Count('id'),
+        completed_bets=Count('id', filter=COMPLETED),
+        staked=Sum('stake', filter=COMPLETED),
+        profit=Sum('profit_loss', filter=COMPLETED),
+        mean_return=Avg(per_bet_return, filter=COMPLETED),
+        expected_value=Sum('expected_value'),
+        wins=Count('id', filter=WON),
+        profit_variance=Variance(Cast('profit_loss', FloatField()), sample=True, filter=COMPLETED),
+    )
+    variance = totals['profit_variance'] if totals['completed_bets'] > 1 else None
+    return {
+        'total_bets': totals['total_bets'],
+        'completed_bets': totals['completed_bets'],
+        'total_staked': float(totals['staked'] or 0),
+        'profit_loss': float(totals['profit'] or 0),
+        'roi': _percentage(totals['profit'], totals['staked']),
+        'yield': round(totals['mean_return'] * 100, 2) if totals['mean_return'] is not None else 0,
+        'expected_value': round(float(totals['expected_value'] or 0), 2),
+        'hit_rate': _percentage(totals['wins'], totals['completed_bets']),
+        'profit_variance': round(variance, 4) if variance is not None else 0,
+        'profit_std': round(variance ** 0.5, 4) if variance is not None else 0,
+    }
+
+
+# Dimensions served by calibration_report(): group-by field and label field
+CALIBRATION_DIMENSIONS = {
+    'sport': {'key': 'sport_id', 'label': 'sport__name'},
+    'category': {'key': 'bet_type__category', 'label': None, 'choices': dict(BetType.CATEGORY_CHOICES)},
+    'bookmaker': {'key': 'bookmaker_id', 'label': 'bookmaker__name'},
+    'confidence_level': {'key': 'confidence_level', 'label': None},
+}
+
+# Probabilities are clipped to [eps, 1 - eps] so log loss stays finite for 0% and 100% forecasts
+LOG_LOSS_EPSILON = 1e-4
+
+
+def _calibration_summary(buckets):
+    """Brier score, log loss, hit rate and expected calibration error from per-bucket totals"""
+    bets = sum(bucket['bets'] for bucket in buckets)
+    wins = sum(bucket['wins'] for bucket in buckets)
+    return {
+        'bets': bets,
+        'wins': wins,
+        'hit_rate': _percentage(wins, bets),
+        'mean_predicted': round(sum(b['predicted_sum'] for b in buckets) * 100 / bets, 2) if bets else 0,
+        'brier_score': round(sum(b['brier_sum'] for b in buckets) / bets, 4) if bets else None,
+        'log_loss': round(sum(b['log_loss_sum'] for b in buckets) / bets, 4) if bets else None,
+        # Bet-weighted mean gap between predicted and actual hit rate, in percentage points
+        'calibration_error': round(
+            sum(abs(b['predicted_sum'] - b['wins']) for b in buckets) * 100 / bets, 2
+        ) if bets else None,
+        'buckets': [
+            {
+                'lower': bucket['lower'],
+                'upper': bucket['upper'],
+                'bets': bucket['bets'],
+                'wins': bucket['wins'],
+                'predicted': round(bucket['predicted_sum'] * 100 / bucket['bets'], 2),
+                'actual': _percentage(bucket['wins'], bucket['bets']),
+            }
+            for bucket in buckets
+        ],
+    }
+
+
+def calibration_report(by=None, bucket_width=5):
+    """
+    Calibration of estimated_probability against the outcomes of settled win/loss bets.
+
+    One grouped query buckets the forecasts (bucket_width % wide) per segment of the
+    optional `by` dimension and sums bets, wins, forecasts, squared errors (Brier) and
+    log losses; the overall and per-segment scores are combined from those rows.
+    """
+    dimension = CALIBRATION_DIMENSIONS[by] if by else None
+    probability = Cast('estimated_probability', FloatField()) / 100
+    clipped = Least(Greatest(probability, Value(LOG_LOSS_EPSILON)), Value(1 - LOG_LOSS_EPSILON))
+    won = Q(outcome='win')
+    last_bucket = math.ceil(100 / bucket_width) - 1
+
+    group_by = ['bucket']
+    if dimension:
+        group_by = [dimension['key']] + ([dimension['label']] if dimension['label'] else []) + group_by
+    rows = (
+        Bet.objects.filter(outcome__in=('win', 'loss'))
+        .annotate(bucket=Least(
+            Floor(Cast('estimated_probability', FloatField()) / bucket_width), Value(float(last_bucket))
+        ))
+        .values(*group_by)
+        .annotate(
+            bets=Count('id'),
+            wins=Count('id', filter=won),
+            predicted_sum=Sum(probability),
+            brier_sum=Sum(Case(
+                When(won, then=(1 - probability) * (1 - probability)),
+                default=probability * probability,
+                output_field=FloatField(),
+            )),
+            log_loss_sum=Sum(Case(
+                When(won, then=-Ln(clipped)),
+                default=-Ln(1 - clipped),
+                output_field=FloatField(),
+            )),
+        )
+        .order_by(*group_by)
+    )
+
+    segments = {}
+    for row in rows:
+        bucket = int(row['bucket'])
+        row['lower'] = bucket * bucket_width
+        row['upper'] = min((bucket + 1) * bucket_width, 100)
+        key = row[dimension['key']] if dimension else None
+        segments.setdefault(key, []).append(row)
+
+    report = {
+        'by': by,
+        'bucket_width': bucket_width,
+        'overall': _calibration_summary(_merge_buckets(segments.values())),
+    }
+    if dimension:
+        report['segments'] = []
+        for key, buckets in segments.items():
+            if dimension['label']:
+                label = buckets[0][dimension['label']]
+            elif 'choices' in dimension:
+                label = dimension['choices'].get(key, key)
+            else:
+                label = str(key)
+            report['segments'].append({'key': key, 'label': label, **_calibration_summary(buckets)})
+    return report
+
+
+def _merge_buckets(segments):
+    """Add up the bucket rows of several segments, bucket by bucket"""
+    merged = {}
+    for buckets in segments:
+        for bucket in buckets:
+            total = merged.setdefault(bucket['lower'], {
+                'lower': bucket['lower'], 'upper': bucket['upper'],
+                'bets': 0, 'wins': 0, 'predicted_sum': 0.0, 'brier_sum': 0.0, 'log_loss_sum': 0.0,
+            })
+            for field in ('bets', 'wins', 'predicted_sum', 'brier_sum', 'log_loss_sum'):
+                total[field] += bucket[field]
+    return [merged[lower] for lower in sorted(merged)]
+
+
+def get_backend():
+    """
+    Analytics implementation selected by settings.BETS_ANALYTICS_BACKEND: 'orm' (this
+    module) or 'columnar' (bets.columnar, NumPy over an in-memory snapshot).
+    """
+    name = getattr(settings, 'BETS_ANALYTICS_BACKEND', 'orm')
+    if name == 'orm':
+        return sys.modules[__name__]
+    if name == 'columnar':
+        from .columnar import ColumnarAnalytics
+        return ColumnarAnalytics.current()
+    raise ImproperlyConfigured(f"Unknown BETS_ANALYTICS_BACKEND {name!r}; use 'orm' or 'columnar'")
+
+
+def dashboard_metrics(now=None):
+    """All aggregate data shown on the dashboard (three queries in total)"""
+    metrics = headline_metrics(now=now)
+    metrics['sports_stats'] = sport_breakdown()
+    metrics['bookmaker_stats'] = bookmaker_breakdown()
+    return metrics
+
+
+def _summary_totals(queryset):
+    """Count, stake, profit, average odds and win counts of a Bet queryset in one query"""
+    return queryset.aggregate(
+        total_bets=Count('id'),
+        total_staked=Sum('stake'),
+        total_profit_loss=Sum('profit_loss', filter=COMPLETED),
+        avg_odds=Avg('bookmaker_odds'),
+        completed_bets=Count('id', filter=COMPLETED),
+        wins=Count('id', filter=WON),
+    )
+
+
+def estimated_row_count(queryset):
+    """PostgreSQL planner estimate of the rows in queryset, or None on other backends"""
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def sampled_summary_sql(queryset, sample_percent):
+    """
+    SQL and params of the _summary_totals() aggregate over queryset, with the Bet table of its
+    FROM clause read through TABLESAMPLE SYSTEM (sample_percent): the filters apply to the
+    sampled pages only, so only about sample_percent % of the table is read.
+    """
+    connection = connections[queryset.db]
+    columns = ('stake', 'profit_loss', 'bookmaker_odds', 'outcome')
+    sql, params = queryset.order_by().values_list(*columns).query.sql_with_params()
+    table = f'FROM {connection.ops.quote_name(Bet._meta.db_table)}'
+    position = sql.index(table) + len(table)
+    if '%s' in sql[:position]:
+        raise ValueError("The sampled table must come before any query parameter")
+    sql = f'{sql[:position]} TABLESAMPLE SYSTEM (%s){sql[position:]}'
+    settled = ', '.join(['%s'] * len(SETTLED_OUTCOMES))
+    aggregate = (
+        'SELECT COUNT(*), SUM(stake), SUM(profit_loss) FILTER (WHERE outcome IN ({settled})), '
+        'AVG(bookmaker_odds), COUNT(*) FILTER (WHERE outcome IN ({settled})), '
+        'COUNT(*) FILTER (WHERE outcome = %s) FROM ({sql}) sample'
+    ).format(settled=settled, sql=sql)
+    return aggregate, (*SETTLED_OUTCOMES, *SETTLED_OUTCOMES, 'win', sample_percent, *params)
+
+
+def scale_sample(totals, sample_percent):
+    """Scale counts and sums measured on a sample_percent % sample up to the whole table"""
+    scale = Decimal(100) / Decimal(str(sample_percent))
+    scaled = dict(totals)
+    for key in ('total_bets', 'completed_bets', 'wins'):
+        scaled[key] = int((totals[key] * scale).to_integral_value())
+    for key in ('total_staked', 'total_profit_loss'):
+        if totals[key] is not None:
+            scaled[key] = round(Decimal(str(totals[key])) * scale, 2)
+    return scaled
+
+
+def bet_summary(queryset, approximate_above=None, sample_percent=None):
+    """
+    Summary strip for a filtered Bet queryset, computed with a single conditional aggregate.
+
+    When approximate_above is set (default: settings.BETS_SUMMARY_APPROXIMATE_ABOVE) and the
+    PostgreSQL planner estimates more rows than that, the filtered query reads a TABLESAMPLE
+    SYSTEM block sample of sample_percent % of the table and the counts and sums are scaled
+    back up, so only a fraction of the pages is read. Other backends are always exact.
+    """
+    if approximate_above is None:
+        approximate_above = getattr(settings, 'BETS_SUMMARY_APPROXIMATE_ABOVE', None)
+    if sample_percent is None:
+        sample_percent = getattr(settings, 'BETS_SUMMARY_SAMPLE_PERCENT', 1)
+
+    estimate = estimated_row_count(queryset) if approximate_above is not None else None
+    approximate = estimate is not None and estimate > approximate_above and 0 < sample_percent < 100
+
+    if approximate:
+        sql, params = sampled_summary_sql(queryset, sample_percent)
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+        fields = ('total_bets', 'total_staked', 'total_profit_loss', 'avg_odds', 'completed_bets', 'wins')
+        totals = scale_sample(dict(zip(fields, row)), sample_percent)
+    else:
+        totals = _summary_totals(queryset)
+
+    return {
+        'total_bets': totals['total_bets'],
+        'total_staked': totals['total_staked'] or 0,
+        'total_profit_loss': totals['total_profit_loss'] or 0,
+        'avg_odds': totals['avg_odds'] or 0,
+        'win_rate': _percentage(totals['wins'], totals['completed_bets']),
+        'approximate': approximate,
+    }
@@ -0,0 +1,194 @@
+# bets/backtest.py
+"""
+Backtests of staking strategies over the settled bet history.
+
+The settled bets are replayed in date order as NumPy arrays under flat,
+Kelly (full or fractional) and confidence-weighted staking, each optionally
+capped at a fraction of the current bankroll. A parameter grid expands into
+configurations; chunks of configurations are simulated together (one column
+per configuration, stepping through the bets once) and the chunks are spread
+over the process pool of bets.parallel. Models are imported lazily so pool
+workers can import this module without Django being set up.
+"""
+import itertools
+import math
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .parallel import parallel_map, worker_count
+
+
+STRATEGIES = ('flat', 'kelly', 'confidence')
+
+# Most configurations per task handed to a worker process: wider chunks amortise the per-bet loop
+CHUNK_CONFIGS = 512
+# Upper bound on equity values held in memory at once per worker
+MAX_CELLS = 2_000_000
+# Equity points reported per configuration
+CURVE_POINTS = 100
+# A bankroll below this can no longer place a bet
+RUIN_THRESHOLD = 0.01
+
+
+def _require_numpy():
+    if np is None:
+        raise ImproperlyConfigured("Backtesting requires numpy")
+
+
+def load_history(queryset=None):
+    """
+    Settled bets in date order as arrays: probability (0-1), odds, confidence (1-5),
+    net return per unit staked (odds - 1 on a win, -1 on a loss, 0 on push/void) and date.
+    """
+    from .models import SETTLED_OUTCOMES, Bet
+
+    _require_numpy()
+    queryset = Bet.objects.all() if queryset is None else queryset
+    rows = list(
+        queryset.filter(outcome__in=SETTLED_OUTCOMES).order_by('date', 'id')
+        .values_list('estimated_probability', 'bookmaker_odds', 'confidence_level', 'outcome', 'date')
+    )
+    if not rows:
+        return {name: np.empty(0) for name in ('probability', 'odds', 'confidence', 'returns', 'dates')}
+    probabilities, odds, confidence, outcomes, dates = zip(*rows)
+    odds = np.array(odds, dtype='float64')
+    outcomes = np.array(outcomes)
+    return {
+        'probability': np.array(probabilities, dtype='float64') / 100,
+        'odds': odds,
+        'confidence': np.array(confidence, dtype='float64'),
+        'returns': np.select([outcomes == 'win', outcomes == 'loss'], [odds - 1, -1.0], 0.0),
+        'dates': np.array(dates),
+    }
+
+
+def expand_grid(strategies=STRATEGIES, kelly_fractions=(1.0,), units=(0.01,), max_stakes=(None,)):
+    """
+    Configurations of a parameter grid, without duplicates.
+
+    kelly_fraction only applies to the Kelly strategy and unit (a fraction of the starting
+    bankroll per bet, per confidence point for confidence staking) to the others; max_stake
+    caps any stake at a fraction of the current bankroll (None: no cap).
+    """
+    configs = []
+    for strategy, kelly_fraction, unit, max_stake in itertools.product(strategies, kelly_fractions, units, max_stakes):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"strategy must be one of: {', '.join(STRATEGIES)}")
+        # Written as ranges so that NaN fails them too
+        if not 0 < kelly_fraction <= 1 or not 0 < unit <= 1:
+            raise ValueError("kelly_fraction and unit must be between 0 and 1")
+        if max_stake is not None and not 0 < max_stake <= 1:
+            raise ValueError("max_stake must be between 0 and 1")
+        config = {'strategy': strategy, 'max_stake': max_stake}
+        if strategy == 'kelly':
+            config['kelly_fraction'] = kelly_fraction
+        else:
+            config['unit'] = unit
+        if config not in configs:
+            configs.append(config)
+    return configs
+
+
+def _run_chunk(task):
+    """Equity curves (configs x bets + 1) of a chunk of configurations, stepping through the bets once"""
+    probability, odds, confidence, returns, configs, bankroll = task
+    count = len(configs)
+    net_odds = odds - 1
+    kelly = np.clip((net_odds * probability - (1 - probability)) / net_odds, 0, None)
+
+    # Per bet: the stake as a fraction of the current bankroll (Kelly) or as an amount (flat, confidence)
+    proportional = np.array([config['strategy'] == 'kelly' for config in configs])
+    base = np.empty((count, len(returns)))
+    for row, config in enumerate(configs):
+        if config['strategy'] == 'kelly':
+            base[row] = kelly * config['kelly_fraction']
+        elif config['strategy'] == 'confidence':
+            base[row] = confidence * config['unit'] * bankroll
+        else:
+            base[row] = config['unit'] * bankroll
+    cap = np.array([config['max_stake'] or 1.0 for config in configs])
+
+    equity = np.empty((count, len(returns) + 1))
+    staked = np.zeros(count)
+    placed = np.zeros(count, dtype=int)
+    balance = equity[:, 0] = np.full(count, float(bankroll))
+    for index in range(len(returns)):
+        available = np.where(balance >= RUIN_THRESHOLD, balance, 0.0)
+        stake = np.where(proportional, base[:, index] * available, base[:, index])
+        stake = np.minimum(stake, cap * available)
+        staked += stake
+        placed += stake > 0
+        balance = equity[:, index + 1] = balance + stake * returns[index]
+    return equity, staked, placed
+
+
+def _statistics(equity, staked, placed, bankroll):
+    """Summary statistics of each equity curve (one per row)"""
+    finals = equity[:, -1]
+    peaks = np.maximum.accumulate(equity, axis=1)
+    drawdowns = (peaks - equity) / np.where(peaks > 0, peaks, 1)
+    per_bet = np.diff(equity, axis=1) / np.where(equity[:, :-1] > 0, equity[:, :-1], 1)
+    with np.errstate(divide='ignore'):
+        log_growth = np.log(np.clip(finals, 0, None) / bankroll)
+    profit = finals - bankroll
+    return [
+        {
+            'final_bankroll': round(float(finals[row]), 2),
+            'profit': round(float(profit[row]), 2),
+            'growth': round(float(profit[row] / bankroll * 100), 2),
+            'turnover': round(float(staked[row]), 2),
+            'roi': round(float(profit[row] / staked[row] * 100), 2) if staked[row] else 0,
+            'bets_placed': int(placed[row]),
+            'max_drawdown': round(float(drawdowns[row].max() * 100), 2),
+            'min_bankroll': round(float(equity[row].min()), 2),
+            # Mean log growth per bet: the quantity Kelly staking maximises
+            'log_growth_per_bet': (
+                round(float(log_growth[row] / (equity.shape[1] - 1)), 6) if np.isfinite(log_growth[row]) else None
+            ),
+            'volatility': round(float(per_bet[row].std() * 100), 4),
+            'ruined': bool(finals[row] < RUIN_THRESHOLD),
+        }
+        for row in range(len(finals))
+    ]
+
+
+def backtest(history, configs, bankroll=1000.0, workers=None, curve_points=CURVE_POINTS):
+    """
+    Replay the history under every configuration; returns the downsampled equity curves and statistics.
+
+    Results follow the order of configs. The configurations are split in about one chunk per
+    worker process; the result does not depend on the number of workers.
+    """
+    _require_numpy()
+    count = len(history['returns'])
+    positions = np.unique(np.linspace(0, count, min(curve_points, count + 1)).round().astype(int))
+    result = {
+        'bets': count,
+        'bankroll': bankroll,
+        'curve': {
+            'bet': positions.tolist(),
+            'date': [None] + [history['dates'][position - 1].isoformat() for position in positions[1:]],
+        },
+        'results': [],
+    }
+    if not configs or not count:
+        return result
+
+    arrays = (history['probability'], history['odds'], history['confidence'], history['returns'])
+    size = min(math.ceil(len(configs) / worker_count(workers)), CHUNK_CONFIGS, max(MAX_CELLS // (count + 1), 1))
+    starts = range(0, len(configs), size)
+    tasks = [(*arrays, configs[start:start + size], bankroll) for start in starts]
+    for (equity, staked, placed), start in zip(parallel_map(_run_chunk, tasks, workers), starts):
+        statistics = _statistics(equity, staked, placed, bankroll)
+        for row, stats in enumerate(statistics):
+            result['results'].append({
+                **configs[start + row],
+                **stats,
+                'equity': [round(float(value), 2) for value in equity[row, positions]],
+            })
+    return result
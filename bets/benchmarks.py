@@ -0,0 +1,109 @@
+# bets/benchmarks.py
+"""
+Latency and query-count benchmark of the main pages and endpoints.
+
+Each target is requested through the Django test client (full middleware,
+URL routing and template rendering) and timed over several runs; the
+analytics cache is cleared before every run unless warm runs are requested.
+Used by the benchmark_bets management command.
+"""
+import math
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Bet
+
+
+def benchmark_targets():
+    """(name, method, url, POST data or None) of every benchmarked request"""
+    targets = [
+        ('dashboard', 'get', reverse('bets:dashboard'), None),
+        ('profit_evolution', 'get', reverse('bets:profit_evolution_data') + '?days=365', None),
+        ('roi_by_sport', 'get', reverse('bets:roi_by_sport_data'), None),
+        ('monthly_summary', 'get', reverse('bets:monthly_summary_data'), None),
+    ]
+    for model in ('bet', 'sport', 'competition', 'team', 'bookmaker', 'bettype'):
+        targets.append((f'admin_{model}_changelist', 'get', reverse(f'admin:bets_{model}_changelist'), None))
+    targets.append(('add_bet_form', 'get', reverse('bets:add_bet'), None))
+
+    bet = Bet.objects.order_by('-id').first()
+    if bet is not None:
+        targets.append(('add_bet_submit', 'post', reverse('bets:add_bet'), {
+            'date': timezone.localtime().strftime('%Y-%m-%dT%H:%M'),
+            'sport': bet.sport_id,
+            'competition': bet.competition_id,
+            'home_team': bet.home_team_id,
+            'away_team': bet.away_team_id,
+            'bet_type': bet.bet_type_id,
+            'bookmaker': bet.bookmaker_id,
+            'estimated_probability': '55',
+            'bookmaker_odds': '2.00',
+            'stake': '10',
+            'confidence_level': '3',
+        }))
+    return targets
+
+
+def _percentile(sorted_values, percent):
+    index = max(math.ceil(len(sorted_values) * percent / 100) - 1, 0)
+    return sorted_values[index]
+
+
+class Benchmark:
+    """Times requests with a logged-in superuser client"""
+
+    def __init__(self, repeat=5, warm=False):
+        self.repeat = repeat
+        self.warm = warm
+        user_model = get_user_model()
+        user = user_model.objects.filter(username='benchmark').first()
+        if user is None:
+            user = user_model.objects.create_superuser('benchmark', 'benchmark@example.com', None)
+        self.client = Client()
+        self.client.force_login(user)
+
+    def measure(self, name, method, url, data=None):
+        """Run one target `repeat` times; returns latency stats (ms), query count and status"""
+        timings = []
+        queries = 0
+        status = None
+        if self.warm:
+            # Populate the cache once so every timed run is a hit
+            getattr(self.client, method)(url, data)
+
+        for _ in range(self.repeat):
+            if not self.warm:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = getattr(self.client, method)(url, data)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = len(captured)
+            status = response.status_code
+
+        timings.sort()
+        return {
+            'name': name,
+            'method': method.upper(),
+            'url': url,
+            'status': status,
+            'queries': queries,
+            'runs': len(timings),
+            'min_ms': round(timings[0], 2),
+            'median_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(_percentile(timings, 95), 2),
+            'max_ms': round(timings[-1], 2),
+        }
+
+    def run(self):
+        return [self.measure(*target) for target in benchmark_targets()]
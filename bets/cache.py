@@ -0,0 +1,196 @@
+# bets/cache.py
+"""
+Versioned cache for analytics payloads.
+
+Every cached entry is keyed by a global "bets version" that is bumped after
+any Bet write commits, so payloads are served until the underlying data
+changes and never need explicit invalidation. The team/competition option
+lists of the add-bet form use a separate "options version", bumped on
+Team and Competition writes. The versions are CacheVersion rows, so a write
+from any process (another worker, a management command) invalidates every
+process's entries, whatever the cache backend; reading one is a single
+primary-key lookup per request.
+"""
+from functools import wraps
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.http import HttpResponse
+
+
+# CacheVersion names
+VERSION_KEY = 'bets'
+OPTIONS_VERSION_KEY = 'options'
+
+# Names of the payloads cached by the views, used to report hit/miss counters
+CACHED_PAYLOADS = (
+    'dashboard',
+    'profit_evolution',
+    'roi_by_sport',
+    'monthly_summary',
+    'bankroll',
+    'simulation',
+    'backtest',
+    'calibration',
+    'clv',
+    'exposure',
+    'competition_options',
+    'team_options',
+)
+
+
+def _timeout():
+    return getattr(settings, 'BETS_CACHE_TIMEOUT', 60 * 60)
+
+
+def _seed_version(name):
+    """
+    Create the version row of name if missing and return its version.
+
+    New rows start from the current time in microseconds rather than 1, so a row that is
+    recreated (e.g. after a database flush) never reuses the keys of entries still cached.
+    """
+    from .models import CacheVersion
+
+    try:
+        with transaction.atomic():
+            version, _ = CacheVersion.objects.get_or_create(
+                name=name, defaults={'version': time.time_ns() // 1000}
+            )
+    except IntegrityError:
+        # Created concurrently by another process
+        version = CacheVersion.objects.get(name=name)
+    return version.version
+
+
+def _get_version(name):
+    from .models import CacheVersion
+
+    version = CacheVersion.objects.filter(name=name).values_list('version', flat=True).first()
+    if version is None:
+        version = _seed_version(name)
+    return version
+
+
+def _bump_version(name):
+    from .models import CacheVersion
+
+    if not CacheVersion.objects.filter(name=name).update(version=F('version') + 1):
+        # First write: any new row invalidates the entries cached so far
+        _seed_version(name)
+
+
+def get_bets_version():
+    """Current global bets version"""
+    return _get_version(VERSION_KEY)
+
+
+def bump_bets_version():
+    """Invalidate every cached payload by moving to a new bets version"""
+    _bump_version(VERSION_KEY)
+
+
+def bump_bets_version_on_commit():
+    """Bump the version once the current transaction commits (immediately in autocommit)"""
+    transaction.on_commit(bump_bets_version)
+
+
+def get_options_version():
+    """Current version of the cached team/competition option lists"""
+    return _get_version(OPTIONS_VERSION_KEY)
+
+
+def bump_options_version():
+    """Invalidate the cached option lists (teams or competitions changed)"""
+    _bump_version(OPTIONS_VERSION_KEY)
+
+
+def bump_options_version_on_commit():
+    """Bump the options version once the current transaction commits"""
+    transaction.on_commit(bump_options_version)
+
+
+def _incr_counter(name, kind):
+    key = f'bets:cache:{kind}:{name}'
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def cache_stats():
+    """Hit/miss counters per cached payload plus the current bets version"""
+    keys = {
+        f'bets:cache:{kind}:{name}': (name, kind)
+        for name in CACHED_PAYLOADS
+        for kind in ('hits', 'misses')
+    }
+    values = cache.get_many(list(keys))
+    stats = {name: {'hits': 0, 'misses': 0} for name in CACHED_PAYLOADS}
+    for key, (name, kind) in keys.items():
+        stats[name][kind] = values.get(key, 0)
+    return {'version': get_bets_version(), 'payloads': stats}
+
+
+def payload_key(name, params=None, version=None):
+    """Cache key for a payload at the given version (default: the current bets version)"""
+    digest = ''
+    if params:
+        encoded = '&'.join(f'{key}={value}' for key, value in sorted(params.items()))
+        digest = hashlib.md5(encoded.encode('utf-8')).hexdigest()
+    if version is None:
+        version = get_bets_version()
+    return f'bets:payload:{name}:v{version}:{digest}'
+
+
+def get_or_build(name, builder, params=None, version=None):
+    """Return the cached payload for name/params, building and storing it on a miss"""
+    key = payload_key(name, params, version)
+    payload = cache.get(key)
+    if payload is not None:
+        _incr_counter(name, 'hits')
+        return payload
+
+    _incr_counter(name, 'misses')
+    payload = builder()
+    cache.set(key, payload, timeout=_timeout())
+    return payload
+
+
+def cached_json_view(name):
+    """
+    Cache successful JSON responses of a view under the current bets version.
+
+    Reading the version is one query, counted in the view's @query_budget.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            def build():
+                response = view_func(request, *args, **kwargs)
+                return {
+                    'status': response.status_code,
+                    'content_type': response.get('Content-Type', 'application/json'),
+                    'content': response.content,
+                }
+
+            params = {key: value for key, value in request.GET.lists()}
+            key = payload_key(name, params)
+            entry = cache.get(key)
+            if entry is None:
+                _incr_counter(name, 'misses')
+                entry = build()
+                # Never cache errors: they should be retried on the next request
+                if entry['status'] == 200:
+                    cache.set(key, entry, timeout=_timeout())
+            else:
+                _incr_counter(name, 'hits')
+
+            return HttpResponse(entry['content'], status=entry['status'], content_type=entry['content_type'])
+        return wrapper
+    return decorator
@@ -0,0 +1,322 @@
+# bets/columnar.py
+"""
+In-memory, column-oriented analytics over the whole Bet table.
+
+BetSnapshot streams the columns the analytics need with one values_list
+query into preallocated NumPy arrays (one element per bet). The snapshot is
+kept per process and reused until the bets cache version (see bets.cache)
+changes; every committed Bet write through the ORM bumps it, so the snapshot
+is reloaded after any insert, save, update() or delete, while checking for
+a change costs one primary-key lookup.
+
+ColumnarAnalytics exposes the same functions as bets.analytics, computed
+with vectorised NumPy operations over the snapshot instead of SQL over the
+daily rollups. Select it with BETS_ANALYTICS_BACKEND = 'columnar'.
+"""
+import datetime
+from decimal import Decimal
+import itertools
+import threading
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .analytics import ROI_DIMENSIONS, ROI_ORDER_PLACES, _finalise_headline, _percentage
+from .cache import get_bets_version
+from .models import Bet, Bookmaker, Competition, Sport
+
+
+# Snapshot attribute, Bet value expression and NumPy dtype of every loaded column
+COLUMNS = (
+    ('id', 'id', 'int64'),
+    ('time', 'date', 'datetime64[us]'),
+    ('day', 'day', 'datetime64[D]'),
+    ('stake', 'stake', 'float64'),
+    ('odds', 'bookmaker_odds', 'float64'),
+    ('probability', 'estimated_probability', 'float64'),
+    ('expected_value', 'expected_value', 'float64'),
+    ('profit_loss', 'profit_loss', 'float64'),
+    ('outcome', 'outcome', 'U10'),
+    ('sport_id', 'sport_id', 'int64'),
+    ('competition_id', 'competition_id', 'int64'),
+    ('bookmaker_id', 'bookmaker_id', 'int64'),
+    ('category', 'bet_type__category', 'U50'),
+    ('confidence_level', 'confidence_level', 'int64'),
+)
+
+# Rows fetched per database round trip and copied into the arrays at a time when loading
+LOAD_CHUNK_SIZE = 10000
+
+# Snapshot column holding the key of each segment_roi() dimension
+DIMENSION_COLUMNS = {
+    'sport': 'sport_id',
+    'competition': 'competition_id',
+    'bookmaker': 'bookmaker_id',
+    'category': 'category',
+    'confidence_level': 'confidence_level',
+}
+
+
+def _money(value):
+    """Float sum as a 2-decimal Decimal, like the DecimalField sums of the ORM backend"""
+    return Decimal(f'{value:.2f}')
+
+
+def _group(keys, *values):
+    """Sorted unique keys, row count per key and the per-key sum of each value array"""
+    uniques, inverse = np.unique(keys, return_inverse=True)
+    counts = np.bincount(inverse, minlength=len(uniques))
+    sums = [np.bincount(inverse, weights=value, minlength=len(uniques)) for value in values]
+    return uniques, counts, sums
+
+
+def _naive_utc(values):
+    """Datetimes as naive UTC, which NumPy stores without a timezone warning"""
+    return [
+        timezone.make_naive(value, datetime.timezone.utc) if timezone.is_aware(value) else value
+        for value in values
+    ]
+
+
+def _buckets(days, interval):
+    """First day of the day/week/month bucket of every element of a datetime64[D] array"""
+    if interval == 'week':
+        # 1970-01-01 was a Thursday, so Monday-based weekdays are (days + 3) % 7
+        return days - ((days.astype('int64') + 3) % 7).astype('timedelta64[D]')
+    if interval == 'month':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    return days
+
+
+class BetSnapshot:
+    """The Bet table as NumPy column arrays plus the names of sports, competitions and bookmakers"""
+
+    def __init__(self, key, columns, labels):
+        self.key = key
+        self.labels = labels
+        for name, values in columns.items():
+            setattr(self, name, values)
+        self.pending = self.outcome == 'pending'
+        self.completed = ~self.pending
+        self.won = self.outcome == 'win'
+
+    def __len__(self):
+        return len(self.id)
+
+    @classmethod
+    def load(cls, key, using='default', chunk_size=LOAD_CHUNK_SIZE):
+        """Stream the table chunk by chunk into arrays sized from a count, never holding all rows as tuples"""
+        bets = Bet.objects.using(using).order_by()
+        capacity = bets.count()
+        arrays = [np.empty(capacity, dtype=dtype) for _, _, dtype in COLUMNS]
+        rows = (
+            bets.annotate(day=TruncDate('date'))
+            .values_list(*(source for _, source, _ in COLUMNS))
+            .iterator(chunk_size=chunk_size)
+        )
+        size = 0
+        while chunk := list(itertools.islice(rows, chunk_size)):
+            end = size + len(chunk)
+            if end > capacity:
+                # Rows inserted since the count: grow the arrays
+                capacity = max(end, capacity * 2)
+                arrays = [np.concatenate([array, np.empty(capacity - len(array), array.dtype)]) for array in arrays]
+            for index, ((_, _, dtype), array) in enumerate(zip(COLUMNS, arrays)):
+                values = [row[index] for row in chunk]
+                array[size:end] = _naive_utc(values) if dtype == 'datetime64[us]' else values
+            size = end
+        columns = {name: array[:size] for (name, _, _), array in zip(COLUMNS, arrays)}
+
+        labels = {
+            'sport': dict(Sport.objects.using(using).values_list('id', 'name')),
+            'competition': dict(Competition.objects.using(using).values_list('id', 'name')),
+            'bookmaker': dict(Bookmaker.objects.using(using).values_list('id', 'name')),
+        }
+        return cls(key, columns, labels)
+
+
+def snapshot_key(using='default'):
+    """Database alias and bets cache version; any committed Bet write changes the version"""
+    return (using, get_bets_version())
+
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+def get_snapshot(using='default'):
+    """Snapshot of the current table, reloaded only when snapshot_key() has changed"""
+    if np is None:
+        raise ImproperlyConfigured("The columnar analytics backend requires numpy")
+    key = snapshot_key(using)
+    with _snapshots_lock:
+        snapshot = _snapshots.get(using)
+        if snapshot is None or snapshot.key != key:
+            snapshot = _snapshots[using] = BetSnapshot.load(key, using)
+        return snapshot
+
+
+def clear_snapshots():
+    """Drop the snapshots of this process, e.g. after writes that do not bump the bets version (raw SQL)"""
+    with _snapshots_lock:
+        _snapshots.clear()
+
+
+class ColumnarAnalytics:
+    """bets.analytics functions computed with NumPy over a BetSnapshot"""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    @classmethod
+    def current(cls, using='default'):
+        return cls(get_snapshot(using))
+
+    def headline_metrics(self, now=None):
+        s = self.snapshot
+        now = np.datetime64(*_naive_utc([now or timezone.now()]), 'us')
+        recent = s.time >= now - np.timedelta64(30, 'D')
+        previous = (s.time >= now - np.timedelta64(60, 'D')) & ~recent
+
+        return _finalise_headline({
+            'total_bets': len(s),
+            'total_staked': _money(s.stake.sum()),
+            'total_profit_loss': _money(s.profit_loss[s.completed].sum()),
+            'completed_bets': int(s.completed.sum()),
+            'wins': int(s.won.sum()),
+            'pending_bets': int(s.pending.sum()),
+            'pending_stake': _money(s.stake[s.pending].sum()),
+            'odds_sum': s.odds.sum(),
+            'expected_value_sum': s.expected_value.sum(),
+            'recent_profit_loss': _money(s.profit_loss[recent & s.completed].sum()),
+            'recent_staked': _money(s.stake[recent].sum()),
+            'previous_profit_loss': _money(s.profit_loss[previous & s.completed].sum()),
+        })
+
+    def sport_breakdown(self, limit=5):
+        s = self.snapshot
+        c = s.completed
+        sports, counts, (profit, wins) = _group(s.sport_id[c], s.profit_loss[c], s.won[c].astype('float64'))
+        names = s.labels['sport']
+        order = sorted(range(len(sports)), key=lambda i: (names.get(sports[i], ''), sports[i]))[:limit]
+        return [
+            {
+                'sport_id': sports[i].item(),
+                'sport_name': names.get(sports[i]),
+                'total_bets': int(counts[i]),
+                'profit_loss': _money(profit[i]),
+                'win_rate': _percentage(wins[i], counts[i]),
+            }
+            for i in order
+        ]
+
+    def bookmaker_breakdown(self, limit=5):
+        s = self.snapshot
+        c = s.completed.astype('float64')
+        bookmakers, _, (completed, profit, staked) = _group(s.bookmaker_id, c, s.profit_loss * c, s.stake)
+        keep = np.flatnonzero(completed > 0)
+        order = keep[np.lexsort((bookmakers[keep], -staked[keep]))][:limit]
+        names = s.labels['bookmaker']
+        return [
+            {
+                'bookmaker_id': bookmakers[i].item(),
+                'bookmaker_name': names.get(bookmakers[i]),
+                'total_bets': int(completed[i]),
+                'total_staked': _money(staked[i]),
+                'profit_loss': _money(profit[i]),
+            }
+            for i in order
+        ]
+
+    def profit_series(self, start_date, end_date, interval='day'):
+        s = self.snapshot
+        mask = s.completed & (s.day >= np.datetime64(start_date, 'D')) & (s.day <= np.datetime64(end_date, 'D'))
+        buckets, counts, (profit,) = _group(_buckets(s.day[mask], interval), s.profit_loss[mask])
+        cumulative = np.cumsum(profit)
+        series = {}
+        for i, bucket in enumerate(buckets.astype(object)):
+            series[bucket] = {
+                'bucket': bucket,
+                'profit_loss': _money(profit[i]),
+                'total_bets': int(counts[i]),
+                'cumulative': _money(cumulative[i]),
+            }
+        return series
+
+    def monthly_summary(self, start_date, end_date):
+        s = self.snapshot
+        mask = s.completed & (s.day >= np.datetime64(start_date, 'D')) & (s.day <= np.datetime64(end_date, 'D'))
+        months, counts, (wins, staked, profit) = _group(
+            _buckets(s.day[mask], 'month'), s.won[mask].astype('float64'), s.stake[mask], s.profit_loss[mask],
+        )
+        return [
+            {
+                'month': month,
+                'total_bets': int(counts[i]),
+                'wins': int(wins[i]),
+                'total_staked': _money(staked[i]),
+                'profit_loss': _money(profit[i]),
+            }
+            for i, month in enumerate(months.astype(object))
+        ]
+
+    def segment_roi(self, by='sport', limit=10):
+        s = self.snapshot
+        dimension = ROI_DIMENSIONS[by]
+        c = s.completed
+        keys, counts, (staked, profit) = _group(
+            getattr(s, DIMENSION_COLUMNS[by])[c], s.stake[c], s.profit_loss[c],
+        )
+        keep = np.flatnonzero(staked > 0)
+        roi = profit[keep] * 100 / staked[keep]
+        order = keep[np.lexsort((keys[keep], -roi.round(ROI_ORDER_PLACES)))][:limit]
+
+        segments = []
+        for i in order:
+            key = keys[i].item()
+            if by in s.labels:
+                label = s.labels[by].get(key)
+            elif 'choices' in dimension:
+                label = dimension['choices'].get(key, key)
+            else:
+                label = str(key)
+            segments.append({
+                'key': key,
+                'label': label,
+                'roi': round(float(profit[i] * 100 / staked[i]), 2),
+                'total_bets': int(counts[i]),
+                'staked': round(float(staked[i]), 2),
+                'profit': round(float(profit[i]), 2),
+            })
+        return segments
+
+    def performance_summary(self):
+        s = self.snapshot
+        c = s.completed
+        stake = s.stake[c]
+        profit = s.profit_loss[c]
+        completed = len(stake)
+        return {
+            'total_bets': len(s),
+            'completed_bets': completed,
+            'total_staked': round(float(stake.sum()), 2),
+            'profit_loss': round(float(profit.sum()), 2),
+            'roi': _percentage(profit.sum(), stake.sum()),
+            'yield': round(float((profit / stake).mean()) * 100, 2) if completed else 0,
+            'expected_value': round(float(s.expected_value.sum()), 2),
+            'hit_rate': _percentage(s.won.sum(), completed),
+            'profit_variance': round(float(profit.var(ddof=1)), 4) if completed > 1 else 0,
+            'profit_std': round(float(profit.std(ddof=1)), 4) if completed > 1 else 0,
+        }
+
+    def dashboard_metrics(self, now=None):
+        metrics = self.headline_metrics(now=now)
+        metrics['sports_stats'] = self.sport_breakdown()
+        metrics['bookmaker_stats'] = self.bookmaker_breakdown()
+        return metrics
@@ -0,0 +1,77 @@
+# bets/ev.py
+"""
+Expected value, implied probability, edge and Kelly stake of candidate selections.
+
+selection_metrics() handles one selection (live calculator); batch_metrics()
+screens a whole slate in one vectorised numpy pass, falling back to a plain
+loop when numpy is not installed. Probabilities are percentages, as in Bet.
+"""
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+
+def selection_metrics(probability, odds, stake):
+    """EV, implied probability, edge, potential profit and ROI (%) of one selection, as floats"""
+    implied = 100 / odds if odds > 0 else 0
+    potential_profit = (odds - 1) * stake
+    return {
+        'ev': stake * (probability * odds / 100 - 1),
+        'implied_probability': implied,
+        # Same sign convention as Bet.bookmaker_edge: positive means the bookmaker has the edge
+        'edge': implied - probability,
+        'potential_profit': potential_profit,
+        'roi_percentage': potential_profit / stake * 100 if stake > 0 else 0,
+    }
+
+
+def kelly_fraction(probability, odds):
+    """Fraction of the bankroll the Kelly criterion stakes on a selection (0 when EV <= 0)"""
+    net_odds = odds - 1
+    if net_odds <= 0:
+        return 0.0
+    p = probability / 100
+    return max((net_odds * p - (1 - p)) / net_odds, 0.0)
+
+
+def batch_metrics(probabilities, odds, stakes, bankroll=None, kelly_multiplier=1.0):
+    """
+    Metrics for many selections at once; returns a dict of equally long lists.
+
+    kelly_stake is kelly_fraction * kelly_multiplier * bankroll, or None without a bankroll.
+    Inputs must already be validated (0 <= probability <= 100, odds > 1, stake >= 0).
+    """
+    if np is None:
+        return _batch_metrics_python(probabilities, odds, stakes, bankroll, kelly_multiplier)
+
+    p = np.asarray(probabilities, dtype=float)
+    o = np.asarray(odds, dtype=float)
+    s = np.asarray(stakes, dtype=float)
+
+    implied = 100 / o
+    net_odds = o - 1
+    kelly = np.clip((net_odds * p / 100 - (1 - p / 100)) / net_odds, 0, None)
+    metrics = {
+        'ev': np.round(s * (p * o / 100 - 1), 2).tolist(),
+        'implied_probability': np.round(implied, 2).tolist(),
+        'edge': np.round(implied - p, 2).tolist(),
+        'kelly_fraction': np.round(kelly, 4).tolist(),
+        'kelly_stake': (
+            np.round(kelly * kelly_multiplier * bankroll, 2).tolist() if bankroll is not None else [None] * len(p)
+        ),
+    }
+    return metrics
+
+
+def _batch_metrics_python(probabilities, odds, stakes, bankroll, kelly_multiplier):
+    metrics = {key: [] for key in ('ev', 'implied_probability', 'edge', 'kelly_fraction', 'kelly_stake')}
+    for probability, selection_odds, stake in zip(probabilities, odds, stakes):
+        single = selection_metrics(probability, selection_odds, stake)
+        kelly = kelly_fraction(probability, selection_odds)
+        metrics['ev'].append(round(single['ev'], 2))
+        metrics['implied_probability'].append(round(single['implied_probability'], 2))
+        metrics['edge'].append(round(single['edge'], 2))
+        metrics['kelly_fraction'].append(round(kelly, 4))
+        metrics['kelly_stake'].append(round(kelly * kelly_multiplier * bankroll, 2) if bankroll is not None else None)
+    return metrics
@@ -0,0 +1,128 @@
+# bets/exports.py
+"""
+Streaming export of the bet ledger as CSV or NDJSON.
+
+The queryset is read with iterator(chunk_size=...) and every row is encoded
+and yielded as soon as it is fetched, so an export of any size runs in
+constant memory and the first bytes are sent before the query finishes.
+"""
+import csv
+from datetime import datetime, time, timedelta
+import json
+
+from django.utils import timezone
+
+from .models import Bet
+
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# (column name, function returning the value for a Bet fetched with select_related)
+EXPORT_COLUMNS = (
+    ('id', lambda bet: bet.pk),
+    ('date', lambda bet: bet.date.isoformat()),
+    ('sport', lambda bet: bet.sport.name),
+    ('competition', lambda bet: bet.competition.name),
+    ('home_team', lambda bet: bet.home_team.name),
+    ('away_team', lambda bet: bet.away_team.name),
+    ('neutral_ground', lambda bet: bet.neutral_ground),
+    ('bet_type', lambda bet: bet.bet_type.name),
+    ('bet_type_category', lambda bet: bet.bet_type.category),
+    ('bet_description', lambda bet: bet.bet_description),
+    ('bookmaker', lambda bet: bet.bookmaker.name),
+    ('estimated_probability', lambda bet: bet.estimated_probability),
+    ('bookmaker_odds', lambda bet: bet.bookmaker_odds),
+    ('implied_probability', lambda bet: bet.implied_probability),
+    ('bookmaker_edge', lambda bet: bet.bookmaker_edge),
+    ('stake', lambda bet: bet.stake),
+    ('expected_value', lambda bet: bet.expected_value),
+    ('potential_payout', lambda bet: bet.potential_payout),
+    ('confidence_level', lambda bet: bet.confidence_level),
+    ('outcome', lambda bet: bet.outcome),
+    ('profit_loss', lambda bet: bet.profit_loss),
+    ('roi', lambda bet: bet.roi),
+    ('kickoff', lambda bet: bet.kickoff.isoformat() if bet.kickoff else None),
+    ('selection', lambda bet: bet.selection),
+    ('closing_odds', lambda bet: bet.closing_odds),
+    ('clv', lambda bet: bet.clv),
+)
+
+OUTCOMES = {value for value, _ in Bet.OUTCOME_CHOICES}
+
+
+def _parse_day(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f"{name} must be a date in YYYY-MM-DD format")
+
+
+def export_queryset(start=None, end=None, sport=None, bookmaker=None, outcome=None):
+    """
+    Bets matching the export filters, oldest first, with every FK joined.
+
+    start/end are inclusive YYYY-MM-DD days; sport and bookmaker accept an id or
+    a name. Raises ValueError for invalid filter values.
+    """
+    queryset = Bet.objects.select_related(
+        'sport', 'competition', 'home_team', 'away_team', 'bet_type', 'bookmaker',
+    )
+
+    # Compare the raw column against day boundaries so the date index is used
+    if start:
+        start_day = _parse_day(start, 'start')
+        queryset = queryset.filter(date__gte=timezone.make_aware(datetime.combine(start_day, time.min)))
+    if end:
+        end_day = _parse_day(end, 'end')
+        queryset = queryset.filter(date__lt=timezone.make_aware(datetime.combine(end_day + timedelta(days=1), time.min)))
+    if start and end and start_day > end_day:
+        raise ValueError("start must not be after end")
+
+    for name, value in (('sport', sport), ('bookmaker', bookmaker)):
+        if not value:
+            continue
+        if str(value).isdigit():
+            queryset = queryset.filter(**{f'{name}_id': int(value)})
+        else:
+            queryset = queryset.filter(**{f'{name}__name__iexact': value})
+
+    if outcome:
+        if outcome not in OUTCOMES:
+            raise ValueError(f"outcome must be one of {', '.join(sorted(OUTCOMES))}")
+        queryset = queryset.filter(outcome=outcome)
+
+    return queryset.order_by('date', 'id')
+
+
+class _Echo:
+    """File-like object whose write() returns the value, so csv.writer can feed a generator"""
+
+    def write(self, value):
+        return value
+
+
+def _json_default(value):
+    return str(value)
+
+
+def iter_export(queryset, fmt='csv', chunk_size=2000):
+    """Yield the encoded export one row at a time (CSV starts with a header row)"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+
+    names = [name for name, _ in EXPORT_COLUMNS]
+    getters = [getter for _, getter in EXPORT_COLUMNS]
+    rows = queryset.iterator(chunk_size=chunk_size)
+
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(names)
+        for bet in rows:
+            yield writer.writerow([getter(bet) for getter in getters])
+    else:
+        for bet in rows:
+            record = dict(zip(names, (getter(bet) for getter in getters)))
+            yield json.dumps(record, default=_json_default) + '\n'
@@ -0,0 +1,137 @@
+# bets/exposure.py
+"""
+Open exposure of the pending bets.
+
+Reads only the BetExposure ledger, which Bet writes keep up to date (one row
+per match, competition and bookmaker with open bets), so the answers cost a
+handful of aggregates over a small table instead of a scan of Bet.
+exposure_summary() breaks the open stake and potential payout down by match,
+team, competition and bookmaker; worst_case_loss() answers "what do we lose
+if everything tied to these teams, matches, competitions or bookmakers goes
+against us" in one query.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, F, Q, Sum
+
+from .models import BetExposure
+
+
+def _money(value):
+    return round(float(value or Decimal('0')), 2)
+
+
+def _totals(row):
+    return {
+        'bets': row['bets'] or 0,
+        'stake': _money(row['stake']),
+        'potential_payout': _money(row['payout']),
+    }
+
+
+def _grouped(labels, limit):
+    """Ledger totals grouped by the keys of labels (field paths), renamed to their values"""
+    rows = (
+        BetExposure.objects.values(*labels)
+        .annotate(bets=Sum('bet_count'), stake=Sum('stake_sum'), payout=Sum('payout_sum'))
+        .order_by('-stake')
+    )
+    if limit is not None:
+        rows = rows[:limit]
+    return [
+        {
+            **{label: row[field] for field, label in labels.items()},
+            **_totals(row),
+        }
+        for row in rows
+    ]
+
+
+def _team_rows(limit):
+    """Exposure per team, over its home and away buckets (a bet counts for both teams of its match)"""
+    teams = {}
+    for side in ('home_team', 'away_team'):
+        rows = (
+            BetExposure.objects.values(team_id=F(f'{side}_id'), team=F(f'{side}__name'))
+            .annotate(bets=Sum('bet_count'), stake=Sum('stake_sum'), payout=Sum('payout_sum'))
+            .order_by()
+        )
+        for row in rows:
+            entry = teams.setdefault(
+                row['team_id'],
+                {'team_id': row['team_id'], 'team': row['team'], 'bets': 0, 'stake': 0.0, 'potential_payout': 0.0},
+            )
+            totals = _totals(row)
+            entry['bets'] += totals['bets']
+            entry['stake'] += totals['stake']
+            entry['potential_payout'] += totals['potential_payout']
+    ranked = sorted(teams.values(), key=lambda entry: entry['stake'], reverse=True)
+    for entry in ranked:
+        entry['stake'] = round(entry['stake'], 2)
+        entry['potential_payout'] = round(entry['potential_payout'], 2)
+    return ranked[:limit] if limit is not None else ranked
+
+
+def exposure_summary(limit=10):
+    """Open bets, stake and potential payout overall and for the `limit` most exposed of each dimension"""
+    totals = BetExposure.objects.aggregate(bets=Sum('bet_count'), stake=Sum('stake_sum'), payout=Sum('payout_sum'))
+    return {
+        'open': _totals(totals),
+        'by_match': _grouped(
+            {
+                'home_team_id': 'home_team_id', 'home_team__name': 'home_team',
+                'away_team_id': 'away_team_id', 'away_team__name': 'away_team', 'kickoff': 'kickoff',
+            },
+            limit,
+        ),
+        'by_team': _team_rows(limit),
+        'by_competition': _grouped({'competition_id': 'competition_id', 'competition__name': 'competition'}, limit),
+        'by_bookmaker': _grouped({'bookmaker_id': 'bookmaker_id', 'bookmaker__name': 'bookmaker'}, limit),
+    }
+
+
+def scenario_filter(teams=(), matches=(), competitions=(), bookmakers=()):
+    """Q over BetExposure matching the buckets hit by any of the given teams, (home, away) matches, etc."""
+    query = Q(pk__in=[])
+    if teams:
+        query |= Q(home_team_id__in=teams) | Q(away_team_id__in=teams)
+    for home_team_id, away_team_id in matches:
+        query |= Q(home_team_id=home_team_id, away_team_id=away_team_id)
+    if competitions:
+        query |= Q(competition_id__in=competitions)
+    if bookmakers:
+        query |= Q(bookmaker_id__in=bookmakers)
+    return query
+
+
+def worst_case_loss(teams=(), matches=(), competitions=(), bookmakers=()):
+    """
+    Loss if every open bet tied to the scenario loses (or its bookmaker does not pay), in one query.
+
+    worst_case_loss is the stake at risk in the scenario and forgone_payout what those bets
+    would have returned; the rest of the open book is reported alongside.
+    """
+    scenario = scenario_filter(teams, matches, competitions, bookmakers)
+    totals = BetExposure.objects.aggregate(
+        bets=Sum('bet_count'), stake=Sum('stake_sum'), payout=Sum('payout_sum'),
+        hit_buckets=Count('id', filter=scenario),
+        hit_bets=Sum('bet_count', filter=scenario),
+        hit_stake=Sum('stake_sum', filter=scenario),
+        hit_payout=Sum('payout_sum', filter=scenario),
+    )
+    open_book = _totals(totals)
+    hit = _totals({'bets': totals['hit_bets'], 'stake': totals['hit_stake'], 'payout': totals['hit_payout']})
+    return {
+        'scenario': {
+            'teams': list(teams),
+            'matches': [list(match) for match in matches],
+            'competitions': list(competitions),
+            'bookmakers': list(bookmakers),
+        },
+        'worst_case_loss': hit['stake'],
+        'bets': hit['bets'],
+        'buckets': totals['hit_buckets'],
+        'forgone_payout': hit['potential_payout'],
+        'open': open_book,
+        'unaffected_stake': round(open_book['stake'] - hit['stake'], 2),
+    }
@@ -0,0 +1,297 @@
+# bets/feed.py
+"""
+Live odds feed: an asyncio consumer and a replay tool.
+
+FeedConsumer reads NDJSON price updates (the OddsIngester row format) from a
+tailed file or from producers connected to a local TCP or Unix socket. Lines
+go through a bounded queue: when the database falls behind, the queue fills
+and readers stop reading, which pushes back on the socket producers. Updates
+are coalesced per (match, market, selection, bookmaker), keeping the latest,
+and every `window` seconds (or `max_batch` keys) flushed in one transaction:
+OddsQuote rows are upserted with bulk_create(update_conflicts=True) and the
+observations appended to OddsSnapshot. Database work runs in Django's
+thread-sensitive sync_to_async thread, so the event loop never blocks on it.
+
+replay() drives a consumer from a recorded feed file, at the recorded pace
+(scaled by `speed`) or as fast as the consumer accepts.
+"""
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.utils import timezone
+
+from .importers import EntityCache, RowError, _clean_name, _parse_date
+from .models import OddsQuote, OddsSnapshot
+from .odds import build_snapshot
+
+
+# Fields identifying the price a feed update replaces
+COALESCE_FIELDS = ('sport', 'home_team', 'away_team', 'kickoff', 'bet_type', 'selection', 'bookmaker')
+
+_STOP = object()
+
+
+def write_quotes(rows, entities):
+    """Upsert the latest quotes and append them to the snapshot history; returns (written, row errors)"""
+    snapshots = []
+    errors = []
+    with transaction.atomic():
+        entities.resolve(rows)
+        for row in rows:
+            try:
+                snapshots.append(build_snapshot(row, entities))
+            except RowError as e:
+                errors.append(str(e))
+        OddsQuote.objects.bulk_create(
+            [
+                OddsQuote(**{field: getattr(snapshot, field) for field in OddsQuote.KEY_FIELDS},
+                          odds=snapshot.odds, observed_at=snapshot.observed_at)
+                for snapshot in snapshots
+            ],
+            update_conflicts=True,
+            unique_fields=OddsQuote.KEY_FIELDS,
+            update_fields=['odds', 'observed_at', 'updated_at'],
+        )
+        OddsSnapshot.objects.bulk_create(snapshots, ignore_conflicts=True)
+    return snapshots, errors
+
+
+class FeedMetrics:
+    """Throughput, coalescing, backpressure and lag counters of a FeedConsumer"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.received = 0
+        self.invalid = 0
+        self.superseded = 0
+        self.stale = 0
+        self.written = 0
+        self.rejected = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.backpressure_waits = 0
+        self.backpressure_seconds = 0.0
+        self.max_queue_depth = 0
+        self.last_lag_seconds = None
+        self.max_lag_seconds = 0.0
+
+    def as_dict(self):
+        elapsed = time.monotonic() - self.started
+        return {
+            'received': self.received,
+            'invalid': self.invalid,
+            'superseded': self.superseded,
+            'stale': self.stale,
+            'written': self.written,
+            'rejected': self.rejected,
+            'flushes': self.flushes,
+            'failed_flushes': self.failed_flushes,
+            'messages_per_second': round(self.received / elapsed, 1) if elapsed else 0,
+            'rows_per_second': round(self.written / elapsed, 1) if elapsed else 0,
+            'avg_flush_ms': round(self.flush_seconds * 1000 / self.flushes, 2) if self.flushes else 0,
+            'max_flush_ms': round(self.max_flush_seconds * 1000, 2),
+            'backpressure_waits': self.backpressure_waits,
+            'backpressure_seconds': round(self.backpressure_seconds, 3),
+            'max_queue_depth': self.max_queue_depth,
+            # Seconds from the bookmaker's observed_at to the row being committed
+            'last_lag_seconds': round(self.last_lag_seconds, 3) if self.last_lag_seconds is not None else None,
+            'max_lag_seconds': round(self.max_lag_seconds, 3),
+        }
+
+
+class FeedConsumer:
+    """Coalescing, batching consumer of NDJSON odds updates"""
+
+    def __init__(self, window=0.5, max_batch=5000, queue_size=10000, metrics_interval=None, on_metrics=None,
+                 on_error=None):
+        self.window = window
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.metrics = FeedMetrics()
+        self.metrics_interval = metrics_interval
+        self.on_metrics = on_metrics
+        self.on_error = on_error
+        self.entities = EntityCache(create_missing=False)
+        # observed_at of the last written update per price, so late arrivals never overwrite newer quotes
+        self.latest = {}
+        self._write = sync_to_async(write_quotes, thread_sensitive=True)
+
+    async def put(self, line):
+        """Queue one raw line, waiting (and counting the wait) while the queue is full"""
+        self.metrics.received += 1
+        if self.queue.full():
+            self.metrics.backpressure_waits += 1
+            started = time.monotonic()
+            await self.queue.put(line)
+            self.metrics.backpressure_seconds += time.monotonic() - started
+        else:
+            self.queue.put_nowait(line)
+        self.metrics.max_queue_depth = max(self.metrics.max_queue_depth, self.queue.qsize())
+
+    async def stop(self):
+        """Flush what is pending and end run()"""
+        await self.queue.put(_STOP)
+
+    async def run(self):
+        """Coalesce queued lines and flush them until stop() is called"""
+        reporter = asyncio.create_task(self._report()) if self.metrics_interval and self.on_metrics else None
+        loop = asyncio.get_running_loop()
+        pending = {}
+        deadline = None
+        try:
+            while True:
+                timeout = None if deadline is None else max(deadline - loop.time(), 0)
+                try:
+                    line = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    line = None
+                if line is _STOP:
+                    break
+                if line is not None and self._add(pending, line) and deadline is None:
+                    deadline = loop.time() + self.window
+                if pending and (len(pending) >= self.max_batch or loop.time() >= deadline):
+                    await self._flush(pending)
+                    pending = {}
+                    deadline = None
+            if pending:
+                await self._flush(pending)
+        finally:
+            if reporter:
+                reporter.cancel()
+            if self.on_metrics:
+                self.on_metrics(self.metrics.as_dict())
+
+    def _add(self, pending, line):
+        """Parse a line into pending, replacing an older update of the same price; False if invalid or stale"""
+        try:
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError("Row is not an object")
+            observed_at = _parse_date(row.get('observed_at'))
+        except (ValueError, RowError) as e:
+            self.metrics.invalid += 1
+            if self.on_error:
+                self.on_error(f"Invalid update: {e}")
+            return False
+
+        key = tuple(_clean_name(row.get(field)).lower() for field in COALESCE_FIELDS)
+        written = self.latest.get(key)
+        if written is not None and written >= observed_at:
+            self.metrics.stale += 1
+            return False
+        current = pending.get(key)
+        if current is not None:
+            self.metrics.superseded += 1
+            if current[0] > observed_at:
+                return True  # out of order: keep the newer price already pending
+        pending[key] = (observed_at, row)
+        return True
+
+    async def _flush(self, pending):
+        keys = list(pending)
+        rows = [row for _, row in pending.values()]
+        started = time.monotonic()
+        try:
+            snapshots, errors = await self._write(rows, self.entities)
+        except Exception as e:
+            # Keep consuming: a failed batch is reported, not fatal
+            self.metrics.failed_flushes += 1
+            if self.on_error:
+                self.on_error(f"Flush of {len(rows)} quotes failed: {e}")
+            return
+        duration = time.monotonic() - started
+        self.metrics.flushes += 1
+        self.metrics.flush_seconds += duration
+        self.metrics.max_flush_seconds = max(self.metrics.max_flush_seconds, duration)
+        self.metrics.written += len(snapshots)
+        self.metrics.rejected += len(errors)
+        for key in keys:
+            self.latest[key] = pending[key][0]
+        if self.on_error:
+            for message in errors[:10]:
+                self.on_error(message)
+        if snapshots:
+            now = timezone.now()
+            lag = max((now - snapshot.observed_at).total_seconds() for snapshot in snapshots)
+            self.metrics.last_lag_seconds = lag
+            self.metrics.max_lag_seconds = max(self.metrics.max_lag_seconds, lag)
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            self.on_metrics(self.metrics.as_dict())
+
+    async def read_file(self, path, follow=False, poll_interval=0.2):
+        """Queue every line of a file; with follow, keep tailing it for appended lines"""
+        with open(path, encoding='utf-8') as handle:
+            buffer = ''
+            while True:
+                line = handle.readline()
+                if line:
+                    buffer += line
+                    if buffer.endswith('\n'):
+                        if buffer.strip():
+                            await self.put(buffer)
+                        buffer = ''
+                    continue
+                if not follow:
+                    break
+                await asyncio.sleep(poll_interval)
+        if buffer.strip():
+            await self.put(buffer)
+
+    async def handle_connection(self, reader, writer):
+        """Queue the lines sent by one producer until it disconnects"""
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    await self.put(line.decode('utf-8'))
+        finally:
+            writer.close()
+
+    async def serve(self, host=None, port=None, path=None):
+        """Start accepting producers on a Unix socket (path) or a TCP host/port; returns the server"""
+        if path:
+            return await asyncio.start_unix_server(self.handle_connection, path=path)
+        return await asyncio.start_server(self.handle_connection, host=host or '127.0.0.1', port=port)
+
+
+async def replay(feed_path, host=None, port=None, path=None, speed=0.0):
+    """
+    Send a recorded NDJSON feed to a consumer socket; returns the number of lines sent.
+
+    With speed > 0 the gaps between observed_at values are reproduced, divided by speed;
+    with 0 lines are sent as fast as the consumer reads them.
+    """
+    if path:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host or '127.0.0.1', port)
+    sent = 0
+    previous = None
+    try:
+        with open(feed_path, encoding='utf-8') as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                if speed > 0:
+                    try:
+                        observed_at = _parse_date(json.loads(line).get('observed_at'))
+                    except (ValueError, RowError):
+                        observed_at = None
+                    if observed_at and previous and observed_at > previous:
+                        await asyncio.sleep((observed_at - previous).total_seconds() / speed)
+                    previous = observed_at or previous
+                writer.write(line.encode('utf-8') if line.endswith('\n') else (line + '\n').encode('utf-8'))
+                # Waits while the consumer's socket buffer is full (its queue is applying backpressure)
+                await writer.drain()
+                sent += 1
+    finally:
+        writer.close()
+        await writer.wait_closed()
+    return sent
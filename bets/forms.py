@@ -2,9 +2,36 @@
 from django import forms
 from django.core.exceptions import ValidationError
 from .models import Bet, Sport, Competition, Team, Bookmaker, BetType
+from django.urls import reverse_lazy
 from decimal import Decimal
 
 
+def check_bet_consistency(sport, competition, home_team, away_team):
+    """
+    Cross-field rules shared by BetForm and the bulk importer.
+    Compares sport ids only, so no related objects are loaded.
+    """
+    # Validate teams are different
+    if home_team and away_team and home_team.pk == away_team.pk:
+        raise ValidationError("A equipa da casa e visitante devem ser diferentes.")
+    
+    # Validate teams belong to the same sport
+    if home_team and away_team:
+        if home_team.sport_id != away_team.sport_id:
+            raise ValidationError("Ambas as equipas devem pertencer ao mesmo desporto.")
+    
+    # Validate competition belongs to the sport
+    if sport and competition and competition.sport_id != sport.pk:
+        raise ValidationError("A competição deve pertencer ao desporto selecionado.")
+    
+    # Validate teams belong to the sport
+    if sport and home_team and home_team.sport_id != sport.pk:
+        raise ValidationError("A equipa da casa deve pertencer ao desporto selecionado.")
+        
+    if sport and away_team and away_team.sport_id != sport.pk:
+        raise ValidationError("A equipa visitante deve pertencer ao desporto selecionado.")
+
+
 class BetForm(forms.ModelForm):
     class Meta:
         model = Bet
@@ -23,7 +50,15 @@ class BetForm(forms.ModelForm):
                 }
             ),
             'sport': forms.Select(attrs={'class': 'form-select'}),
-            'competition': forms.Select(attrs={'class': 'form-select'}),
+            # Reloaded with the chosen sport's competitions whenever the sport changes
+            'competition': forms.Select(
+                attrs={
+                    'class': 'form-select',
+                    'hx-get': reverse_lazy('bets:competition_options'),
+                    'hx-trigger': 'change from:#id_sport',
+                    'hx-include': '#id_sport',
+                }
+            ),
             'home_team': forms.Select(attrs={'class': 'form-select'}),
             'away_team': forms.Select(attrs={'class': 'form-select'}),
             'neutral_ground': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
@@ -96,12 +131,46 @@ class BetForm(forms.ModelForm):
         
         # Filter active items only
         self.fields['sport'].queryset = Sport.objects.filter(is_active=True)
-        self.fields['competition'].queryset = Competition.objects.filter(is_active=True)
-        self.fields['home_team'].queryset = Team.objects.filter(is_active=True)
-        self.fields['away_team'].queryset = Team.objects.filter(is_active=True)
         self.fields['bookmaker'].queryset = Bookmaker.objects.filter(is_active=True)
         self.fields['bet_type'].queryset = BetType.objects.filter(is_active=True)
 
+        # Competitions and teams only for the chosen sport (loaded by HTMX when it changes).
+        # Validating the choice is then a single lookup that also enforces the sport.
+        sport_id = self._selected_sport_id()
+        competitions = Competition.objects.filter(is_active=True)
+        teams = Team.objects.filter(is_active=True)
+        if sport_id is None:
+            competitions, teams = competitions.none(), teams.none()
+        else:
+            competitions = competitions.filter(sport_id=sport_id)
+            teams = teams.filter(sport_id=sport_id)
+
+        self.fields['competition'].queryset = competitions
+        self.fields['competition'].label_from_instance = lambda competition: competition.get_display_name()
+        self.fields['competition'].error_messages['invalid_choice'] = (
+            "A competição deve pertencer ao desporto selecionado."
+        )
+        for field_name, message in (
+            ('home_team', "A equipa da casa deve pertencer ao desporto selecionado."),
+            ('away_team', "A equipa visitante deve pertencer ao desporto selecionado."),
+        ):
+            self.fields[field_name].queryset = teams
+            self.fields[field_name].label_from_instance = lambda team: team.name
+            self.fields[field_name].error_messages['invalid_choice'] = message
+
+    def _selected_sport_id(self):
+        """Sport chosen in the submitted data, the initial data or the instance being edited"""
+        if self.is_bound:
+            value = self.data.get(self.add_prefix('sport'))
+        else:
+            value = self.initial.get('sport') or self.instance.sport_id
+        if isinstance(value, Sport):
+            return value.pk
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
     def clean(self):
         cleaned_data = super().clean()
         home_team = cleaned_data.get('home_team')
@@ -111,24 +180,6 @@ class BetForm(forms.ModelForm):
         estimated_probability = cleaned_data.get('estimated_probability')
         bookmaker_odds = cleaned_data.get('bookmaker_odds')
         
-        # Validate teams are different
-        if home_team and away_team and home_team == away_team:
-            raise ValidationError("A equipa da casa e visitante devem ser diferentes.")
-        
-        # Validate teams belong to the same sport
-        if home_team and away_team:
-            if home_team.sport != away_team.sport:
-                raise ValidationError("Ambas as equipas devem pertencer ao mesmo desporto.")
-        
-        # Validate competition belongs to the sport
-        if sport and competition and competition.sport != sport:
-            raise ValidationError("A competição deve pertencer ao desporto selecionado.")
-        
-        # Validate teams belong to the sport
-        if sport and home_team and home_team.sport != sport:
-            raise ValidationError("A equipa da casa deve pertencer ao desporto selecionado.")
-            
-        if sport and away_team and away_team.sport != sport:
-            raise ValidationError("A equipa visitante deve pertencer ao desporto selecionado.")
+        check_bet_consistency(sport, competition, home_team, away_team)
         
         return cleaned_data
\ No newline at end of file
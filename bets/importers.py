@@ -0,0 +1,378 @@
+# bets/importers.py
+"""
+Streaming bulk import of historical bets from CSV or NDJSON.
+
+Rows are read lazily and processed in chunks: related entities are resolved
+by name through in-memory lookup caches (missing ones are created in batches),
+each row is validated with the same rules as BetForm, and valid bets are
+inserted with bulk_create inside one transaction per chunk. Memory use is
+bounded by the chunk size and the number of distinct entities, not by the
+size of the file.
+"""
+import csv
+from datetime import datetime, time as dt_time
+import json
+import re
+import time
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .cache import bump_options_version_on_commit
+from .forms import check_bet_consistency
+from .models import Bet, BetType, Bookmaker, Competition, Sport, Team
+
+
+REQUIRED_COLUMNS = (
+    'date', 'sport', 'competition', 'home_team', 'away_team', 'bet_type',
+    'bookmaker', 'estimated_probability', 'bookmaker_odds', 'stake', 'confidence_level',
+)
+
+# Bet fields validated with the model field validators (same as BetForm)
+VALIDATED_FIELDS = ('estimated_probability', 'bookmaker_odds', 'stake', 'confidence_level', 'outcome', 'profit_loss')
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'sim', 's'}
+
+
+class RowError(Exception):
+    """A single input row that cannot be imported"""
+
+
+def iter_rows(handle, fmt):
+    """Yield (line_number, dict) pairs from a CSV or NDJSON file handle"""
+    if fmt == 'csv':
+        reader = csv.DictReader(handle)
+        missing = set(REQUIRED_COLUMNS) - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f"Missing CSV columns: {', '.join(sorted(missing))}")
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'ndjson':
+        for line_number, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, RowError(f"Invalid JSON: {e}")
+    else:
+        raise ValueError(f"Unknown format '{fmt}'")
+
+
+def _clean_name(value):
+    return str(value or '').strip()
+
+
+def _sport_code(name, taken):
+    """Unique short code derived from a sport name"""
+    base = re.sub(r'[^A-Z0-9]', '', name.upper())[:8] or 'SPORT'
+    code = base
+    suffix = 1
+    while code in taken:
+        suffix += 1
+        code = f"{base[:10 - len(str(suffix))]}{suffix}"
+    return code
+
+
+def _named(queryset, names):
+    """Rows of queryset whose name matches one of names, ignoring case like the cache keys"""
+    return queryset.annotate(lower_name=Lower('name')).filter(lower_name__in={name.lower() for name in names})
+
+
+class EntityCache:
+    """In-memory name -> instance lookups for the related models, filled and extended in batches"""
+
+    def __init__(self, create_missing=True):
+        self.create_missing = create_missing
+        self.sports = {}
+        self.competitions = {}
+        self.teams = {}
+        self.bookmakers = {}
+        self.bet_types = {}
+        self.created = {'sports': 0, 'competitions': 0, 'teams': 0, 'bookmakers': 0, 'bet_types': 0}
+
+    def resolve(self, rows):
+        """Make sure every entity referenced by rows is cached, creating missing ones"""
+        self._resolve_sports({_clean_name(row.get('sport')) for row in rows})
+        self._resolve_simple(
+            Bookmaker, self.bookmakers, 'bookmakers',
+            {_clean_name(row.get('bookmaker')) for row in rows}, {},
+        )
+        bet_type_defaults = {}
+        for row in rows:
+            category = _clean_name(row.get('bet_type_category')) or 'other'
+            bet_type_defaults.setdefault(_clean_name(row.get('bet_type')), {'category': category})
+        self._resolve_simple(BetType, self.bet_types, 'bet_types', set(bet_type_defaults), bet_type_defaults)
+
+        competitions = {}
+        teams = set()
+        for row in rows:
+            sport = self.sports.get(_clean_name(row.get('sport')).lower())
+            if sport is None:
+                continue
+            competitions.setdefault((sport.pk, _clean_name(row.get('competition'))), {
+                'division': _clean_name(row.get('competition_division')) or 'none',
+                'competition_type': _clean_name(row.get('competition_type')) or 'regular_season',
+            })
+            teams.add((sport.pk, _clean_name(row.get('home_team'))))
+            teams.add((sport.pk, _clean_name(row.get('away_team'))))
+        self._resolve_competitions(competitions)
+        self._resolve_teams(teams)
+
+    def _resolve_sports(self, names):
+        missing = self._missing(names, self.sports, str.lower)
+        if not missing:
+            return
+        self._load(_named(Sport.objects.all(), missing.values()), self.sports, lambda obj: obj.name.lower())
+        still_missing = self._missing(missing.values(), self.sports, str.lower)
+        if still_missing and self.create_missing:
+            taken = set(Sport.objects.values_list('code', flat=True))
+            new = []
+            for name in sorted(still_missing.values()):
+                code = _sport_code(name, taken)
+                taken.add(code)
+                new.append(Sport(name=name, code=code))
+            Sport.objects.bulk_create(new, ignore_conflicts=True)
+            self.created['sports'] += self._load(
+                _named(Sport.objects.all(), still_missing.values()), self.sports, lambda obj: obj.name.lower()
+            )
+
+    def _resolve_simple(self, model, cache, label, names, defaults):
+        missing = self._missing(names, cache, str.lower)
+        if not missing:
+            return
+        self._load(_named(model.objects.all(), missing.values()), cache, lambda obj: obj.name.lower())
+        still_missing = self._missing(missing.values(), cache, str.lower)
+        if still_missing and self.create_missing:
+            model.objects.bulk_create(
+                [model(name=name, **defaults.get(name, {})) for name in sorted(still_missing.values())],
+                ignore_conflicts=True,
+            )
+            self.created[label] += self._load(
+                _named(model.objects.all(), still_missing.values()), cache, lambda obj: obj.name.lower()
+            )
+
+    def _resolve_competitions(self, wanted):
+        missing = self._missing(wanted, self.competitions, self._competition_key)
+        if not missing:
+            return
+        query = _named(
+            Competition.objects.filter(sport_id__in={sport_id for sport_id, _ in missing.values()}),
+            {name for _, name in missing.values()},
+        )
+        self._load(query, self.competitions, lambda obj: (obj.sport_id, obj.name.lower()))
+        still_missing = self._missing(missing.values(), self.competitions, self._competition_key)
+        if still_missing and self.create_missing:
+            Competition.objects.bulk_create(
+                [
+                    Competition(sport_id=sport_id, name=name, **wanted[sport_id, name])
+                    for sport_id, name in still_missing.values()
+                ],
+                ignore_conflicts=True,
+            )
+            self.created['competitions'] += self._load(
+                query.all(), self.competitions, lambda obj: (obj.sport_id, obj.name.lower())
+            )
+            bump_options_version_on_commit()  # bulk_create sends no post_save
+
+    def _resolve_teams(self, wanted):
+        missing = self._missing(wanted, self.teams, self._team_key)
+        if not missing:
+            return
+        query = _named(
+            Team.objects.filter(sport_id__in={sport_id for sport_id, _ in missing.values()}),
+            {name for _, name in missing.values()},
+        )
+        self._load(query, self.teams, lambda obj: (obj.sport_id, obj.name.lower()))
+        still_missing = self._missing(missing.values(), self.teams, self._team_key)
+        if still_missing and self.create_missing:
+            Team.objects.bulk_create(
+                [Team(sport_id=sport_id, name=name) for sport_id, name in sorted(still_missing.values())],
+                ignore_conflicts=True,
+            )
+            self.created['teams'] += self._load(query.all(), self.teams, lambda obj: (obj.sport_id, obj.name.lower()))
+            bump_options_version_on_commit()  # bulk_create sends no post_save
+
+    @staticmethod
+    def _competition_key(key):
+        return key[0], key[1].lower()
+
+    _team_key = _competition_key
+
+    @staticmethod
+    def _missing(wanted, cache, key):
+        """Wanted names (or (sport, name) keys) not cached yet, by cache key; the first spelling of each wins"""
+        missing = {}
+        for name in sorted(wanted):
+            if (name[1] if isinstance(name, tuple) else name) and key(name) not in cache:
+                missing.setdefault(key(name), name)
+        return missing
+
+    @staticmethod
+    def _load(queryset, cache, key):
+        """Cache the rows of queryset; returns how many were not cached before"""
+        added = 0
+        for obj in queryset:
+            if key(obj) not in cache:
+                cache[key(obj)] = obj
+                added += 1
+        return added
+
+    def lookup(self, row):
+        """Cached (sport, competition, home_team, away_team, bet_type, bookmaker) for a row"""
+        sport = self.sports.get(_clean_name(row.get('sport')).lower())
+        if sport is None:
+            raise RowError(f"Unknown sport '{row.get('sport')}'")
+        competition = self.competitions.get((sport.pk, _clean_name(row.get('competition')).lower()))
+        home_team = self.teams.get((sport.pk, _clean_name(row.get('home_team')).lower()))
+        away_team = self.teams.get((sport.pk, _clean_name(row.get('away_team')).lower()))
+        bet_type = self.bet_types.get(_clean_name(row.get('bet_type')).lower())
+        bookmaker = self.bookmakers.get(_clean_name(row.get('bookmaker')).lower())
+        for label, value in (
+            ('competition', competition), ('home_team', home_team), ('away_team', away_team),
+            ('bet_type', bet_type), ('bookmaker', bookmaker),
+        ):
+            if value is None:
+                raise RowError(f"Unknown {label} '{row.get(label)}'")
+        return sport, competition, home_team, away_team, bet_type, bookmaker
+
+
+def _parse_date(value):
+    value = _clean_name(value)
+    try:
+        # Well-formed values naming a date or time that does not exist (2024-02-30) raise ValueError
+        parsed = parse_datetime(value)
+        day = parse_date(value) if parsed is None else None
+    except ValueError:
+        raise RowError(f"Invalid date '{value}'")
+    if parsed is None:
+        if day is None:
+            raise RowError(f"Invalid date '{value}'")
+        parsed = datetime.combine(day, dt_time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def build_bet(row, entities):
+    """Validate one input row and return an unsaved Bet, raising RowError when invalid"""
+    missing = [column for column in REQUIRED_COLUMNS if _clean_name(row.get(column)) == '']
+    if missing:
+        raise RowError(f"Missing values: {', '.join(missing)}")
+
+    sport, competition, home_team, away_team, bet_type, bookmaker = entities.lookup(row)
+
+    values = {}
+    raw_values = {
+        'estimated_probability': row.get('estimated_probability'),
+        'bookmaker_odds': row.get('bookmaker_odds'),
+        'stake': row.get('stake'),
+        'confidence_level': row.get('confidence_level'),
+        'outcome': _clean_name(row.get('outcome')).lower() or 'pending',
+        'profit_loss': row.get('profit_loss') if _clean_name(row.get('profit_loss')) else 0,
+    }
+    try:
+        for field_name in VALIDATED_FIELDS:
+            value = raw_values[field_name]
+            if isinstance(value, float):
+                # JSON numbers arrive as floats; go through str() to keep the written precision
+                value = str(value)
+            values[field_name] = Bet._meta.get_field(field_name).clean(value, None)
+        check_bet_consistency(sport, competition, home_team, away_team)
+    except ValidationError as e:
+        raise RowError('; '.join(e.messages))
+
+    return Bet(
+        date=_parse_date(row.get('date')),
+        sport=sport,
+        competition=competition,
+        home_team=home_team,
+        away_team=away_team,
+        bet_type=bet_type,
+        bookmaker=bookmaker,
+        kickoff=_parse_date(row['kickoff']) if _clean_name(row.get('kickoff')) else None,
+        selection=_clean_name(row.get('selection')),
+        neutral_ground=_clean_name(row.get('neutral_ground')).lower() in TRUE_VALUES,
+        bet_description=_clean_name(row.get('bet_description')),
+        notes=_clean_name(row.get('notes')),
+        **values,
+    )
+
+
+class BetImporter:
+    """Import bets from an iterable of (line_number, row) pairs in chunked transactions"""
+
+    def __init__(self, chunk_size=5000, batch_size=1000, dry_run=False, create_missing=True,
+                 max_errors=None, progress=None):
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.max_errors = max_errors
+        self.progress = progress
+        self.entities = EntityCache(create_missing=create_missing)
+        self.rows_read = 0
+        self.imported = 0
+        self.error_count = 0
+        self.errors = []  # first errors only, so memory stays flat
+        self.started = None
+
+    def run(self, rows):
+        self.started = time.monotonic()
+        chunk = []
+        for line_number, row in rows:
+            chunk.append((line_number, row))
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._import_chunk(chunk)
+        return self.imported
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started if self.started else 0
+
+    @property
+    def rows_per_second(self):
+        return self.rows_read / self.elapsed if self.elapsed else 0
+
+    def _record_error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < 100:
+            self.errors.append((line_number, message))
+        if self.max_errors is not None and self.error_count > self.max_errors:
+            raise RowError(f"Aborting after {self.error_count} invalid rows (line {line_number}: {message})")
+
+    def _import_chunk(self, chunk):
+        self.rows_read += len(chunk)
+        valid_rows = []
+        for line_number, row in chunk:
+            if isinstance(row, RowError):
+                self._record_error(line_number, str(row))
+            elif not isinstance(row, dict):
+                self._record_error(line_number, "Row is not an object")
+            else:
+                valid_rows.append((line_number, row))
+
+        with transaction.atomic():
+            self.entities.resolve([row for _, row in valid_rows])
+            bets = []
+            for line_number, row in valid_rows:
+                try:
+                    bets.append(build_bet(row, self.entities))
+                except RowError as e:
+                    self._record_error(line_number, str(e))
+
+            if bets and not self.dry_run:
+                Bet.objects.bulk_create(bets, batch_size=self.batch_size)
+            self.imported += len(bets)
+
+            if self.dry_run:
+                transaction.set_rollback(True)
+
+        if self.progress:
+            self.progress(self)
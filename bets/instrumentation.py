@@ -0,0 +1,156 @@
+# bets/instrumentation.py
+"""
+Per-request performance instrumentation.
+
+ServerTimingMiddleware counts SQL queries and measures DB, template and view
+time for every request, reports them in a Server-Timing header and logs one
+JSON line per request at INFO level on the 'bets.performance' logger. Views can declare a
+maximum number of queries with @query_budget(n); exceeding it is logged and,
+with BETS_QUERY_BUDGET_STRICT = True (as in tests), raises QueryBudgetExceeded.
+"""
+from contextlib import ExitStack
+import contextvars
+import functools
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection, connections
+from django.template.backends.django import Template as DjangoTemplate
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+
+logger = logging.getLogger('bets.performance')
+
+_current_timings = contextvars.ContextVar('bets_request_timings', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    """A view ran more SQL queries than its declared budget"""
+
+
+def query_budget(max_queries):
+    """Declare the maximum number of SQL queries a request to this view may run"""
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+class RequestTimings:
+    """Counters collected while a request is handled"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.rendering = False
+
+
+def _install_template_timer():
+    """Wrap Django template rendering once so it adds its duration to the current request"""
+    if getattr(DjangoTemplate.render, '_bets_timed', False):
+        return
+    original_render = DjangoTemplate.render
+
+    @functools.wraps(original_render)
+    def render(self, context=None, request=None):
+        timings = _current_timings.get()
+        # Templates rendered from inside another template are already being timed
+        if timings is None or timings.rendering:
+            return original_render(self, context, request)
+        timings.rendering = True
+        started = time.perf_counter()
+        try:
+            return original_render(self, context, request)
+        finally:
+            timings.template_time += time.perf_counter() - started
+            timings.rendering = False
+
+    render._bets_timed = True
+    DjangoTemplate.render = render
+
+
+class ServerTimingMiddleware:
+    """Server-Timing header, structured log line and query budget check for every request"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'BETS_SERVER_TIMING', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        _install_template_timer()
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        execute_wrapper = functools.partial(self._time_query, timings)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for db in connections.all():
+                    stack.enter_context(db.execute_wrapper(execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current_timings.reset(token)
+        total_time = time.perf_counter() - started
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timings.db_time * 1000:.2f};desc="{timings.queries} queries"',
+            f'tpl;dur={timings.template_time * 1000:.2f}',
+            f'view;dur={total_time * 1000:.2f}',
+        ])
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else None
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': view_name,
+            'status': response.status_code,
+            'queries': timings.queries,
+            'db_ms': round(timings.db_time * 1000, 2),
+            'template_ms': round(timings.template_time * 1000, 2),
+            'view_ms': round(total_time * 1000, 2),
+        }))
+
+        budget = getattr(match.func, 'query_budget', None) if match else None
+        if budget is not None and timings.queries > budget:
+            message = f'{view_name} ran {timings.queries} queries, over its budget of {budget}'
+            logger.warning(message)
+            if getattr(settings, 'BETS_QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(message)
+        return response
+
+    @staticmethod
+    def _time_query(timings, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            timings.queries += 1
+            timings.db_time += time.perf_counter() - started
+
+
+class QueryBudgetTestMixin:
+    """TestCase mixin asserting that a request stays within its view's @query_budget"""
+
+    def assertWithinQueryBudget(self, url, method='get', data=None, budget=None):
+        view = resolve(url.split('?', 1)[0]).func
+        if budget is None:
+            budget = getattr(view, 'query_budget', None)
+        if budget is None:
+            self.fail(f'{url} has no query budget; decorate its view with @query_budget(n)')
+
+        with CaptureQueriesContext(connection) as captured:
+            response = getattr(self.client, method)(url, data)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        executed = '\n'.join(query['sql'] for query in captured.captured_queries)
+        self.assertLessEqual(
+            len(captured), budget,
+            f'{url} ran {len(captured)} queries, over its budget of {budget}:\n{executed}',
+        )
+        return response
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+class RebuildCommand(BaseCommand):
+    """
+    Rebuild a BetBuckets table from Bet rows, or check it for drift with --check.
+
+    Subclasses set model, and bucket_name and table_name for the messages.
+    """
+
+    model = None
+    bucket_name = None
+    table_name = None
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help=f"Only compare the stored {self.table_name} with Bet rows and report drift; do not rebuild",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help=f"{self.bucket_name.capitalize()} rows inserted per bulk_create batch (default: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            drift = self.model.find_drift()
+            for item in drift[:20]:
+                self.stdout.write(f"  {item['key']}: expected={item['expected']} stored={item['stored']}")
+            if drift:
+                command = self.__module__.rsplit('.', 1)[-1]
+                raise CommandError(f"{len(drift)} {self.bucket_name} buckets drifted from Bet rows; run {command} to fix")
+            self.stdout.write(self.style.SUCCESS(f"No drift between the {self.table_name} and Bet rows."))
+            return
+
+        created = self.model.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} {self.bucket_name} buckets."))
@@ -0,0 +1,68 @@
+import json
+import math
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bets.backtest import STRATEGIES, backtest, expand_grid, load_history
+
+
+def _max_stake(value):
+    return None if value.lower() == 'none' else float(value)
+
+
+class Command(BaseCommand):
+    help = (
+        "Backtest flat, Kelly and confidence-weighted staking over the settled bets, sweeping a grid "
+        "of Kelly fractions, units and stake caps"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--strategy', nargs='+', choices=STRATEGIES, default=list(STRATEGIES),
+                            help="Strategies to test (default: all)")
+        parser.add_argument('--kelly-fraction', nargs='+', type=float, default=[0.25, 0.5, 1.0],
+                            help="Kelly multipliers (default: 0.25 0.5 1)")
+        parser.add_argument('--unit', nargs='+', type=float, default=[0.01],
+                            help="Flat/confidence stake as a fraction of the starting bankroll (default: 0.01)")
+        parser.add_argument('--max-stake', nargs='+', type=_max_stake, default=[None],
+                            help="Stake caps as a fraction of the current bankroll, or 'none' (default: none)")
+        parser.add_argument('--bankroll', type=float, default=1000.0, help="Starting bankroll (default: 1000)")
+        parser.add_argument('--workers', type=int, help="Worker processes (default: BETS_PARALLEL_WORKERS or one per CPU)")
+        parser.add_argument('--top', type=int, default=10, help="Configurations to print, best first (default: 10)")
+        parser.add_argument('--output', '-o', help="Also write the full result, with equity curves, as JSON to this file")
+
+    def handle(self, *args, **options):
+        if not 0 < options['bankroll'] < math.inf:
+            raise CommandError("--bankroll must be a positive finite number")
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError("--workers must be positive")
+        try:
+            configs = expand_grid(options['strategy'], options['kelly_fraction'], options['unit'], options['max_stake'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        history = load_history()
+        if not len(history['returns']):
+            raise CommandError("No settled bets to backtest.")
+
+        started = time.monotonic()
+        result = backtest(history, configs, bankroll=options['bankroll'], workers=options['workers'])
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(f"{result['bets']} bets, {len(configs)} configurations in {elapsed:.2f}s")
+        ranked = sorted(result['results'], key=lambda row: row['final_bankroll'], reverse=True)
+        for row in ranked[:options['top']]:
+            parameter = (
+                f"fraction {row['kelly_fraction']:g}" if row['strategy'] == 'kelly' else f"unit {row['unit']:g}"
+            )
+            cap = f"cap {row['max_stake']:g}" if row['max_stake'] is not None else "no cap"
+            self.stdout.write(
+                f"{row['strategy']:<10} {parameter:<15} {cap:<9} final {row['final_bankroll']:>12.2f}  "
+                f"ROI {row['roi']:>7.2f}%  max DD {row['max_drawdown']:>6.2f}%"
+                + ("  RUINED" if row['ruined'] else "")
+            )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                json.dump(result, handle, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results saved to {options['output']}"))
@@ -0,0 +1,81 @@
+import json
+import platform
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from bets.benchmarks import Benchmark
+from bets.models import Bet
+from bets.seeding import seed_bets
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the dashboard, chart endpoints, admin changelists and add-bet view at "
+        "several data sizes, on a throwaway test database, and save the results as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+            help="Bet counts to benchmark at (default: 10000 100000 1000000)",
+        )
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per target (default: 5)")
+        parser.add_argument('--warm', action='store_true', help="Time cache hits instead of clearing the cache before each run")
+        parser.add_argument('--seed', type=int, default=42, help="Random seed of the generated data")
+        parser.add_argument('--output', '-o', help="JSON results file (default: benchmark-<timestamp>.json)")
+
+    def handle(self, *args, **options):
+        sizes = sorted(set(options['sizes']))
+        if sizes[0] < 1 or options['repeat'] < 1:
+            raise CommandError("--sizes and --repeat must be positive")
+        output = options['output'] or f"benchmark-{timezone.now():%Y%m%d-%H%M%S}.json"
+
+        report = {
+            'meta': {
+                'started_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'repeat': options['repeat'],
+                'warm_cache': options['warm'],
+                'seed': options['seed'],
+            },
+            'results': [],
+        }
+
+        # Never touch the configured database: create a test database and drop it afterwards
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            for size in sizes:
+                self._grow_to(size, options['seed'])
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{size} bets"))
+                benchmark = Benchmark(repeat=options['repeat'], warm=options['warm'])
+                for result in benchmark.run():
+                    result['bets'] = size
+                    report['results'].append(result)
+                    self.stdout.write(
+                        f"  {result['name']:<28} {result['median_ms']:>10.1f} ms median "
+                        f"{result['p95_ms']:>10.1f} ms p95 {result['queries']:>5} queries  [{result['status']}]"
+                    )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        with open(output, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results saved to {output}"))
+
+    def _grow_to(self, size, seed):
+        missing = size - Bet.objects.count()
+        if missing <= 0:
+            return
+        self.stdout.write(f"Seeding {missing} bets...")
+        started = time.monotonic()
+        seed_bets(missing, seed=seed + size)
+        self.stdout.write(f"Seeded in {time.monotonic() - started:.1f}s")
@@ -0,0 +1,75 @@
+import asyncio
+import json
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bets.feed import FeedConsumer
+
+
+class Command(BaseCommand):
+    help = (
+        "Consume a live NDJSON odds feed from a tailed file or a local TCP/Unix socket, coalescing "
+        "updates per price and upserting them in batches (OddsQuote, OddsSnapshot)"
+    )
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument('--file', help="NDJSON file to read")
+        source.add_argument('--socket', help="Unix socket path to listen on for producers")
+        source.add_argument('--port', type=int, help="TCP port to listen on for producers")
+        parser.add_argument('--host', default='127.0.0.1', help="TCP address to listen on (default: 127.0.0.1)")
+        parser.add_argument('--follow', action='store_true', help="Keep tailing --file for new lines")
+        parser.add_argument('--window', type=float, default=0.5, help="Seconds updates are coalesced before a flush")
+        parser.add_argument('--max-batch', type=int, default=5000, help="Flush early once this many prices are pending")
+        parser.add_argument('--queue-size', type=int, default=10000, help="Lines buffered before producers are slowed down")
+        parser.add_argument('--metrics-interval', type=float, default=10, help="Seconds between metrics lines (0: only at exit)")
+        parser.add_argument('--duration', type=float, help="Stop after this many seconds")
+
+    def handle(self, *args, **options):
+        if options['window'] <= 0 or options['max_batch'] < 1 or options['queue_size'] < 1:
+            raise CommandError("--window, --max-batch and --queue-size must be positive")
+        try:
+            asyncio.run(self._consume(options))
+        except OSError as e:
+            raise CommandError(str(e))
+
+    async def _consume(self, options):
+        consumer = FeedConsumer(
+            window=options['window'],
+            max_batch=options['max_batch'],
+            queue_size=options['queue_size'],
+            metrics_interval=options['metrics_interval'] or None,
+            on_metrics=lambda metrics: self.stdout.write(json.dumps(metrics)),
+            on_error=self.stderr.write,
+        )
+        running = asyncio.create_task(consumer.run())
+        stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stopped.set)
+
+        server = None
+        if options['file']:
+            reading = asyncio.create_task(consumer.read_file(options['file'], follow=options['follow']))
+            reading.add_done_callback(lambda task: stopped.set())
+        else:
+            server = await consumer.serve(host=options['host'], port=options['port'], path=options['socket'])
+            where = options['socket'] or f"{options['host']}:{options['port']}"
+            self.stdout.write(f"Listening on {where}")
+
+        try:
+            await asyncio.wait_for(stopped.wait(), options['duration'])
+        except asyncio.TimeoutError:
+            pass
+        if server:
+            server.close()
+        elif not reading.done():
+            reading.cancel()
+        elif reading.exception():
+            raise reading.exception()
+        await consumer.stop()
+        await running
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {consumer.metrics.written} quotes from {consumer.metrics.received} updates."
+        ))
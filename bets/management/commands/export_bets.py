@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bets.exports import EXPORT_FORMATS, export_queryset, iter_export
+
+
+class Command(BaseCommand):
+    help = "Stream the bet ledger as CSV or NDJSON to a file or stdout, in constant memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=tuple(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help="Output file (default: stdout)")
+        parser.add_argument('--start', help="First day to export (YYYY-MM-DD)")
+        parser.add_argument('--end', help="Last day to export (YYYY-MM-DD)")
+        parser.add_argument('--sport', help="Sport id or name")
+        parser.add_argument('--bookmaker', help="Bookmaker id or name")
+        parser.add_argument('--outcome', help="Only bets with this outcome")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Rows fetched per database round trip")
+
+    def handle(self, *args, **options):
+        try:
+            queryset = export_queryset(
+                start=options['start'],
+                end=options['end'],
+                sport=options['sport'],
+                bookmaker=options['bookmaker'],
+                outcome=options['outcome'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        chunks = iter_export(queryset, options['format'], chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as handle:
+                written = self._write(chunks, handle)
+            if options['format'] == 'csv':
+                written -= 1  # header line
+            self.stderr.write(self.style.SUCCESS(f"Exported {written} bets to {options['output']}."))
+        else:
+            # Every chunk ends with a newline, so the wrapper does not add another
+            self._write(chunks, self.stdout)
+
+    def _write(self, chunks, handle):
+        """Write every chunk (one line each) and return the number of lines written"""
+        lines = 0
+        for chunk in chunks:
+            handle.write(chunk)
+            lines += 1
+        return lines
@@ -0,0 +1,76 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bets.importers import BetImporter, RowError, iter_rows
+
+
+FORMATS_BY_EXTENSION = {
+    '.csv': 'csv',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Import historical bets from a CSV or NDJSON file. Rows are streamed and "
+        "inserted in chunks; missing sports, competitions, teams, bookmakers and "
+        "bet types are created by name."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or NDJSON (.ndjson/.jsonl) file to import")
+        parser.add_argument('--format', choices=('csv', 'ndjson'), help="Input format (default: from the file extension)")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Rows validated and committed per transaction")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows per INSERT statement")
+        parser.add_argument('--dry-run', action='store_true', help="Validate everything and roll back each chunk")
+        parser.add_argument('--strict', action='store_true', help="Abort on the first invalid row")
+        parser.add_argument('--no-create', action='store_true', help="Reject rows referencing unknown entities instead of creating them")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or FORMATS_BY_EXTENSION.get(os.path.splitext(path)[1].lower())
+        if fmt is None:
+            raise CommandError("Cannot infer the format from the file extension; use --format")
+        if options['chunk_size'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--chunk-size and --batch-size must be positive")
+
+        importer = BetImporter(
+            chunk_size=options['chunk_size'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            create_missing=not options['no_create'],
+            max_errors=0 if options['strict'] else None,
+            progress=self._report_progress,
+        )
+
+        try:
+            with open(path, newline='', encoding='utf-8') as handle:
+                importer.run(iter_rows(handle, fmt))
+        except OSError as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+        except (ValueError, RowError) as e:
+            raise CommandError(str(e))
+
+        for line_number, message in importer.errors:
+            self.stderr.write(f"Line {line_number}: {message}")
+        if importer.error_count > len(importer.errors):
+            self.stderr.write(f"... and {importer.error_count - len(importer.errors)} more invalid rows")
+
+        created = ', '.join(f"{count} {label}" for label, count in importer.entities.created.items() if count)
+        verb = "Validated" if options['dry_run'] else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {importer.imported} of {importer.rows_read} rows in {importer.elapsed:.1f}s "
+            f"({importer.rows_per_second:.0f} rows/s)."
+        ))
+        if created:
+            self.stdout.write(f"Created {created}.")
+        if importer.error_count:
+            self.stdout.write(self.style.WARNING(f"Skipped {importer.error_count} invalid rows."))
+
+    def _report_progress(self, importer):
+        self.stdout.write(
+            f"{importer.rows_read} rows read, {importer.imported} valid "
+            f"({importer.rows_per_second:.0f} rows/s)"
+        )
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bets.importers import RowError, iter_rows
+from bets.models import Bet
+from bets.odds import OddsIngester, link_closing_lines
+
+
+class Command(BaseCommand):
+    help = (
+        "Append odds snapshots from an NDJSON file (one price observation per line) and link "
+        "the bets of the ingested matches to their closing prices"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="NDJSON file with sport, home_team, away_team, kickoff, bet_type, "
+                                         "selection, bookmaker, observed_at and odds on every line")
+        parser.add_argument('--chunk-size', type=int, default=20000, help="Rows validated and committed per transaction")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per INSERT statement")
+        parser.add_argument('--strict', action='store_true', help="Abort on the first invalid row")
+        parser.add_argument('--no-link', action='store_true', help="Do not update closing odds and CLV of the bets")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--chunk-size and --batch-size must be positive")
+
+        ingester = OddsIngester(
+            chunk_size=options['chunk_size'],
+            batch_size=options['batch_size'],
+            max_errors=0 if options['strict'] else None,
+            progress=self._report_progress,
+        )
+        try:
+            with open(options['path'], encoding='utf-8') as handle:
+                ingester.run(iter_rows(handle, 'ndjson'))
+        except OSError as e:
+            raise CommandError(f"Cannot read {options['path']}: {e}")
+        except RowError as e:
+            raise CommandError(str(e))
+
+        for line_number, message in ingester.errors:
+            self.stderr.write(f"Line {line_number}: {message}")
+        if ingester.error_count > len(ingester.errors):
+            self.stderr.write(f"... and {ingester.error_count - len(ingester.errors)} more invalid rows")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Ingested {ingester.ingested} of {ingester.rows_read} rows in {ingester.elapsed:.1f}s "
+            f"({ingester.rows_per_second:.0f} rows/s, duplicates ignored)."
+        ))
+        if ingester.error_count:
+            self.stdout.write(self.style.WARNING(f"Skipped {ingester.error_count} invalid rows."))
+
+        if not options['no_link'] and ingester.first_kickoff is not None:
+            linked = link_closing_lines(
+                Bet.objects.filter(kickoff__range=(ingester.first_kickoff, ingester.last_kickoff))
+            )
+            self.stdout.write(f"Updated the closing line of {linked} bets.")
+
+    def _report_progress(self, ingester):
+        self.stdout.write(f"{ingester.rows_read} rows read, {ingester.ingested} valid ({ingester.rows_per_second:.0f} rows/s)")
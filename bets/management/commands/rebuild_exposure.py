@@ -0,0 +1,9 @@
+from bets.management.commands._rebuild import RebuildCommand
+from bets.models import BetExposure
+
+
+class Command(RebuildCommand):
+    help = "Rebuild the BetExposure ledger from pending Bet rows, or check it for drift with --check"
+    model = BetExposure
+    bucket_name = 'exposure'
+    table_name = 'exposure ledger'
@@ -0,0 +1,9 @@
+from bets.management.commands._rebuild import RebuildCommand
+from bets.models import BetDailyRollup
+
+
+class Command(RebuildCommand):
+    help = "Rebuild the BetDailyRollup table from Bet rows, or check it for drift with --check"
+    model = BetDailyRollup
+    bucket_name = 'rollup'
+    table_name = 'rollups'
@@ -0,0 +1,37 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bets.feed import replay
+
+
+class Command(BaseCommand):
+    help = "Replay a recorded NDJSON odds feed into a running consume_odds_feed over its socket"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Recorded NDJSON feed")
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--socket', help="Unix socket of the consumer")
+        target.add_argument('--port', type=int, help="TCP port of the consumer")
+        parser.add_argument('--host', default='127.0.0.1', help="TCP address of the consumer (default: 127.0.0.1)")
+        parser.add_argument(
+            '--speed', type=float, default=0,
+            help="Replay the recorded observed_at gaps this many times faster (default 0: as fast as possible)",
+        )
+
+    def handle(self, *args, **options):
+        if options['speed'] < 0:
+            raise CommandError("--speed cannot be negative")
+        started = time.monotonic()
+        try:
+            sent = asyncio.run(replay(
+                options['path'], host=options['host'], port=options['port'], path=options['socket'],
+                speed=options['speed'],
+            ))
+        except OSError as e:
+            raise CommandError(str(e))
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {sent} updates in {elapsed:.1f}s ({sent / elapsed if elapsed else 0:.0f} updates/s)."
+        ))
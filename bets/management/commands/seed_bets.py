@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bets.seeding import seed_bets
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate realistic synthetic data: sports, competitions, teams, bookmakers, "
+        "bet types and --count bets (bulk inserted, rollups kept up to date)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10000, help="Number of bets to create (default: 10000)")
+        parser.add_argument('--seed', type=int, help="Random seed, for reproducible datasets")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Bets per bulk_create transaction")
+
+    def handle(self, *args, **options):
+        if options['count'] < 0 or options['batch_size'] < 1:
+            raise CommandError("--count must be >= 0 and --batch-size positive")
+
+        started = time.monotonic()
+
+        def progress(created):
+            elapsed = time.monotonic() - started
+            self.stdout.write(f"{created}/{options['count']} bets ({created / elapsed:.0f} bets/s)")
+
+        created = seed_bets(
+            options['count'], seed=options['seed'], batch_size=options['batch_size'], progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Created {created} bets in {time.monotonic() - started:.1f}s."))
@@ -0,0 +1,51 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bets.models import Bet
+from bets.settlement import SETTLED_OUTCOMES, settle_bets, settle_results
+
+
+class Command(BaseCommand):
+    help = (
+        "Settle pending bets in bulk: either --outcome with --ids, "
+        "or --file with a CSV of bet_id,outcome rows"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--outcome', choices=SETTLED_OUTCOMES, help="Outcome applied to every bet in --ids")
+        parser.add_argument('--ids', nargs='+', type=int, help="Ids of the bets to settle with --outcome")
+        parser.add_argument('--file', help="CSV file with bet_id,outcome columns (header row required)")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Bets per UPDATE when using --file")
+
+    def handle(self, *args, **options):
+        if options['file']:
+            results = self._read_results(options['file'])
+            settled = settle_results(results, batch_size=options['batch_size'])
+            requested = len(results)
+        elif options['outcome'] and options['ids']:
+            settled = settle_bets(Bet.objects.filter(pk__in=options['ids']), options['outcome'])
+            requested = len(set(options['ids']))
+        else:
+            raise CommandError("Use --outcome with --ids, or --file")
+
+        skipped = requested - settled
+        self.stdout.write(self.style.SUCCESS(f"Settled {settled} bets."))
+        if skipped:
+            self.stdout.write(self.style.WARNING(f"{skipped} bets were not pending or do not exist."))
+
+    def _read_results(self, path):
+        results = {}
+        with open(path, newline='', encoding='utf-8') as handle:
+            reader = csv.DictReader(handle)
+            if not reader.fieldnames or not {'bet_id', 'outcome'} <= set(reader.fieldnames):
+                raise CommandError("CSV must have 'bet_id' and 'outcome' columns")
+            for line, row in enumerate(reader, start=2):
+                outcome = row['outcome'].strip().lower()
+                if outcome not in SETTLED_OUTCOMES:
+                    raise CommandError(f"Line {line}: invalid outcome '{row['outcome']}'")
+                try:
+                    results[int(row['bet_id'])] = outcome
+                except ValueError:
+                    raise CommandError(f"Line {line}: invalid bet_id '{row['bet_id']}'")
+        return results
@@ -0,0 +1,55 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bets.simulation import SOURCES, load_selections, simulate
+
+
+class Command(BaseCommand):
+    help = (
+        "Monte Carlo simulation of pending or historical bets: outcomes drawn from their estimated "
+        "probability, P/L distribution, percentile bands and risk of ruin"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', choices=SOURCES, default='pending', help="Bets to simulate (default: pending)")
+        parser.add_argument('--paths', type=int, default=100000, help="Simulated seasons (default: 100000)")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed gives the same result")
+        parser.add_argument('--bankroll', type=float, help="Starting bankroll, to report the risk of ruin")
+        parser.add_argument('--workers', type=int, help="Worker processes (default: BETS_PARALLEL_WORKERS or one per CPU)")
+        parser.add_argument('--output', '-o', help="Also write the full result as JSON to this file")
+
+    def handle(self, *args, **options):
+        if options['paths'] < 1 or options['seed'] < 0:
+            raise CommandError("--paths must be positive and --seed non-negative")
+        if options['bankroll'] is not None and options['bankroll'] <= 0:
+            raise CommandError("--bankroll must be positive")
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError("--workers must be positive")
+
+        probabilities, odds, stakes = load_selections(options['source'])
+        if not len(probabilities):
+            raise CommandError(f"No {options['source']} bets to simulate.")
+
+        started = time.monotonic()
+        result = simulate(
+            probabilities, odds, stakes,
+            paths=options['paths'], seed=options['seed'], bankroll=options['bankroll'], workers=options['workers'],
+        )
+        elapsed = time.monotonic() - started
+
+        percentiles = result['percentiles']
+        self.stdout.write(f"{result['bets']} bets, {result['paths']} paths in {elapsed:.2f}s")
+        self.stdout.write(f"Expected P/L: {result['expected_profit']:.2f}  simulated mean: {result['mean_profit']:.2f}")
+        self.stdout.write(
+            f"P/L percentiles: p5 {percentiles['p5']:.2f}  p50 {percentiles['p50']:.2f}  p95 {percentiles['p95']:.2f}"
+        )
+        self.stdout.write(f"Probability of profit: {result['probability_of_profit']:.2f}%")
+        if result['risk_of_ruin'] is not None:
+            self.stdout.write(f"Risk of ruin: {result['risk_of_ruin']:.2f}%")
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                json.dump(result, handle, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results saved to {options['output']}"))
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:43
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def populate_rollups(apps, schema_editor):
+    Bet = apps.get_model('bets', 'Bet')
+    BetDailyRollup = apps.get_model('bets', 'BetDailyRollup')
+    expected_value = models.ExpressionWrapper(
+        models.F('stake') * (
+            models.F('estimated_probability') * models.F('bookmaker_odds') * models.Value(Decimal('0.01')) - 1
+        ),
+        output_field=models.DecimalField(max_digits=16, decimal_places=4)
+    )
+    rows = (
+        Bet.objects.order_by()
+        .annotate(day=TruncDate('date'), bet_type_category=models.F('bet_type__category'))
+        .values('day', 'sport_id', 'competition_id', 'bookmaker_id', 'bet_type_category', 'outcome')
+        .annotate(
+            bet_count=models.Count('id'),
+            stake_sum=models.Sum('stake'),
+            profit_loss_sum=models.Sum('profit_loss'),
+            expected_value_sum=models.Sum(expected_value),
+            odds_sum=models.Sum('bookmaker_odds'),
+        )
+    )
+    BetDailyRollup.objects.bulk_create(
+        (BetDailyRollup(**row) for row in rows.iterator(chunk_size=2000)),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bets', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BetDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('bet_type_category', models.CharField(choices=[('match_result', 'Match Result'), ('over_goals', 'Over Goals'), ('under_goals', 'Under Goals'), ('both_to_score', 'Both Teams to Score'), ('player', 'Player Markets'), ('handicap', 'Handicap'), ('total_points', 'Total Points'), ('set_games', 'Sets/Games'), ('other', 'Other')], max_length=50)),
+                ('outcome', models.CharField(choices=[('win', 'Win'), ('loss', 'Loss'), ('push', 'Push'), ('void', 'Void'), ('pending', 'Pending')], max_length=10)),
+                ('bet_count', models.IntegerField(default=0)),
+                ('stake_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('profit_loss_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('expected_value_sum', models.DecimalField(decimal_places=4, default=0, max_digits=16)),
+                ('odds_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('bookmaker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='bets.bookmaker')),
+                ('competition', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='bets.competition')),
+                ('sport', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='bets.sport')),
+            ],
+            options={
+                'ordering': ['day'],
+                'indexes': [models.Index(fields=['day', 'outcome'], name='bets_betdai_day_b20273_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='betdailyrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'sport', 'competition', 'bookmaker', 'bet_type_category', 'outcome'), name='unique_bet_daily_rollup_bucket'),
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:47
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models.functions import Round, TruncDate
+
+
+def backfill_analytics(apps, schema_editor):
+    """Fill the new columns in one UPDATE and resync the rollup EV sums with them"""
+    Bet = apps.get_model('bets', 'Bet')
+    BetDailyRollup = apps.get_model('bets', 'BetDailyRollup')
+
+    def decimal(expression, max_digits):
+        return models.ExpressionWrapper(
+            Round(expression, 2), output_field=models.DecimalField(max_digits=max_digits, decimal_places=2)
+        )
+
+    cent = models.Value(Decimal('0.01'))
+    implied = 1 / (models.F('bookmaker_odds') * cent)
+    Bet.objects.update(
+        implied_probability=decimal(implied, 5),
+        bookmaker_edge=decimal(implied - models.F('estimated_probability'), 6),
+        expected_value=decimal(
+            models.F('stake') * (models.F('estimated_probability') * models.F('bookmaker_odds') * cent - 1), 12
+        ),
+        potential_payout=decimal(models.F('stake') * models.F('bookmaker_odds'), 12),
+        roi=decimal(models.F('profit_loss') / (models.F('stake') * cent), 8),
+    )
+
+    BetDailyRollup.objects.all().delete()
+    rows = (
+        Bet.objects.order_by()
+        .annotate(day=TruncDate('date'), bet_type_category=models.F('bet_type__category'))
+        .values('day', 'sport_id', 'competition_id', 'bookmaker_id', 'bet_type_category', 'outcome')
+        .annotate(
+            bet_count=models.Count('id'),
+            stake_sum=models.Sum('stake'),
+            profit_loss_sum=models.Sum('profit_loss'),
+            expected_value_sum=models.Sum('expected_value'),
+            odds_sum=models.Sum('bookmaker_odds'),
+        )
+    )
+    BetDailyRollup.objects.bulk_create(
+        (BetDailyRollup(**row) for row in rows.iterator(chunk_size=2000)),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bets', '0002_bet_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bet',
+            name='bookmaker_edge',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Implied minus estimated probability (%)', max_digits=6),
+        ),
+        migrations.AddField(
+            model_name='bet',
+            name='expected_value',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Expected Value (€)', max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='bet',
+            name='implied_probability',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Implied probability from bookmaker odds (%)', max_digits=5),
+        ),
+        migrations.AddField(
+            model_name='bet',
+            name='potential_payout',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Stake * odds (€)', max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='bet',
+            name='roi',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Return on Investment (%)', max_digits=8),
+        ),
+        migrations.RunPython(backfill_analytics, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='bet',
+            index=models.Index(fields=['expected_value'], name='bets_bet_expecte_1d42f6_idx'),
+        ),
+    ]
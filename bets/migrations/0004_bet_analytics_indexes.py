@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bets', '0003_bet_stored_analytics'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='bet',
+            name='bets_bet_outcome_2a1af8_idx',
+        ),
+        migrations.AddIndex(
+            model_name='bet',
+            index=models.Index(fields=['outcome', 'date'], name='bet_outcome_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bet',
+            index=models.Index(fields=['sport', 'outcome', 'date'], name='bet_sport_outcome_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bet',
+            index=models.Index(fields=['bookmaker', 'outcome'], name='bet_bookmaker_outcome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bet',
+            index=models.Index(condition=models.Q(('outcome', 'pending')), fields=['date'], name='bet_pending_date_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:11
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bets', '0004_bet_analytics_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bet',
+            name='closing_odds',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, help_text='Last price of this bookmaker before kickoff (see bets.odds)', max_digits=6, null=True),
+        ),
+        migrations.AddField(
+            model_name='bet',
+            name='clv',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, help_text='Closing line value: odds taken over closing odds, minus 1 (%)', max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='bet',
+            name='kickoff',
+            field=models.DateTimeField(blank=True, help_text='When the event starts', null=True),
+        ),
+        migrations.AddField(
+            model_name='bet',
+            name='selection',
+            field=models.CharField(blank=True, help_text="Selection within the market, e.g. 'home' or 'over 2.5'", max_length=50),
+        ),
+        migrations.CreateModel(
+            name='OddsSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kickoff', models.DateTimeField()),
+                ('selection', models.CharField(max_length=50)),
+                ('observed_at', models.DateTimeField()),
+                ('odds', models.DecimalField(decimal_places=2, max_digits=6, validators=[django.core.validators.MinValueValidator(1.01)])),
+                ('away_team', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='bets.team')),
+                ('bet_type', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='bets.bettype')),
+                ('bookmaker', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='bets.bookmaker')),
+                ('home_team', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='bets.team')),
+            ],
+            options={
+                'ordering': ['-observed_at'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='oddssnapshot',
+            constraint=models.UniqueConstraint(fields=('home_team', 'away_team', 'kickoff', 'bet_type', 'selection', 'bookmaker', 'observed_at'), name='odds_snapshot_unique'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:13
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bets', '0005_odds_snapshots_and_clv'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OddsQuote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kickoff', models.DateTimeField()),
+                ('selection', models.CharField(max_length=50)),
+                ('odds', models.DecimalField(decimal_places=2, max_digits=6, validators=[django.core.validators.MinValueValidator(1.01)])),
+                ('observed_at', models.DateTimeField(help_text='When the bookmaker offered this price')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='When the feed last wrote this row')),
+                ('away_team', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='bets.team')),
+                ('bet_type', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='bets.bettype')),
+                ('bookmaker', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='bets.bookmaker')),
+                ('home_team', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='bets.team')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='oddsquote',
+            constraint=models.UniqueConstraint(fields=('home_team', 'away_team', 'kickoff', 'bet_type', 'selection', 'bookmaker'), name='odds_quote_unique'),
+        ),
+    ]
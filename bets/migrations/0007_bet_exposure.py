@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_exposure(apps, schema_editor):
+    Bet = apps.get_model('bets', 'Bet')
+    BetExposure = apps.get_model('bets', 'BetExposure')
+    rows = (
+        Bet.objects.filter(outcome='pending').order_by()
+        .values('home_team_id', 'away_team_id', 'kickoff', 'competition_id', 'bookmaker_id')
+        .annotate(
+            bet_count=models.Count('id'),
+            stake_sum=models.Sum('stake'),
+            payout_sum=models.Sum('potential_payout'),
+        )
+    )
+    BetExposure.objects.bulk_create(
+        (BetExposure(**row) for row in rows.iterator(chunk_size=2000)),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bets', '0006_odds_quote'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BetExposure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kickoff', models.DateTimeField(blank=True, null=True)),
+                ('bet_count', models.IntegerField(default=0)),
+                ('stake_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('payout_sum', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('away_team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='away_exposures', to='bets.team')),
+                ('bookmaker', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exposures', to='bets.bookmaker')),
+                ('competition', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exposures', to='bets.competition')),
+                ('home_team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='home_exposures', to='bets.team')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='betexposure',
+            constraint=models.UniqueConstraint(fields=('home_team', 'away_team', 'kickoff', 'competition', 'bookmaker'), name='unique_bet_exposure_bucket'),
+        ),
+        migrations.RunPython(populate_exposure, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:30
+
+import time
+
+from django.db import migrations, models
+
+
+def create_versions(apps, schema_editor):
+    CacheVersion = apps.get_model('bets', 'CacheVersion')
+    # Time-based start, so the keys of payloads cached before the upgrade are never reused
+    seed = time.time_ns() // 1000
+    CacheVersion.objects.bulk_create([CacheVersion(name='bets', version=seed), CacheVersion(name='options', version=seed)])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bets', '0007_bet_exposure'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('version', models.BigIntegerField()),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
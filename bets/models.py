@@ -1,8 +1,80 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Round, TruncDate
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
 from django.core.validators import MinValueValidator, MaxValueValidator
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
+from datetime import datetime, time, timedelta
 from django.utils import timezone
 
+from .cache import bump_bets_version_on_commit, bump_options_version_on_commit
+
+
+# Outcomes of a settled bet; filter with outcome__in=SETTLED_OUTCOMES rather than excluding 'pending',
+# which the (outcome, ...) indexes cannot serve
+SETTLED_OUTCOMES = ('win', 'loss', 'push', 'void')
+
+# Bet fields that feed BetDailyRollup; bulk updates touching any of them refresh the rollups
+ROLLUP_SOURCE_FIELDS = {
+    'date', 'sport', 'sport_id', 'competition', 'competition_id', 'bookmaker', 'bookmaker_id',
+    'bet_type', 'bet_type_id', 'outcome', 'stake', 'profit_loss', 'estimated_probability', 'bookmaker_odds',
+}
+
+
+def derived_field_expressions(stake=None, odds=None, probability=None, profit_loss=None, closing_odds=None):
+    """
+    SQL expressions for the stored analytics columns of Bet, matching Bet.calculate_analytics().
+
+    Source columns default to the current row values; pass an expression or value
+    to compute the columns from what an UPDATE is about to write instead.
+    """
+    stake = stake if stake is not None else models.F('stake')
+    odds = odds if odds is not None else models.F('bookmaker_odds')
+    probability = probability if probability is not None else models.F('estimated_probability')
+    profit_loss = profit_loss if profit_loss is not None else models.F('profit_loss')
+    closing_odds = closing_odds if closing_odds is not None else models.F('closing_odds')
+
+    def decimal(expression, max_digits):
+        return models.ExpressionWrapper(
+            Round(expression, 2), output_field=models.DecimalField(max_digits=max_digits, decimal_places=2)
+        )
+
+    # Scaling by a non-integral literal keeps SQLite from falling back to integer division
+    cent = models.Value(Decimal('0.01'))
+    implied = 1 / (odds * cent)
+    return {
+        'implied_probability': decimal(implied, 5),
+        'bookmaker_edge': decimal(implied - probability, 6),
+        'expected_value': decimal(stake * (probability * odds * cent - 1), 12),
+        'potential_payout': decimal(stake * odds, 12),
+        'roi': decimal(profit_loss / (stake * cent), 8),
+        # NULL while there is no closing price
+        'clv': decimal(odds / (closing_odds * cent) - 100, 8),
+    }
+
+
+def _cents(value):
+    """Round a Decimal to 2 places half away from zero, like SQL ROUND()"""
+    return value.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _value(value):
+    """SQL literal for a plain value written by BetQuerySet.update() (None for NULL)"""
+    if value is None:
+        return models.Value(None, output_field=models.DecimalField())
+    return models.Value(Decimal(str(value)))
+
+
+# Bet fields that feed BetExposure; bulk updates touching any of them refresh the ledger
+EXPOSURE_SOURCE_FIELDS = {
+    'outcome', 'home_team', 'home_team_id', 'away_team', 'away_team_id', 'kickoff', 'competition',
+    'competition_id', 'bookmaker', 'bookmaker_id', 'stake', 'bookmaker_odds', 'potential_payout',
+}
+
+
+# Source fields of the stored analytics columns
+DERIVED_SOURCE_FIELDS = {'stake', 'bookmaker_odds', 'estimated_probability', 'profit_loss', 'closing_odds'}
+
 
 class Sport(models.Model):
     """Model to store different sports"""
@@ -138,6 +210,107 @@ class BetType(models.Model):
         return f"{self.name} ({self.get_category_display()})"
 
 
+class BetQuerySet(models.QuerySet):
+    """QuerySet that keeps BetDailyRollup and BetExposure in sync on bulk updates and deletes"""
+
+    def _rollup_days(self):
+        """Distinct (local) days touched by the bets in this queryset"""
+        return set(
+            self.order_by().annotate(day=TruncDate('date')).values_list('day', flat=True).distinct()
+        )
+
+    def _exposure_home_teams(self):
+        """Distinct home teams of the bets in this queryset (the BetExposure rebuild partitions)"""
+        return set(self.order_by().values_list('home_team_id', flat=True).distinct())
+
+    def update(self, **kwargs):
+        # auto_now is not applied by update(); stamp the rows like save() would
+        kwargs.setdefault('updated_at', timezone.now())
+        # Decided before the derived columns are added: potential_payout only moves with stake or odds
+        touches_exposure = bool(EXPOSURE_SOURCE_FIELDS.intersection(kwargs))
+        changed_sources = DERIVED_SOURCE_FIELDS.intersection(kwargs)
+        if changed_sources:
+            # Keep the stored analytics columns in step, computed from the values being written
+            sources = {
+                field: kwargs[field] if hasattr(kwargs[field], 'resolve_expression') else _value(kwargs[field])
+                for field in changed_sources
+            }
+            derived = derived_field_expressions(
+                stake=sources.get('stake'),
+                odds=sources.get('bookmaker_odds'),
+                probability=sources.get('estimated_probability'),
+                profit_loss=sources.get('profit_loss'),
+                closing_odds=sources.get('closing_odds'),
+            )
+            for field, expression in derived.items():
+                kwargs.setdefault(field, expression)
+
+        touches_rollups = bool(ROLLUP_SOURCE_FIELDS.intersection(kwargs))
+        if not touches_rollups and not touches_exposure:
+            rows = super().update(**kwargs)
+            if rows:
+                bump_bets_version_on_commit()
+            return rows
+
+        with transaction.atomic(using=self.db):
+            days = self._rollup_days() if touches_rollups else None
+            home_teams = self._exposure_home_teams() if touches_exposure else None
+            rows = super().update(**kwargs)
+            if rows:
+                bump_bets_version_on_commit()
+            if rows and touches_rollups:
+                new_date = kwargs.get('date')
+                if new_date is None:
+                    BetDailyRollup.rebuild(days)
+                elif hasattr(new_date, 'date'):
+                    BetDailyRollup.rebuild(days | {timezone.localtime(new_date).date()})
+                else:
+                    # Date set from an expression: the new days are unknown, rebuild everything
+                    BetDailyRollup.rebuild()
+            if rows and touches_exposure:
+                new_home_team = kwargs.get('home_team_id', kwargs.get('home_team'))
+                if new_home_team is None:
+                    BetExposure.rebuild(home_teams)
+                elif hasattr(new_home_team, 'resolve_expression'):
+                    # Home team set from an expression: the new partitions are unknown, rebuild everything
+                    BetExposure.rebuild()
+                else:
+                    BetExposure.rebuild(home_teams | {getattr(new_home_team, 'pk', new_home_team)})
+        return rows
+    update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """bulk_create that applies the Bet.save() rules and adds the new bets to the rollups and exposure"""
+        objs = list(objs)
+        for obj in objs:
+            obj.calculate_fields()
+        with transaction.atomic(using=self.db):
+            created = super().bulk_create(objs, *args, **kwargs)
+            if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+                # Rows may have been skipped or merged: recount the touched days instead
+                BetDailyRollup.rebuild({timezone.localtime(obj.date).date() for obj in objs})
+                BetExposure.rebuild({obj.home_team_id for obj in objs})
+            else:
+                BetDailyRollup.apply_states([obj.rollup_state() for obj in objs])
+                BetExposure.apply_states([obj.exposure_state() for obj in objs])
+            if objs:
+                bump_bets_version_on_commit()
+        return created
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            days = self._rollup_days()
+            home_teams = self._exposure_home_teams()
+            result = super().delete()
+            if result[0]:
+                BetDailyRollup.rebuild(days)
+                BetExposure.rebuild(home_teams)
+                bump_bets_version_on_commit()
+        return result
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
 class Bet(models.Model):
     """Main model to store individual bets"""
     
@@ -199,86 +372,228 @@ class Bet(models.Model):
         validators=[MinValueValidator(1), MaxValueValidator(5)],
         help_text="Confidence level (1-5)"
     )
+
+    # Stored analytics, recalculated on save (see calculate_analytics)
+    implied_probability = models.DecimalField(
+        max_digits=5, decimal_places=2, default=0, editable=False,
+        help_text="Implied probability from bookmaker odds (%)"
+    )
+    bookmaker_edge = models.DecimalField(
+        max_digits=6, decimal_places=2, default=0, editable=False,
+        help_text="Implied minus estimated probability (%)"
+    )
+    expected_value = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, editable=False,
+        help_text="Expected Value (€)"
+    )
+    potential_payout = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, editable=False,
+        help_text="Stake * odds (€)"
+    )
+    roi = models.DecimalField(
+        max_digits=8, decimal_places=2, default=0, editable=False,
+        help_text="Return on Investment (%)"
+    )
+
+    # Closing line: kickoff and selection identify the bet's price series in OddsSnapshot
+    kickoff = models.DateTimeField(null=True, blank=True, help_text="When the event starts")
+    selection = models.CharField(
+        max_length=50, blank=True, help_text="Selection within the market, e.g. 'home' or 'over 2.5'"
+    )
+    closing_odds = models.DecimalField(
+        max_digits=6, decimal_places=2, null=True, blank=True, editable=False,
+        help_text="Last price of this bookmaker before kickoff (see bets.odds)"
+    )
+    clv = models.DecimalField(
+        max_digits=8, decimal_places=2, null=True, blank=True, editable=False,
+        help_text="Closing line value: odds taken over closing odds, minus 1 (%)"
+    )
     
     # Metadata
     notes = models.TextField(blank=True, help_text="Personal notes about this bet")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BetQuerySet.as_manager()
+
     class Meta:
         ordering = ['-date', '-created_at']
         indexes = [
             models.Index(fields=['date']),
             models.Index(fields=['sport']),
-            models.Index(fields=['outcome']),
             models.Index(fields=['bookmaker']),
+            models.Index(fields=['expected_value']),
+            # Composite indexes for the analytics shapes: outcome filter + date range or FK.
+            # (outcome, date) also serves outcome-only filters, so it replaces the outcome index.
+            models.Index(fields=['outcome', 'date'], name='bet_outcome_date_idx'),
+            models.Index(fields=['sport', 'outcome', 'date'], name='bet_sport_outcome_date_idx'),
+            models.Index(fields=['bookmaker', 'outcome'], name='bet_bookmaker_outcome_idx'),
+            # Pending bets are a small, hot subset (open exposure, settlement)
+            models.Index(fields=['date'], condition=models.Q(outcome='pending'), name='bet_pending_date_idx'),
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what this row contributed to the rollups and exposure so save()/delete() can apply a delta
+        if not instance.get_deferred_fields():
+            instance._rollup_values = instance._rollup_source_values()
+            instance._exposure_values = instance._exposure_source_values()
+        return instance
+
     def __str__(self):
         return f"{self.home_team} vs {self.away_team} - {self.bet_type} ({self.date.strftime('%Y-%m-%d')})"
 
-    @property
-    def implied_probability(self):
-        """Calculate implied probability from bookmaker odds"""
-        if self.bookmaker_odds is not None and self.bookmaker_odds > 0:
-            return round((1 / float(self.bookmaker_odds)) * 100, 2)
-        return 0
-    
-    @property
-    def bookmaker_edge(self):
-        """Calculate bookmaker edge (margin)"""
-        if self.estimated_probability is not None:
-            return round(self.implied_probability - float(self.estimated_probability), 2)
-        return 0
-    
-    @property
-    def expected_value(self):
-        """Calculate Expected Value (EV)"""
-        if (self.estimated_probability is not None and 
-            self.bookmaker_odds is not None and 
-            self.stake is not None):
-            
-            prob = float(self.estimated_probability) / 100
-            odds = float(self.bookmaker_odds)
-            stake = float(self.stake)
-            
-            # EV = (Probability of winning * Amount won per bet) - (Probability of losing * Amount lost per bet)
-            ev = (prob * (odds - 1) * stake) - ((1 - prob) * stake)
-            return round(ev, 2)
-        return 0
-    
-    @property
-    def roi(self):
-        """Calculate Return on Investment (ROI) %"""
-        if self.stake is not None and self.stake > 0 and self.profit_loss is not None:
-            return round((float(self.profit_loss) / float(self.stake)) * 100, 2)
-        return 0
-    
-    @property
-    def potential_payout(self):
-        """Calculate potential payout (stake * odds)"""
-        if self.stake is not None and self.bookmaker_odds is not None:
-            return round(float(self.stake) * float(self.bookmaker_odds), 2)
-        return 0
-    
     @property
     def potential_profit(self):
         """Calculate potential profit (payout - stake)"""
         if self.stake is not None:
-            return round(self.potential_payout - float(self.stake), 2)
+            return self.potential_payout - Decimal(str(self.stake))
         return 0
 
-    def save(self, *args, **kwargs):
-        """Override save to auto-calculate profit/loss for completed bets"""
+    def calculate_analytics(self):
+        """Recalculate the stored implied probability, edge, EV and payout from the bet inputs"""
+        if self.bookmaker_odds is None or self.stake is None or self.estimated_probability is None:
+            return
+        stake = Decimal(str(self.stake))
+        odds = Decimal(str(self.bookmaker_odds))
+        probability = Decimal(str(self.estimated_probability))
+
+        implied = Decimal('100') / odds if odds > 0 else Decimal('0')
+        self.implied_probability = _cents(implied)
+        self.bookmaker_edge = _cents(implied - probability)
+        # EV = (Probability of winning * Amount won per bet) - (Probability of losing * Amount lost per bet)
+        self.expected_value = _cents(stake * (probability * odds / 100 - 1))
+        self.potential_payout = _cents(stake * odds)
+        if self.closing_odds:
+            self.clv = _cents(odds * 100 / Decimal(str(self.closing_odds)) - 100)
+        else:
+            self.clv = None
+
+    def calculate_roi(self):
+        """Recalculate the stored ROI (%) from profit/loss and stake"""
+        if self.stake is not None and self.stake > 0 and self.profit_loss is not None:
+            self.roi = _cents(Decimal(str(self.profit_loss)) * 100 / Decimal(str(self.stake)))
+        else:
+            self.roi = 0
+
+    def calculate_fields(self):
+        """Apply the profit/loss rules for the outcome and refresh every stored analytics column"""
+        self.calculate_analytics()
         if self.outcome == 'win':
             self.profit_loss = self.potential_profit
         elif self.outcome == 'loss':
-            self.profit_loss = -float(self.stake)
+            self.profit_loss = -Decimal(str(self.stake))
         elif self.outcome in ['push', 'void']:
             self.profit_loss = 0
         # For pending bets, keep current profit_loss value
+        self.calculate_roi()
+
+    def save(self, *args, **kwargs):
+        """Override save to auto-calculate profit/loss for completed bets and the stored analytics"""
+        self.calculate_fields()
         
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            previous = self._previous_rollup_state()
+            previous_exposure = self._previous_exposure_state()
+            super().save(*args, **kwargs)
+            current = self.rollup_state()
+            if previous != current:
+                if previous is not None:
+                    BetDailyRollup.apply_state(previous, -1)
+                BetDailyRollup.apply_state(current, 1)
+            self._rollup_state = current
+            exposure = self.exposure_state()
+            if previous_exposure != exposure:
+                if previous_exposure is not None:
+                    BetExposure.apply_state(previous_exposure, -1)
+                if exposure is not None:
+                    BetExposure.apply_state(exposure, 1)
+            self._exposure_state = exposure
+            bump_bets_version_on_commit()
+
+    def delete(self, *args, **kwargs):
+        """Override delete to remove this bet's contribution from the rollups and exposure"""
+        with transaction.atomic():
+            previous = self._previous_rollup_state()
+            previous_exposure = self._previous_exposure_state()
+            result = super().delete(*args, **kwargs)
+            if previous is not None:
+                BetDailyRollup.apply_state(previous, -1)
+            if previous_exposure is not None:
+                BetExposure.apply_state(previous_exposure, -1)
+            self._rollup_state = None
+            self._exposure_state = None
+            bump_bets_version_on_commit()
+        return result
+
+    def _rollup_source_values(self):
+        return (
+            self.date, self.sport_id, self.competition_id, self.bookmaker_id, self.bet_type_id,
+            self.outcome, self.stake, self.profit_loss, self.expected_value, self.bookmaker_odds,
+        )
+
+    @staticmethod
+    def _rollup_state_from(values):
+        date, sport_id, competition_id, bookmaker_id, bet_type_id, outcome, stake, profit, ev, odds = values
+        return (
+            timezone.localtime(date).date(),
+            sport_id,
+            competition_id,
+            bookmaker_id,
+            bet_type_id,
+            outcome,
+            Decimal(str(stake)),
+            Decimal(str(profit or 0)),
+            Decimal(str(ev or 0)),
+            Decimal(str(odds)),
+        )
+
+    def rollup_state(self):
+        """Contribution of this bet to BetDailyRollup as a hashable tuple"""
+        return self._rollup_state_from(self._rollup_source_values())
+
+    def _previous_rollup_state(self):
+        """Rollup contribution currently stored in the database for this bet, if any"""
+        if self.pk is None:
+            return None
+        if hasattr(self, '_rollup_state'):
+            return self._rollup_state
+        if hasattr(self, '_rollup_values'):
+            return self._rollup_state_from(self._rollup_values)
+        stored = type(self)._default_manager.filter(pk=self.pk).first()
+        return stored.rollup_state() if stored is not None else None
+
+    def _exposure_source_values(self):
+        return (
+            self.outcome, self.home_team_id, self.away_team_id, self.kickoff, self.competition_id,
+            self.bookmaker_id, self.stake, self.potential_payout,
+        )
+
+    @staticmethod
+    def _exposure_state_from(values):
+        outcome, home_team_id, away_team_id, kickoff, competition_id, bookmaker_id, stake, payout = values
+        if outcome != 'pending':
+            return None
+        return (
+            home_team_id, away_team_id, kickoff, competition_id, bookmaker_id,
+            Decimal(str(stake)), Decimal(str(payout or 0)),
+        )
+
+    def exposure_state(self):
+        """Contribution of this bet to BetExposure as a hashable tuple, or None once it is settled"""
+        return self._exposure_state_from(self._exposure_source_values())
+
+    def _previous_exposure_state(self):
+        """Exposure contribution currently stored in the database for this bet, if any"""
+        if self.pk is None:
+            return None
+        if hasattr(self, '_exposure_state'):
+            return self._exposure_state
+        if hasattr(self, '_exposure_values'):
+            return self._exposure_state_from(self._exposure_values)
+        stored = type(self)._default_manager.filter(pk=self.pk).first()
+        return stored.exposure_state() if stored is not None else None
 
     # Analytics methods for dashboard
     @classmethod
@@ -289,7 +604,7 @@ class Bet(models.Model):
     @classmethod
     def get_completed_bets(cls):
         """Get completed bets (win/loss/push/void)"""
-        return cls.objects.exclude(outcome='pending')
+        return cls.objects.filter(outcome__in=SETTLED_OUTCOMES)
 
     @classmethod
     def get_win_rate(cls):
@@ -329,17 +644,20 @@ class Bet(models.Model):
         if not month:
             month = timezone.now().month
             
+        # Range on the raw column so the date indexes can be used
+        month_start = datetime(year, month, 1).date()
+        next_month = datetime(year + month // 12, month % 12 + 1, 1).date()
         monthly_bets = cls.objects.filter(
-            date__year=year,
-            date__month=month
+            date__gte=_start_of_day(month_start),
+            date__lt=_start_of_day(next_month)
         )
         
         return {
             'total_bets': monthly_bets.count(),
             'total_staked': monthly_bets.aggregate(models.Sum('stake'))['stake__sum'] or 0,
-            'total_profit_loss': monthly_bets.exclude(outcome='pending').aggregate(
+            'total_profit_loss': monthly_bets.filter(outcome__in=SETTLED_OUTCOMES).aggregate(
                 models.Sum('profit_loss'))['profit_loss__sum'] or 0,
-            'win_rate': cls._calculate_win_rate(monthly_bets.exclude(outcome='pending')),
+            'win_rate': cls._calculate_win_rate(monthly_bets.filter(outcome__in=SETTLED_OUTCOMES)),
         }
 
     @staticmethod
@@ -349,4 +667,483 @@ class Bet(models.Model):
         if total > 0:
             wins = queryset.filter(outcome='win').count()
             return round((wins / total) * 100, 2)
-        return 0
\ No newline at end of file
+        return 0
+
+
+class BetBuckets(models.Model):
+    """
+    Totals of Bet rows per bucket of KEY_FIELDS, maintained incrementally from Bet writes.
+
+    Subclasses name the bucket key (KEY_FIELDS), the totals and how Bet rows sum into them
+    (AGGREGATES, whose keys are the VALUE_FIELDS), the key field rebuilds are partitioned by
+    (PARTITION_FIELD), and implement source_bets() and state_buckets().
+    """
+
+    KEY_FIELDS = ()
+    AGGREGATES = {}
+    VALUE_FIELDS = ()
+    PARTITION_FIELD = None
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def source_bets(cls, partitions=None):
+        """Bet rows counted in the buckets of the given partitions (all when None), annotated with KEY_FIELDS"""
+        raise NotImplementedError
+
+    @classmethod
+    def state_buckets(cls, states):
+        """Yield a (key, values) pair per bet state, values in VALUE_FIELDS order; states without a bucket are skipped"""
+        raise NotImplementedError
+
+    @classmethod
+    def partition_filter(cls, partitions):
+        return models.Q(**{f'{cls.PARTITION_FIELD}__in': set(partitions)})
+
+    @classmethod
+    def apply_state(cls, state, sign):
+        """Add (sign=1) or remove (sign=-1) one bet's contribution"""
+        for key, values in cls.state_buckets([state]):
+            key = dict(zip(cls.KEY_FIELDS, key))
+            _add_to_bucket(
+                cls.objects.filter(**key), cls.VALUE_FIELDS, values, sign,
+                lambda key=key, values=values: cls.objects.create(**key, **_bucket_values(cls.VALUE_FIELDS, values)),
+            )
+
+    @classmethod
+    def apply_states(cls, states):
+        """Add many bets' contributions at once, with a fixed number of queries"""
+        if not states:
+            return
+        deltas = {}
+        for key, values in cls.state_buckets(states):
+            delta = deltas.setdefault(key, [0] * len(cls.VALUE_FIELDS))
+            for index, value in enumerate(values):
+                delta[index] += value
+        if not deltas:
+            return
+
+        partition = cls.KEY_FIELDS.index(cls.PARTITION_FIELD)
+        existing = {}
+        rows = cls.objects.select_for_update().filter(cls.partition_filter(key[partition] for key in deltas))
+        for row in rows:
+            existing[tuple(getattr(row, field) for field in cls.KEY_FIELDS)] = row
+
+        to_update = []
+        to_create = []
+        for key, delta in deltas.items():
+            row = existing.get(key)
+            if row is None:
+                row = cls(**dict(zip(cls.KEY_FIELDS, key)))
+                to_create.append(row)
+            else:
+                to_update.append(row)
+            for field, value in zip(cls.VALUE_FIELDS, delta):
+                setattr(row, field, getattr(row, field) + value)
+
+        if to_update:
+            cls.objects.bulk_update(to_update, list(cls.VALUE_FIELDS), batch_size=1000)
+        _create_buckets(cls, to_create, deltas)
+
+    @classmethod
+    def aggregate_bets(cls, partitions=None):
+        """Group Bet rows into buckets, yielding one dict per bucket"""
+        return (
+            cls.source_bets(partitions).order_by()
+            .values(*cls.KEY_FIELDS)
+            .annotate(**cls.AGGREGATES)
+            .iterator(chunk_size=2000)
+        )
+
+    @classmethod
+    def rebuild(cls, partitions=None, batch_size=1000):
+        """Recompute the buckets from Bet rows, for the given partitions or from scratch when None"""
+        if partitions is not None:
+            partitions = set(partitions)
+            if not partitions:
+                return 0
+        with transaction.atomic():
+            existing = cls.objects.all()
+            if partitions is not None:
+                existing = existing.filter(cls.partition_filter(partitions))
+            existing.delete()
+
+            created = 0
+            batch = []
+            for row in cls.aggregate_bets(partitions):
+                batch.append(cls(**row))
+                if len(batch) >= batch_size:
+                    cls.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+            if batch:
+                cls.objects.bulk_create(batch)
+                created += len(batch)
+        return created
+
+    @classmethod
+    def find_drift(cls, partitions=None, tolerance=Decimal('0.01')):
+        """Compare the stored buckets against Bet rows and return the mismatching ones"""
+        def key_of(row):
+            return tuple(row[field] for field in cls.KEY_FIELDS)
+
+        expected = {key_of(row): row for row in cls.aggregate_bets(partitions)}
+        stored = cls.objects.all()
+        if partitions is not None:
+            stored = stored.filter(cls.partition_filter(partitions))
+        actual = {key_of(row): row for row in stored.values(*cls.KEY_FIELDS, *cls.VALUE_FIELDS)}
+
+        drift = []
+        for key in expected.keys() | actual.keys():
+            want = expected.get(key)
+            have = actual.get(key)
+            if want is None or have is None or any(
+                abs(Decimal(str(want[field] or 0)) - Decimal(str(have[field] or 0))) > tolerance
+                for field in cls.VALUE_FIELDS
+            ):
+                drift.append({'key': dict(zip(cls.KEY_FIELDS, key)), 'expected': want, 'stored': have})
+        return drift
+
+
+class BetDailyRollup(BetBuckets):
+    """
+    Pre-aggregated bet totals per day and segment, maintained incrementally from Bet writes.
+
+    Bet.save()/delete(), BetQuerySet update()/bulk_create()/delete(), changes of a bet type's
+    category and cascading deletes of sports, competitions, teams, bet types and bookmakers
+    keep the rollups (and BetExposure) in step. Writes that bypass the ORM (raw SQL, loaddata,
+    BetType.objects.update(category=...)) do not: run rebuild_rollups and rebuild_exposure after them.
+    """
+
+    day = models.DateField()
+    sport = models.ForeignKey(Sport, on_delete=models.CASCADE, related_name='daily_rollups')
+    competition = models.ForeignKey(Competition, on_delete=models.CASCADE, related_name='daily_rollups')
+    bookmaker = models.ForeignKey(Bookmaker, on_delete=models.CASCADE, related_name='daily_rollups')
+    bet_type_category = models.CharField(max_length=50, choices=BetType.CATEGORY_CHOICES)
+    outcome = models.CharField(max_length=10, choices=Bet.OUTCOME_CHOICES)
+
+    bet_count = models.IntegerField(default=0)
+    stake_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    profit_loss_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expected_value_sum = models.DecimalField(max_digits=16, decimal_places=4, default=0)
+    odds_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    KEY_FIELDS = ('day', 'sport_id', 'competition_id', 'bookmaker_id', 'bet_type_category', 'outcome')
+    AGGREGATES = {
+        'bet_count': models.Count('id'),
+        'stake_sum': models.Sum('stake'),
+        'profit_loss_sum': models.Sum('profit_loss'),
+        'expected_value_sum': models.Sum('expected_value'),
+        'odds_sum': models.Sum('bookmaker_odds'),
+    }
+    VALUE_FIELDS = tuple(AGGREGATES)
+    PARTITION_FIELD = 'day'
+
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'sport', 'competition', 'bookmaker', 'bet_type_category', 'outcome'],
+                name='unique_bet_daily_rollup_bucket',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'outcome']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.sport_id}/{self.competition_id}/{self.bookmaker_id} {self.bet_type_category} {self.outcome}"
+
+    @classmethod
+    def apply_state(cls, state, sign):
+        """Add (sign=1) or remove (sign=-1) one bet's contribution, as returned by Bet.rollup_state()"""
+        day, sport_id, competition_id, bookmaker_id, bet_type_id, outcome, stake, profit, ev, odds = state
+        key = {
+            'day': day,
+            'sport_id': sport_id,
+            'competition_id': competition_id,
+            'bookmaker_id': bookmaker_id,
+            'outcome': outcome,
+        }
+        # The category is resolved inside the UPDATE; it is only fetched when the bucket has to be created
+        category = BetType.objects.filter(pk=bet_type_id).values('category')[:1]
+        bucket = cls.objects.filter(bet_type_category=models.Subquery(category), **key)
+
+        def create():
+            cls.objects.create(
+                bet_type_category=BetType.objects.values_list('category', flat=True).get(pk=bet_type_id),
+                **key, **_bucket_values(cls.VALUE_FIELDS, values)
+            )
+
+        values = (1, stake, profit, ev, odds)
+        _add_to_bucket(bucket, cls.VALUE_FIELDS, values, sign, create)
+
+    @classmethod
+    def state_buckets(cls, states):
+        """Buckets of Bet.rollup_state() tuples, resolving the bet types' categories in one query"""
+        categories = dict(BetType.objects.filter(pk__in={state[4] for state in states}).values_list('pk', 'category'))
+        for day, sport_id, competition_id, bookmaker_id, bet_type_id, outcome, *values in states:
+            yield (day, sport_id, competition_id, bookmaker_id, categories[bet_type_id], outcome), (1, *values)
+
+    @classmethod
+    def source_bets(cls, days=None):
+        bets = Bet.objects.all()
+        if days is not None:
+            bets = bets.filter(cls.days_filter(days))
+        return bets.annotate(day=TruncDate('date'), bet_type_category=models.F('bet_type__category'))
+
+    @staticmethod
+    def days_filter(days, field='date'):
+        """Sargable Q matching datetimes that fall on any of the given local days"""
+        query = models.Q(pk__in=[])
+        days = sorted(days)
+        index = 0
+        while index < len(days):
+            start = end = days[index]
+            # Merge consecutive days into a single range
+            while index + 1 < len(days) and days[index + 1] == end + timedelta(days=1):
+                index += 1
+                end = days[index]
+            query |= models.Q(**{
+                f'{field}__gte': _start_of_day(start),
+                f'{field}__lt': _start_of_day(end + timedelta(days=1)),
+            })
+            index += 1
+        return query
+
+
+class BetExposure(BetBuckets):
+    """
+    Open stake and potential payout of the pending bets per match, competition and bookmaker,
+    maintained incrementally from Bet writes; settled bets leave the ledger.
+    """
+
+    home_team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='home_exposures')
+    away_team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='away_exposures')
+    # NULL for bets recorded without a kickoff; they form one bucket per pairing
+    kickoff = models.DateTimeField(null=True, blank=True)
+    competition = models.ForeignKey(Competition, on_delete=models.CASCADE, related_name='exposures')
+    bookmaker = models.ForeignKey(Bookmaker, on_delete=models.CASCADE, related_name='exposures')
+
+    bet_count = models.IntegerField(default=0)
+    stake_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    payout_sum = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    KEY_FIELDS = ('home_team_id', 'away_team_id', 'kickoff', 'competition_id', 'bookmaker_id')
+    AGGREGATES = {
+        'bet_count': models.Count('id'),
+        'stake_sum': models.Sum('stake'),
+        'payout_sum': models.Sum('potential_payout'),
+    }
+    VALUE_FIELDS = tuple(AGGREGATES)
+    PARTITION_FIELD = 'home_team_id'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['home_team', 'away_team', 'kickoff', 'competition', 'bookmaker'],
+                name='unique_bet_exposure_bucket',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.home_team_id}/{self.away_team_id} {self.kickoff} {self.competition_id}/{self.bookmaker_id}"
+
+    @classmethod
+    def state_buckets(cls, states):
+        """Buckets of Bet.exposure_state() tuples; settled bets give None and are skipped"""
+        for state in states:
+            if state is not None:
+                yield state[:5], (1, *state[5:])
+
+    @classmethod
+    def source_bets(cls, home_teams=None):
+        bets = Bet.objects.filter(outcome='pending')
+        if home_teams is not None:
+            bets = bets.filter(home_team_id__in=home_teams)
+        return bets
+
+
+class OddsSnapshot(models.Model):
+    """
+    One observed price of a selection at a bookmaker, for the match identified by
+    (home_team, away_team, kickoff). Append-only and potentially very large, so the
+    foreign keys are not indexed separately: the unique index, which leads with the
+    match columns and ends with observed_at, serves the closing-line lookups.
+    """
+    home_team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='+', db_index=False)
+    away_team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='+', db_index=False)
+    kickoff = models.DateTimeField()
+    bet_type = models.ForeignKey(BetType, on_delete=models.CASCADE, related_name='+', db_index=False)
+    selection = models.CharField(max_length=50)
+    bookmaker = models.ForeignKey(Bookmaker, on_delete=models.CASCADE, related_name='+', db_index=False)
+    observed_at = models.DateTimeField()
+    odds = models.DecimalField(max_digits=6, decimal_places=2, validators=[MinValueValidator(1.01)])
+
+    class Meta:
+        ordering = ['-observed_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['home_team', 'away_team', 'kickoff', 'bet_type', 'selection', 'bookmaker', 'observed_at'],
+                name='odds_snapshot_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.home_team} vs {self.away_team} - {self.selection} @ {self.odds} ({self.observed_at:%Y-%m-%d %H:%M})"
+
+
+class OddsQuote(models.Model):
+    """
+    Latest known price of a selection at a bookmaker, one row per (match, market, selection,
+    bookmaker), upserted in batches by the live odds feed consumer (bets.feed).
+    """
+    home_team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='+', db_index=False)
+    away_team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='+', db_index=False)
+    kickoff = models.DateTimeField()
+    bet_type = models.ForeignKey(BetType, on_delete=models.CASCADE, related_name='+', db_index=False)
+    selection = models.CharField(max_length=50)
+    bookmaker = models.ForeignKey(Bookmaker, on_delete=models.CASCADE, related_name='+', db_index=False)
+    odds = models.DecimalField(max_digits=6, decimal_places=2, validators=[MinValueValidator(1.01)])
+    observed_at = models.DateTimeField(help_text="When the bookmaker offered this price")
+    updated_at = models.DateTimeField(auto_now=True, help_text="When the feed last wrote this row")
+
+    KEY_FIELDS = ['home_team', 'away_team', 'kickoff', 'bet_type', 'selection', 'bookmaker']
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['home_team', 'away_team', 'kickoff', 'bet_type', 'selection', 'bookmaker'],
+                name='odds_quote_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.home_team} vs {self.away_team} - {self.selection} @ {self.odds}"
+
+
+class CacheVersion(models.Model):
+    """
+    Version counter of a family of cached payloads (see bets.cache). Stored in the
+    database so that writes from any process (workers, management commands)
+    invalidate the caches of every other process.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+def _start_of_day(day):
+    """Aware datetime for midnight of the given day in the current timezone"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _bucket_values(fields, values):
+    return dict(zip(fields, values))
+
+
+def _add_to_bucket(bucket, fields, values, sign, create):
+    """
+    Add (sign=1) or remove (sign=-1) values to the single row of bucket, creating it with create().
+
+    Two transactions adding the first bet of a bucket both find no row to update; the second
+    insert fails on the bucket's unique constraint. It runs in a savepoint, so the failure only
+    undoes the insert, and the values are then added to the row the other transaction created.
+    """
+    increments = {field: models.F(field) + sign * value for field, value in zip(fields, values)}
+    if bucket.update(**increments):
+        if sign < 0:
+            bucket.filter(bet_count__lte=0).delete()
+        return
+    if sign < 0:
+        return
+    try:
+        with transaction.atomic(using=bucket.db):
+            create()
+    except IntegrityError:
+        bucket.update(**increments)
+
+
+def _create_buckets(model, rows, deltas):
+    """Insert new bucket rows; if another transaction created some of them first, add to those instead"""
+    if not rows:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(rows, batch_size=1000)
+    except IntegrityError:
+        for row in rows:
+            key = _bucket_values(model.KEY_FIELDS, (getattr(row, field) for field in model.KEY_FIELDS))
+            values = deltas[tuple(key.values())]
+            _add_to_bucket(
+                model.objects.filter(**key), model.VALUE_FIELDS, values, 1,
+                lambda key=key, values=values: model.objects.create(**key, **_bucket_values(model.VALUE_FIELDS, values)),
+            )
+
+
+@receiver(post_save, sender=Team)
+@receiver(post_delete, sender=Team)
+@receiver(post_save, sender=Competition)
+@receiver(post_delete, sender=Competition)
+def _invalidate_form_options(sender, **kwargs):
+    """Teams or competitions changed: drop the cached add-bet option lists"""
+    bump_options_version_on_commit()
+
+
+@receiver(pre_save, sender=BetType)
+def _remember_bet_type_category(sender, instance, raw=False, **kwargs):
+    if instance.pk is not None and not raw:
+        instance._stored_category = (
+            BetType.objects.filter(pk=instance.pk).values_list('category', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=BetType)
+def _recategorise_rollups(sender, instance, created, raw=False, **kwargs):
+    """The rollups are keyed by category: rebuild the days of the bet type's bets when it changes"""
+    stored = getattr(instance, '_stored_category', None)
+    if created or raw or stored is None or stored == instance.category:
+        return
+    BetDailyRollup.rebuild(Bet.objects.filter(bet_type=instance)._rollup_days())
+    bump_bets_version_on_commit()
+
+
+# Bet foreign keys to each model whose deletion cascades to bets without going through BetQuerySet.delete()
+BET_PARENT_FIELDS = {
+    Sport: ('sport',),
+    Competition: ('competition',),
+    Team: ('home_team', 'away_team'),
+    BetType: ('bet_type',),
+    Bookmaker: ('bookmaker',),
+}
+
+
+@receiver(pre_delete, sender=Sport)
+@receiver(pre_delete, sender=Competition)
+@receiver(pre_delete, sender=Team)
+@receiver(pre_delete, sender=BetType)
+@receiver(pre_delete, sender=Bookmaker)
+def _collect_bet_partitions(sender, instance, **kwargs):
+    """Remember the rollup days and exposure partitions of the bets about to be deleted in cascade"""
+    query = models.Q(pk__in=[])
+    for field in BET_PARENT_FIELDS[sender]:
+        query |= models.Q(**{field: instance})
+    bets = Bet.objects.filter(query)
+    instance._bet_partitions = (bets._rollup_days(), bets._exposure_home_teams())
+
+
+@receiver(post_delete, sender=Sport)
+@receiver(post_delete, sender=Competition)
+@receiver(post_delete, sender=Team)
+@receiver(post_delete, sender=BetType)
+@receiver(post_delete, sender=Bookmaker)
+def _rebuild_bet_partitions(sender, instance, **kwargs):
+    """Recount the rollups and exposure of the bets deleted in cascade with instance"""
+    days, home_teams = getattr(instance, '_bet_partitions', (set(), set()))
+    if days:
+        BetDailyRollup.rebuild(days)
+        BetExposure.rebuild(home_teams)
+        bump_bets_version_on_commit()
@@ -0,0 +1,184 @@
+# bets/odds.py
+"""
+Odds time series and closing line value (CLV).
+
+OddsIngester appends price observations from NDJSON to OddsSnapshot in
+chunked bulk_create batches, resolving teams, bet types and bookmakers by
+name through the importer's entity cache (duplicates are ignored, so files
+can be re-ingested). link_closing_lines() then sets Bet.closing_odds (and
+Bet.clv) in a single UPDATE, with a correlated subquery that takes the last
+snapshot before kickoff from the unique index of OddsSnapshot.
+"""
+import time
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Avg, Count, OuterRef, Q, Subquery
+
+from .importers import EntityCache, RowError, _clean_name, _parse_date
+from .models import Bet, OddsSnapshot
+
+
+REQUIRED_FIELDS = (
+    'sport', 'home_team', 'away_team', 'kickoff', 'bet_type', 'selection', 'bookmaker', 'observed_at', 'odds',
+)
+
+
+def build_snapshot(row, entities):
+    """Validate one NDJSON row and return an unsaved OddsSnapshot, raising RowError when invalid"""
+    missing = [field for field in REQUIRED_FIELDS if _clean_name(row.get(field)) == '']
+    if missing:
+        raise RowError(f"Missing values: {', '.join(missing)}")
+
+    sport = entities.sports.get(_clean_name(row['sport']).lower())
+    if sport is None:
+        raise RowError(f"Unknown sport '{row['sport']}'")
+    home_team = entities.teams.get((sport.pk, _clean_name(row['home_team']).lower()))
+    away_team = entities.teams.get((sport.pk, _clean_name(row['away_team']).lower()))
+    bet_type = entities.bet_types.get(_clean_name(row['bet_type']).lower())
+    bookmaker = entities.bookmakers.get(_clean_name(row['bookmaker']).lower())
+    for label, value in (
+        ('home_team', home_team), ('away_team', away_team), ('bet_type', bet_type), ('bookmaker', bookmaker),
+    ):
+        if value is None:
+            raise RowError(f"Unknown {label} '{row[label]}'")
+
+    odds = row['odds']
+    try:
+        odds = OddsSnapshot._meta.get_field('odds').clean(str(odds) if isinstance(odds, float) else odds, None)
+    except ValidationError as e:
+        raise RowError('; '.join(e.messages))
+
+    return OddsSnapshot(
+        home_team=home_team,
+        away_team=away_team,
+        kickoff=_parse_date(row['kickoff']),
+        bet_type=bet_type,
+        selection=_clean_name(row['selection']),
+        bookmaker=bookmaker,
+        observed_at=_parse_date(row['observed_at']),
+        odds=odds,
+    )
+
+
+class OddsIngester:
+    """Append odds snapshots from an iterable of (line_number, row) pairs in chunked transactions"""
+
+    def __init__(self, chunk_size=20000, batch_size=5000, max_errors=None, progress=None):
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.progress = progress
+        # Prices never create teams, bet types or bookmakers: unknown names are row errors
+        self.entities = EntityCache(create_missing=False)
+        self.rows_read = 0
+        self.ingested = 0
+        self.error_count = 0
+        self.errors = []  # first errors only, so memory stays flat
+        self.first_kickoff = self.last_kickoff = None
+        self.started = None
+
+    def run(self, rows):
+        self.started = time.monotonic()
+        chunk = []
+        for line_number, row in rows:
+            chunk.append((line_number, row))
+            if len(chunk) >= self.chunk_size:
+                self._ingest_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._ingest_chunk(chunk)
+        return self.ingested
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started if self.started else 0
+
+    @property
+    def rows_per_second(self):
+        return self.rows_read / self.elapsed if self.elapsed else 0
+
+    def _record_error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < 100:
+            self.errors.append((line_number, message))
+        if self.max_errors is not None and self.error_count > self.max_errors:
+            raise RowError(f"Aborting after {self.error_count} invalid rows (line {line_number}: {message})")
+
+    def _ingest_chunk(self, chunk):
+        self.rows_read += len(chunk)
+        valid_rows = []
+        for line_number, row in chunk:
+            if isinstance(row, RowError):
+                self._record_error(line_number, str(row))
+            elif not isinstance(row, dict):
+                self._record_error(line_number, "Row is not an object")
+            else:
+                valid_rows.append((line_number, row))
+
+        with transaction.atomic():
+            self.entities.resolve([row for _, row in valid_rows])
+            snapshots = []
+            for line_number, row in valid_rows:
+                try:
+                    snapshots.append(build_snapshot(row, self.entities))
+                except RowError as e:
+                    self._record_error(line_number, str(e))
+            OddsSnapshot.objects.bulk_create(snapshots, batch_size=self.batch_size, ignore_conflicts=True)
+            self.ingested += len(snapshots)
+
+        # Kickoff range of the ingested matches, so only their bets need relinking
+        for snapshot in snapshots:
+            if self.first_kickoff is None or snapshot.kickoff < self.first_kickoff:
+                self.first_kickoff = snapshot.kickoff
+            if self.last_kickoff is None or snapshot.kickoff > self.last_kickoff:
+                self.last_kickoff = snapshot.kickoff
+
+        if self.progress:
+            self.progress(self)
+
+
+def closing_odds_subquery():
+    """Odds of the last snapshot before kickoff for the outer Bet's match, market, selection and bookmaker"""
+    return (
+        OddsSnapshot.objects.filter(
+            home_team=OuterRef('home_team'),
+            away_team=OuterRef('away_team'),
+            kickoff=OuterRef('kickoff'),
+            bet_type=OuterRef('bet_type'),
+            selection=OuterRef('selection'),
+            bookmaker=OuterRef('bookmaker'),
+            observed_at__lt=OuterRef('kickoff'),
+        )
+        .order_by('-observed_at')
+        .values('odds')[:1]
+    )
+
+
+def link_closing_lines(queryset=None):
+    """
+    Set closing_odds and clv of the bets that have a kickoff and a selection, in one UPDATE.
+
+    Bets without a matching snapshot get NULL. Returns the number of bets updated.
+    """
+    queryset = Bet.objects.all() if queryset is None else queryset
+    return (
+        queryset.filter(kickoff__isnull=False).exclude(selection='')
+        .update(closing_odds=Subquery(closing_odds_subquery()))
+    )
+
+
+def clv_summary(queryset=None):
+    """Bets with a closing price, their mean CLV (%) and the share that beat the closing line"""
+    queryset = Bet.objects.all() if queryset is None else queryset
+    totals = queryset.filter(clv__isnull=False).aggregate(
+        bets=Count('id'),
+        average_clv=Avg('clv'),
+        beat_close=Count('id', filter=Q(clv__gt=0)),
+    )
+    bets = totals['bets']
+    return {
+        'bets': bets,
+        'average_clv': round(float(totals['average_clv']), 2) if totals['average_clv'] is not None else None,
+        'beat_closing_line': round(totals['beat_close'] * 100 / bets, 2) if bets else 0,
+    }
@@ -0,0 +1,29 @@
+# bets/parallel.py
+"""
+Process pool for CPU-bound NumPy work (Monte Carlo simulations, backtests).
+
+Tasks must be picklable and their function importable without Django being
+set up (worker processes may be started with spawn or forkserver), so task
+functions live in modules that do not import models at import time.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+from django.conf import settings
+
+
+def worker_count(workers=None):
+    """Processes to use: the argument, else BETS_PARALLEL_WORKERS, else one per CPU"""
+    if workers is None:
+        workers = getattr(settings, 'BETS_PARALLEL_WORKERS', None)
+    return max(workers or os.cpu_count() or 1, 1)
+
+
+def parallel_map(func, tasks, workers=None):
+    """Results of func over tasks, in order; runs in-process when only one worker is needed"""
+    tasks = list(tasks)
+    workers = min(worker_count(workers), len(tasks))
+    if workers <= 1:
+        return [func(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, tasks))
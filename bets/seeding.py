@@ -0,0 +1,142 @@
+# bets/seeding.py
+"""
+Synthetic data generator for development and benchmarking.
+
+Creates a realistic set of sports, competitions, teams, bookmakers and bet
+types, then any number of bets drawn from plausible distributions (odds,
+model probability around the implied one, stakes, outcomes settled against
+the true probability, recent bets left pending). Bets are written with
+Bet.objects.bulk_create in batches, so the derived columns and the daily
+rollups are filled exactly as for real data.
+"""
+from datetime import timedelta
+from decimal import Decimal
+import random
+
+from django.utils import timezone
+
+from .cache import bump_options_version
+from .models import Bet, BetType, Bookmaker, Competition, Sport, Team
+
+
+SPORTS = {
+    'Football': ('FB', ['Premier League', 'La Liga', 'Serie A', 'Bundesliga', 'Primeira Liga', 'Champions League']),
+    'Basketball': ('BB', ['NBA', 'EuroLeague', 'Liga Betclic']),
+    'Tennis': ('TN', ['ATP Tour', 'WTA Tour', 'Grand Slams']),
+    'Ice Hockey': ('IH', ['NHL', 'KHL']),
+    'Handball': ('HB', ['EHF Champions League', 'Andebol 1']),
+}
+TEAMS_PER_COMPETITION = 16
+
+BOOKMAKERS = ['Betano', 'Bet365', 'Betclic', 'Placard', 'Solverde', 'ESC Online', 'Lebull', 'Bwin']
+
+BET_TYPES = [
+    ('Match Winner', 'match_result'),
+    ('Double Chance', 'match_result'),
+    ('Over 2.5 Goals', 'over_goals'),
+    ('Under 2.5 Goals', 'under_goals'),
+    ('Both Teams To Score', 'both_to_score'),
+    ('Asian Handicap', 'handicap'),
+    ('Total Points Over', 'total_points'),
+    ('Player Points', 'player'),
+    ('Set Betting', 'set_games'),
+]
+
+# Bets placed in the last PENDING_DAYS days are left unsettled
+PENDING_DAYS = 3
+
+
+def create_reference_data():
+    """Create (or reuse) the sports, competitions, teams, bookmakers and bet types; returns fixture lists"""
+    fixtures = []
+    for name, (code, competitions) in SPORTS.items():
+        sport, _ = Sport.objects.get_or_create(name=name, defaults={'code': code})
+        for competition_name in competitions:
+            competition, _ = Competition.objects.get_or_create(
+                name=competition_name, sport=sport, division='1', competition_type='regular_season',
+            )
+            Team.objects.bulk_create(
+                [
+                    Team(name=f'{competition_name} Team {number}', sport=sport)
+                    for number in range(1, TEAMS_PER_COMPETITION + 1)
+                ],
+                ignore_conflicts=True,
+            )
+            teams = list(Team.objects.filter(sport=sport, name__startswith=f'{competition_name} Team '))
+            fixtures.append((sport, competition, teams))
+
+    Bookmaker.objects.bulk_create([Bookmaker(name=name) for name in BOOKMAKERS], ignore_conflicts=True)
+    BetType.objects.bulk_create(
+        [BetType(name=name, category=category) for name, category in BET_TYPES], ignore_conflicts=True,
+    )
+    # Teams were bulk created (no post_save signal): refresh the add-bet option lists
+    bump_options_version()
+    bookmakers = list(Bookmaker.objects.filter(name__in=BOOKMAKERS))
+    bet_types = list(BetType.objects.filter(name__in=[name for name, _ in BET_TYPES]))
+    return fixtures, bookmakers, bet_types
+
+
+def generate_bets(count, fixtures, bookmakers, bet_types, rng=None, days=3 * 365, now=None):
+    """
+    Yield count unsaved Bets spread over the last `days` days, oldest first.
+
+    Dates are stratified (bet i falls in the i-th of count equal slices of the window),
+    so consecutive batches touch few days and the rollup maintenance stays cheap.
+    """
+    rng = rng or random.Random()
+    now = now or timezone.now()
+    window = days * 86400
+    start = now - timedelta(seconds=window)
+    # Popular bookmakers and bet types get most of the volume
+    bookmaker_weights = [1 / (rank + 1) for rank in range(len(bookmakers))]
+    bet_type_weights = [1 / (rank + 1) for rank in range(len(bet_types))]
+
+    for index in range(count):
+        sport, competition, teams = rng.choice(fixtures)
+        home_team, away_team = rng.sample(teams, 2)
+
+        odds = Decimal(str(round(min(1.05 + rng.lognormvariate(0, 0.6), 15), 2)))
+        implied = 100 / float(odds)
+        # Model probability scattered around the implied one, with a slight positive edge
+        probability = min(max(round(rng.gauss(implied * 1.02, 4)), 1), 99)
+        stake = Decimal(rng.choice((5, 10, 10, 15, 20, 25, 50, 100)))
+        placed = start + timedelta(seconds=(index + rng.random()) * window / count)
+
+        if (now - placed).days < PENDING_DAYS:
+            outcome = 'pending'
+        elif rng.random() < 0.02:
+            outcome = rng.choice(('push', 'void'))
+        else:
+            outcome = 'win' if rng.random() * 100 < implied * 0.97 else 'loss'
+
+        yield Bet(
+            date=placed,
+            sport=sport,
+            competition=competition,
+            home_team=home_team,
+            away_team=away_team,
+            neutral_ground=rng.random() < 0.03,
+            bet_type=rng.choices(bet_types, weights=bet_type_weights)[0],
+            bookmaker=rng.choices(bookmakers, weights=bookmaker_weights)[0],
+            estimated_probability=Decimal(probability),
+            bookmaker_odds=odds,
+            stake=stake,
+            confidence_level=rng.randint(1, 5),
+            outcome=outcome,
+        )
+
+
+def seed_bets(count, seed=None, batch_size=5000, progress=None):
+    """Create reference data and count bets in batches; returns the number of bets created"""
+    rng = random.Random(seed)
+    fixtures, bookmakers, bet_types = create_reference_data()
+    bets = generate_bets(count, fixtures, bookmakers, bet_types, rng=rng)
+
+    created = 0
+    while created < count:
+        batch = [bet for _, bet in zip(range(batch_size), bets)]
+        Bet.objects.bulk_create(batch, batch_size=1000)
+        created += len(batch)
+        if progress:
+            progress(created)
+    return created
@@ -0,0 +1,73 @@
+# bets/settlement.py
+"""
+Set-based settlement of pending bets.
+
+Settling goes through BetQuerySet.update(), so a whole batch is written with
+a single UPDATE while the stored analytics columns, the daily rollups, the
+open-exposure ledger and the analytics cache version are kept consistent.
+"""
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Value, When
+from django.db.models.functions import Round
+from django.db.models.lookups import Exact, In
+from django.utils import timezone
+
+from .models import SETTLED_OUTCOMES, Bet
+
+
+def profit_loss_expression(outcome):
+    """
+    CASE expression giving profit_loss for the outcome being written, following Bet.save():
+    win -> potential payout (rounded) minus stake, loss -> -stake, push/void -> 0.
+    """
+    return Case(
+        When(Exact(outcome, Value('win')), then=Round(F('stake') * F('bookmaker_odds'), 2) - F('stake')),
+        When(Exact(outcome, Value('loss')), then=-F('stake')),
+        When(In(outcome, ['push', 'void']), then=Value(0)),
+        default=F('profit_loss'),
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+def _validate_outcome(outcome):
+    if outcome not in SETTLED_OUTCOMES:
+        raise ValueError(f"Invalid outcome '{outcome}'; expected one of {', '.join(SETTLED_OUTCOMES)}")
+
+
+def settle_bets(queryset, outcome):
+    """Settle every pending bet in queryset with the same outcome; returns the number settled"""
+    _validate_outcome(outcome)
+    outcome_value = Value(outcome)
+    return queryset.filter(outcome='pending').update(
+        outcome=outcome_value,
+        profit_loss=profit_loss_expression(outcome_value),
+        updated_at=timezone.now(),
+    )
+
+
+def settle_results(results, batch_size=1000):
+    """
+    Settle pending bets with individual outcomes given as {bet_id: outcome}.
+
+    Each batch is one UPDATE whose outcome is a CASE over the bet ids; returns
+    the number of bets settled.
+    """
+    results = dict(results)
+    for outcome in results.values():
+        _validate_outcome(outcome)
+
+    settled = 0
+    bet_ids = list(results)
+    with transaction.atomic():
+        for start in range(0, len(bet_ids), batch_size):
+            batch = bet_ids[start:start + batch_size]
+            outcome_case = Case(
+                *[When(pk=bet_id, then=Value(results[bet_id])) for bet_id in batch],
+                output_field=Bet._meta.get_field('outcome'),
+            )
+            settled += Bet.objects.filter(pk__in=batch, outcome='pending').update(
+                outcome=outcome_case,
+                profit_loss=profit_loss_expression(outcome_case),
+                updated_at=timezone.now(),
+            )
+    return settled
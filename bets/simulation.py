@@ -0,0 +1,133 @@
+# bets/simulation.py
+"""
+Monte Carlo bankroll simulation from estimated probabilities.
+
+Every simulated path settles the same sequence of bets (pending ones, or the
+settled history) with outcomes drawn from their estimated_probability, at
+the recorded stakes and odds. Paths are generated in fixed-size chunks, each
+with its own child of one SeedSequence, and the chunks are spread over a
+process pool; results therefore depend only on the seed, never on the
+number of workers. Models are imported lazily so pool workers can import
+this module without Django being set up.
+"""
+import math
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .parallel import parallel_map
+
+
+SOURCES = ('pending', 'history')
+
+# Paths per task handed to a worker process
+CHUNK_PATHS = 5000
+# Upper bound on simulated bet outcomes held in memory at once per worker
+MAX_CELLS = 2_000_000
+# Bet positions at which the percentile bands are reported
+BAND_POINTS = 50
+BAND_PERCENTILES = (5, 25, 50, 75, 95)
+FINAL_PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+HISTOGRAM_BINS = 40
+
+
+def _require_numpy():
+    if np is None:
+        raise ImproperlyConfigured("Monte Carlo simulation requires numpy")
+
+
+def load_selections(source='pending'):
+    """(probability 0-1, odds, stake) arrays of the pending or settled win/loss bets, in date order"""
+    from .models import Bet
+
+    _require_numpy()
+    if source == 'pending':
+        bets = Bet.objects.filter(outcome='pending')
+    elif source == 'history':
+        # Push and void bets returned the stake: there is no outcome to simulate
+        bets = Bet.objects.filter(outcome__in=('win', 'loss'))
+    else:
+        raise ValueError(f"source must be one of: {', '.join(SOURCES)}")
+    rows = list(bets.order_by('date', 'id').values_list('estimated_probability', 'bookmaker_odds', 'stake'))
+    if not rows:
+        return np.empty(0), np.empty(0), np.empty(0)
+    probabilities, odds, stakes = (np.array(column, dtype='float64') for column in zip(*rows))
+    return probabilities / 100, odds, stakes
+
+
+def _simulate_chunk(task):
+    """Final P/L, ruin flag and P/L at the band positions of `paths` simulated paths"""
+    probabilities, odds, stakes, paths, seed_sequence, bankroll, positions = task
+    rng = np.random.default_rng(seed_sequence)
+    win_profit = stakes * (odds - 1)
+    finals = np.empty(paths)
+    ruined = np.zeros(paths, dtype=bool)
+    bands = np.empty((paths, len(positions)))
+
+    rows = max(min(paths, MAX_CELLS // len(probabilities)), 1)
+    for start in range(0, paths, rows):
+        stop = min(start + rows, paths)
+        wins = rng.random((stop - start, len(probabilities))) < probabilities
+        profit = np.where(wins, win_profit, -stakes).cumsum(axis=1)
+        finals[start:stop] = profit[:, -1]
+        bands[start:stop] = profit[:, positions]
+        if bankroll is not None:
+            ruined[start:stop] = bankroll + profit.min(axis=1) <= 0
+    return finals, ruined, bands
+
+
+def _rounded(values):
+    return [round(float(value), 2) for value in values]
+
+
+def simulate(probabilities, odds, stakes, paths=10000, seed=0, bankroll=None, workers=None):
+    """
+    Simulate `paths` seasons of the given bets and summarise the final P/L distribution.
+
+    Risk of ruin is the share of paths whose bankroll (starting at `bankroll`) reaches 0 at
+    any point; it is None when no bankroll is given.
+    """
+    _require_numpy()
+    count = len(probabilities)
+    result = {
+        'bets': count,
+        'paths': paths,
+        'seed': seed,
+        'bankroll': bankroll,
+        'total_staked': round(float(np.sum(stakes)), 2),
+        'expected_profit': round(float(np.sum(stakes * (probabilities * odds - 1))), 2),
+    }
+    if count == 0:
+        return result
+
+    positions = np.unique(np.linspace(0, count - 1, min(BAND_POINTS, count)).round().astype(int))
+    chunks = math.ceil(paths / CHUNK_PATHS)
+    seeds = np.random.SeedSequence(seed).spawn(chunks)
+    tasks = [
+        (probabilities, odds, stakes, min(CHUNK_PATHS, paths - index * CHUNK_PATHS), seeds[index], bankroll, positions)
+        for index in range(chunks)
+    ]
+    finals, ruined, bands = (np.concatenate(parts) for parts in zip(*parallel_map(_simulate_chunk, tasks, workers)))
+
+    counts, edges = np.histogram(finals, bins=HISTOGRAM_BINS)
+    band_values = np.percentile(bands, BAND_PERCENTILES, axis=0)
+    result.update({
+        'mean_profit': round(float(finals.mean()), 2),
+        'std_profit': round(float(finals.std()), 2),
+        'probability_of_profit': round(float((finals > 0).mean()) * 100, 2),
+        'risk_of_ruin': round(float(ruined.mean()) * 100, 2) if bankroll is not None else None,
+        'percentiles': {
+            f'p{percent}': round(float(value), 2)
+            for percent, value in zip(FINAL_PERCENTILES, np.percentile(finals, FINAL_PERCENTILES))
+        },
+        'histogram': {'edges': _rounded(edges), 'counts': counts.tolist()},
+        'bands': {
+            'bet': (positions + 1).tolist(),
+            **{f'p{percent}': _rounded(values) for percent, values in zip(BAND_PERCENTILES, band_values)},
+        },
+    })
+    return result
@@ -1,3 +1,1334 @@
-from django.test import TestCase
+import asyncio
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+import io
+import json
+import os
+import re
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.db.models import F, Q, QuerySet, Sum
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+
+from . import analytics, backtest, exposure, feed, importers, odds, seeding, simulation, views
+from .cache import bump_bets_version, cache_stats, get_bets_version
+from .columnar import COLUMNS, BetSnapshot, ColumnarAnalytics, clear_snapshots, get_snapshot
+from .exports import EXPORT_FORMATS
+from .forms import BetForm
+from .instrumentation import QueryBudgetExceeded, QueryBudgetTestMixin, query_budget
+from .models import (
+    Bet, BetDailyRollup, BetExposure, BetType, Bookmaker, CacheVersion, Competition, OddsQuote, OddsSnapshot, Sport,
+    Team,
+)
+from .settlement import SETTLED_OUTCOMES, settle_bets, settle_results
+
+
+def seed_bets(count=200):
+    """Small but realistic dataset: two sports, three bookmakers, mixed outcomes over ~4 months"""
+    sports = [Sport.objects.create(name=name, code=code) for name, code in (('Football', 'FB'), ('Basketball', 'BB'))]
+    bookmakers = [Bookmaker.objects.create(name=name) for name in ('Bet365', 'Betano', 'Betclic')]
+    bet_type = BetType.objects.create(name='Match Winner', category='match_result')
+    fixtures = []
+    for sport in sports:
+        competition = Competition.objects.create(name=f'{sport.name} League', sport=sport)
+        home = Team.objects.create(name=f'{sport.name} Home', sport=sport)
+        away = Team.objects.create(name=f'{sport.name} Away', sport=sport)
+        fixtures.append((sport, competition, home, away))
+
+    now = timezone.now()
+    outcomes = ('win', 'loss', 'pending', 'push')
+    bets = []
+    for i in range(count):
+        sport, competition, home, away = fixtures[i % len(fixtures)]
+        bets.append(Bet(
+            date=now - timedelta(days=i % 120, hours=i % 24),
+            sport=sport, competition=competition, home_team=home, away_team=away,
+            bet_type=bet_type, bookmaker=bookmakers[i % len(bookmakers)],
+            estimated_probability=Decimal(40 + i % 30), bookmaker_odds=Decimal('2.10'),
+            stake=Decimal(10 + i % 5), confidence_level=1 + i % 5,
+            outcome=outcomes[i % len(outcomes)],
+        ))
+    Bet.objects.bulk_create(bets)
+
+
+@contextmanager
+def record_queries():
+    """Collect (sql, params) of every query executed inside the block"""
+    queries = []
+
+    def wrapper(execute, sql, params, many, context):
+        queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield queries
+
+
+class QueryPlanTests(TestCase):
+    """The main query of each filtered endpoint must be served by an index, never a full table scan"""
+
+    TABLES = (Bet._meta.db_table, BetDailyRollup._meta.db_table)
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_bets()
+
+    def setUp(self):
+        cache.clear()
+        if connection.vendor == 'postgresql':
+            # On a small table a sequential scan is cheaper; make the planner show whether an index applies
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def full_scans(self, sql, params, tables=TABLES):
+        """
+        Tables read in full (sequential or whole-index scan) by the plan of sql. Walking an index
+        in ORDER BY order under a LIMIT (a top-N read) stops early and does not count.
+        """
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f"{connection.ops.explain_query_prefix(format='json')} {sql}", params)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                return list(self._postgres_full_scans(plan[0]['Plan'], tables))
+
+            # SQLite: "SEARCH table ..." uses an index lookup, "SCAN table [USING INDEX ...]" reads everything
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            plan = '\n'.join(str(row[-1]) for row in cursor.fetchall())
+        names = '|'.join(tables)
+        top_n = (
+            re.search(r'\bORDER BY\b.*\bLIMIT\b', sql)
+            and not re.search(r'\bGROUP BY\b|\b(SUM|COUNT|AVG)\(', sql)
+            and 'USE TEMP B-TREE FOR ORDER BY' not in plan
+        )
+        return [
+            table for table, index in re.findall(rf'\bSCAN ({names})\b( USING (?:COVERING )?INDEX)?', plan)
+            if not (top_n and index)
+        ]
+
+    def _postgres_full_scans(self, node, tables, limited=False):
+        if node.get('Relation Name') in tables:
+            if node['Node Type'] == 'Seq Scan' or (
+                node['Node Type'] in ('Index Scan', 'Index Only Scan') and 'Index Cond' not in node and not limited
+            ):
+                yield node['Relation Name']
+        # Below a Limit, only nodes that stream rows in order keep the index scan bounded
+        limited = node['Node Type'] == 'Limit' or (
+            limited and node['Node Type'] in ('Incremental Sort', 'Nested Loop', 'Result')
+        )
+        for child in node.get('Plans', []):
+            yield from self._postgres_full_scans(child, tables, limited)
+
+    def assertIndexedQueries(self, url, tables=TABLES):
+        with record_queries() as queries:
+            response = self.client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+
+        checked = [(sql, params) for sql, params in queries if any(table in sql for table in tables)]
+        self.assertTrue(checked, f'{url} ran no query on {", ".join(tables)}')
+        for sql, params in checked:
+            self.assertEqual(self.full_scans(sql, params, tables), [], f'{url} degraded to a full scan:\n{sql}')
+
+    def test_profit_evolution_uses_index(self):
+        self.assertIndexedQueries(reverse('bets:profit_evolution_data') + '?days=30')
+
+    def test_monthly_summary_uses_index(self):
+        self.assertIndexedQueries(reverse('bets:monthly_summary_data') + '?months=3')
+
+    def test_export_date_range_uses_index(self):
+        today = timezone.localdate()
+        start = (today - timedelta(days=7)).isoformat()
+        self.assertIndexedQueries(reverse('bets:export_bets') + f'?start={start}&end={today}')
+
+    def test_export_sport_outcome_uses_index(self):
+        sport = Sport.objects.get(code='FB')
+        self.assertIndexedQueries(reverse('bets:export_bets') + f'?sport={sport.pk}&outcome=win')
+
+    def test_dashboard_uses_index(self):
+        # The all-time totals read every rollup row (one per day and segment); Bet must not be scanned
+        self.assertIndexedQueries(reverse('bets:dashboard'), tables=(Bet._meta.db_table,))
+
+    def test_roi_by_sport_uses_index(self):
+        self.assertIndexedQueries(reverse('bets:roi_by_sport_data'))
+
+    def test_bankroll_uses_index(self):
+        self.assertIndexedQueries(reverse('bets:bankroll_data'))
+
+    def test_calibration_uses_index(self):
+        self.assertIndexedQueries(reverse('bets:calibration_data'))
+
+    def test_monthly_stats_uses_index(self):
+        now = timezone.now()
+        with record_queries() as queries:
+            Bet.get_monthly_stats(now.year, now.month)
+        for sql, params in queries:
+            self.assertEqual(self.full_scans(sql, params), [], sql)
+
+
+class SeedingTests(TestCase):
+    def test_seed_bets_creates_consistent_data(self):
+        self.assertEqual(seeding.seed_bets(500, seed=7, batch_size=200), 500)
+        self.assertEqual(Bet.objects.count(), 500)
+        self.assertTrue(Bet.objects.filter(outcome='pending').exists())
+        self.assertFalse(Bet.objects.filter(expected_value=0, implied_probability=0).exists())
+        self.assertEqual(BetDailyRollup.find_drift(), [])
+
+        # Reference data is reused, not duplicated, when seeding again
+        sports = Sport.objects.count()
+        seeding.seed_bets(10, seed=8)
+        self.assertEqual(Sport.objects.count(), sports)
+        self.assertEqual(Bet.objects.count(), 510)
+
+
+class RollupTests(TestCase):
+    """Incrementally maintained rollups equal a rebuild from the Bet rows"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_bets()
+
+    def assertMatchesRebuild(self):
+        self.assertEqual(BetDailyRollup.find_drift(), [])
+        self.assertEqual(BetExposure.find_drift(), [])
+        fields = (*BetDailyRollup.KEY_FIELDS, *BetDailyRollup.VALUE_FIELDS)
+        stored = sorted(BetDailyRollup.objects.values_list(*fields))
+        BetDailyRollup.rebuild()
+        self.assertEqual(sorted(BetDailyRollup.objects.values_list(*fields)), stored)
+
+    def test_save_update_and_delete(self):
+        bet = Bet.objects.filter(outcome='pending').first()
+        bet.outcome = 'win'
+        bet.stake = Decimal('33')
+        bet.save()
+        bet.date -= timedelta(days=200)
+        bet.save()
+        new = Bet.objects.get(pk=bet.pk)
+        new.pk = None
+        new.outcome = 'pending'
+        new.save()
+        self.assertMatchesRebuild()
+
+        betano = Bookmaker.objects.get(name='Betano')
+        Bet.objects.filter(bookmaker=betano).update(stake=Decimal('12.50'))
+        Bet.objects.filter(outcome='push').update(outcome='void', date=timezone.now() - timedelta(days=3))
+        self.assertMatchesRebuild()
+
+        Bet.objects.filter(pk=bet.pk).first().delete()
+        Bet.objects.filter(bookmaker=betano, outcome='win').delete()
+        self.assertMatchesRebuild()
+
+    def test_category_change_and_cascading_deletes(self):
+        bet_type = BetType.objects.get()
+        bet_type.category = 'handicap'
+        bet_type.save()
+        self.assertEqual(set(BetDailyRollup.objects.values_list('bet_type_category', flat=True)), {'handicap'})
+        self.assertMatchesRebuild()
+
+        Team.objects.get(name='Football Away').delete()
+        self.assertMatchesRebuild()
+        Sport.objects.get(code='BB').delete()
+        self.assertMatchesRebuild()
+        Bookmaker.objects.get(name='Betano').delete()
+        bet_type.delete()
+        self.assertFalse(BetDailyRollup.objects.exists())
+        self.assertMatchesRebuild()
+
+    def test_bucket_created_concurrently(self):
+        """A bucket created by another transaction after our UPDATE missed it is added to, not duplicated"""
+        original = QuerySet.update
+        missed = []
+
+        def update(queryset, **kwargs):
+            if queryset.model is BetDailyRollup and not missed:
+                missed.append(queryset)
+                return 0
+            return original(queryset, **kwargs)
+
+        bet = Bet.objects.exclude(outcome='pending').first()
+        bet.pk = None
+        with mock.patch.object(QuerySet, 'update', update):
+            bet.save()
+        self.assertEqual(len(missed), 1)
+        self.assertMatchesRebuild()
+
+    def test_headline_windows_start_at_exact_time(self):
+        now = timezone.now()
+        sample = Bet.objects.filter(outcome='win').first()
+        for offset in (timedelta(hours=-1), timedelta(hours=1)):
+            for days in (30, 60):
+                sample.pk = None
+                sample.date = now - timedelta(days=days) + offset
+                sample.save()
+
+        def profit(query):
+            return Bet.objects.filter(query).exclude(outcome='pending').aggregate(total=Sum('profit_loss'))['total']
+
+        recent = Q(date__gte=now - timedelta(days=30))
+        previous = Q(date__gte=now - timedelta(days=60), date__lt=now - timedelta(days=30))
+        clear_snapshots()  # the saves above did not commit, so the bets version did not move
+        for backend in (analytics, ColumnarAnalytics.current()):
+            with self.subTest(backend=backend):
+                metrics = backend.headline_metrics(now=now)
+                self.assertEqual(to_cents(metrics['recent_profit_loss']), to_cents(profit(recent)))
+                self.assertEqual(
+                    to_cents(metrics['recent_staked']),
+                    to_cents(Bet.objects.filter(recent).aggregate(total=Sum('stake'))['total']),
+                )
+                previous_profit = profit(previous)
+                trend = round((float(profit(recent)) - float(previous_profit)) / abs(float(previous_profit)) * 100, 2)
+                self.assertEqual(metrics['profit_trend'], trend)
+
+    def test_rebuild_command(self):
+        bucket = BetDailyRollup.objects.first()
+        BetDailyRollup.objects.filter(pk=bucket.pk).update(stake_sum=0)
+        self.assertEqual(len(BetDailyRollup.find_drift({bucket.day})), 1)
+        self.assertEqual(BetDailyRollup.find_drift({bucket.day + timedelta(days=1)}), [])
+        with self.assertRaises(CommandError):
+            call_command('rebuild_rollups', check=True, stdout=io.StringIO())
+        call_command('rebuild_rollups', stdout=io.StringIO())
+        self.assertMatchesRebuild()
+
+
+class ExportTests(TestCase):
+    """Exported bets import back unchanged"""
+
+    FIELDS = (
+        'date', 'sport__name', 'competition__name', 'home_team__name', 'away_team__name', 'bet_type__name',
+        'bookmaker__name', 'estimated_probability', 'bookmaker_odds', 'stake', 'confidence_level', 'outcome',
+        'profit_loss', 'neutral_ground', 'kickoff', 'selection',
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_bets(count=6)
+        bet = Bet.objects.earliest('date')
+        bet.neutral_ground = True
+        bet.kickoff = bet.date + timedelta(hours=2)
+        bet.selection = 'Home, "draw no bet"'
+        bet.save()
+
+    def ledger(self):
+        return sorted(Bet.objects.values_list(*self.FIELDS))
+
+    def test_round_trip(self):
+        expected = self.ledger()
+        for fmt in EXPORT_FORMATS:
+            with self.subTest(fmt):
+                out = io.StringIO()
+                call_command('export_bets', format=fmt, stdout=out)
+                lines = out.getvalue().splitlines()
+                self.assertEqual(len(lines), len(expected) + (fmt == 'csv'))
+
+                with transaction.atomic():
+                    Bet.objects.all().delete()
+                    importer = importers.BetImporter()
+                    importer.run(importers.iter_rows(io.StringIO(out.getvalue()), fmt))
+                    self.assertEqual((importer.imported, importer.error_count), (len(expected), 0))
+                    self.assertEqual(self.ledger(), expected)
+                    transaction.set_rollback(True)
+
+
+class ImporterTests(TestCase):
+    CSV = (
+        "date,sport,competition,home_team,away_team,bet_type,bookmaker,estimated_probability,"
+        "bookmaker_odds,stake,confidence_level,outcome\n"
+        "2024-03-01,football,Premier League,Arsenal,Chelsea,Match Winner,bet365,55,2.10,10,3,win\n"
+        "2024-03-02T18:30:00+00:00,Football,premier league,ARSENAL,Liverpool,match winner,Bet365,40,2.80,5,2,pending\n"
+        "2024-03-03,Football,Premier League,Arsenal,Chelsea,Match Winner,Bet365,55,0.90,10,3,loss\n"
+        "not a date,Football,Premier League,Arsenal,Chelsea,Match Winner,Bet365,55,2.10,10,3,win\n"
+        "2024-03-04,Football,Premier League,Arsenal,,Match Winner,Bet365,55,2.10,10,3,win\n"
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        sport = Sport.objects.create(name='Football', code='FB')
+        Team.objects.create(name='Arsenal', sport=sport)
+        Bookmaker.objects.create(name='Bet365')
+
+    def run_importer(self, text, fmt, **options):
+        importer = importers.BetImporter(**options)
+        importer.run(importers.iter_rows(io.StringIO(text), fmt))
+        return importer
+
+    def test_csv_import(self):
+        importer = self.run_importer(self.CSV, 'csv')
+        self.assertEqual((importer.rows_read, importer.imported, importer.error_count), (5, 2, 3))
+        self.assertEqual([line for line, _ in importer.errors], [4, 5, 6])
+        self.assertIn('away_team', importer.errors[2][1])
+
+        # Names match existing entities and each other regardless of case
+        self.assertEqual(Sport.objects.count(), 1)
+        self.assertEqual(Bookmaker.objects.count(), 1)
+        self.assertEqual(list(Team.objects.order_by('name').values_list('name', flat=True)), ['Arsenal', 'Chelsea', 'Liverpool'])
+        self.assertEqual(list(Competition.objects.values_list('name', flat=True)), ['Premier League'])
+        self.assertEqual(list(BetType.objects.values_list('name', flat=True)), ['Match Winner'])
+        self.assertEqual(
+            importer.entities.created,
+            {'sports': 0, 'competitions': 1, 'teams': 2, 'bookmakers': 0, 'bet_types': 1},
+        )
+
+        win = Bet.objects.get(outcome='win')
+        self.assertEqual(win.profit_loss, Decimal('11.00'))
+        self.assertEqual(Bet.objects.get(outcome='pending').date, datetime(2024, 3, 2, 18, 30, tzinfo=timezone.utc))
+        self.assertEqual(BetDailyRollup.find_drift(), [])
+
+    def test_ndjson_import(self):
+        row = {
+            'date': '2024-03-01', 'sport': 'Tennis', 'competition': 'ATP Tour', 'home_team': 'Sinner',
+            'away_team': 'Alcaraz', 'bet_type': 'Match Winner', 'bookmaker': 'Betano',
+            'estimated_probability': 60.5, 'bookmaker_odds': 1.85, 'stake': 20, 'confidence_level': 4,
+        }
+        text = '\n'.join([json.dumps(row), '', '{not json', json.dumps([1, 2]), json.dumps({**row, 'stake': -5})])
+        importer = self.run_importer(text, 'ndjson')
+        self.assertEqual((importer.imported, importer.error_count), (1, 3))
+        self.assertEqual([line for line, _ in importer.errors], [3, 4, 5])
+        self.assertIn('Invalid JSON', importer.errors[0][1])
+        bet = Bet.objects.get()
+        self.assertEqual((bet.sport.name, bet.estimated_probability, bet.bookmaker_odds), ('Tennis', Decimal('60.50'), Decimal('1.85')))
+
+    def test_impossible_dates_are_row_errors(self):
+        header, valid = self.CSV.splitlines()[:2]
+        text = '\n'.join([header, valid, valid.replace('2024-03-01', '2024-02-30'), valid]) + '\n'
+        importer = self.run_importer(text, 'csv')
+        self.assertEqual((importer.imported, importer.errors), (2, [(3, "Invalid date '2024-02-30'")]))
+
+        row = {
+            'date': '2024-03-01', 'kickoff': '2024-03-01T25:00', 'sport': 'Football', 'competition': 'Cup',
+            'home_team': 'Arsenal', 'away_team': 'Chelsea', 'bet_type': 'Match Winner', 'bookmaker': 'Bet365',
+            'estimated_probability': 55, 'bookmaker_odds': 2.1, 'stake': 10, 'confidence_level': 3,
+        }
+        importer = self.run_importer(json.dumps(row), 'ndjson')
+        self.assertEqual((importer.imported, importer.errors), (0, [(1, "Invalid date '2024-03-01T25:00'")]))
+        self.assertEqual(Bet.objects.count(), 2)
+
+    def test_unknown_entities_rejected_without_create(self):
+        importer = self.run_importer(self.CSV, 'csv', create_missing=False)
+        self.assertEqual(importer.imported, 0)
+        self.assertIn("Unknown competition", importer.errors[0][1])
+        self.assertFalse(Competition.objects.exists())
+
+    def test_dry_run_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write(self.CSV)
+        self.addCleanup(os.remove, handle.name)
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('import_bets', handle.name, dry_run=True, stdout=stdout, stderr=stderr)
+        self.assertIn('Validated 2 of 5 rows', stdout.getvalue())
+        self.assertIn('Line 4:', stderr.getvalue())
+        self.assertFalse(Bet.objects.exists())
+        self.assertEqual(Team.objects.count(), 1)
+
+        with self.assertRaises(CommandError):
+            call_command('import_bets', handle.name, strict=True, stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertFalse(Bet.objects.exists())
+
+
+@override_settings(BETS_QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    """Every instrumented view stays within its declared @query_budget"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_bets()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_dashboard(self):
+        self.assertWithinQueryBudget(reverse('bets:dashboard'))
+
+    def test_chart_endpoints(self):
+        names = (
+            'profit_evolution_data', 'roi_by_sport_data', 'monthly_summary_data', 'bankroll_data', 'simulation_data',
+            'clv_data', 'exposure_data',
+        )
+        for name in names:
+            with self.subTest(name):
+                self.assertWithinQueryBudget(reverse(f'bets:{name}'))
+        for by in analytics.CALIBRATION_DIMENSIONS:
+            with self.subTest('calibration_data', by=by):
+                self.assertWithinQueryBudget(reverse('bets:calibration_data') + f'?by={by}')
+        team = Team.objects.first()
+        self.assertWithinQueryBudget(reverse('bets:exposure_data') + f'?team={team.pk}&bookmaker=1')
+
+    def test_export(self):
+        self.assertWithinQueryBudget(reverse('bets:export_bets'))
+
+    def test_cache_stats(self):
+        response = self.assertWithinQueryBudget(reverse('bets:cache_stats'))
+        self.assertEqual(response.json()['version'], get_bets_version())
+
+    def test_add_bet(self):
+        self.assertWithinQueryBudget(reverse('bets:add_bet'))
+        bet = Bet.objects.first()
+        response = self.assertWithinQueryBudget(reverse('bets:add_bet'), method='post', data={
+            'date': '2024-05-01T20:00',
+            'sport': bet.sport_id, 'competition': bet.competition_id,
+            'home_team': bet.home_team_id, 'away_team': bet.away_team_id,
+            'bet_type': bet.bet_type_id, 'bookmaker': bet.bookmaker_id,
+            'estimated_probability': '55', 'bookmaker_odds': '2.00', 'stake': '10', 'confidence_level': '3',
+        })
+        self.assertEqual(response.status_code, 302)
+
+    def test_option_endpoints(self):
+        sport = Sport.objects.get(code='FB')
+        self.assertWithinQueryBudget(reverse('bets:team_options') + f'?sport={sport.pk}&q=foot')
+        self.assertWithinQueryBudget(reverse('bets:competition_options') + f'?sport={sport.pk}')
+
+    def test_ev_calculator(self):
+        url = reverse('bets:calculate_ev') + '?estimated_probability=55&bookmaker_odds=2.00&stake=10'
+        self.assertContains(self.assertWithinQueryBudget(url), '€1.00')
+
+    @override_settings(BETS_ANALYTICS_BACKEND='columnar')
+    def test_columnar_backend(self):
+        self.assertWithinQueryBudget(reverse('bets:dashboard'))
+        for name in ('profit_evolution_data', 'roi_by_sport_data', 'monthly_summary_data'):
+            with self.subTest(name):
+                self.assertWithinQueryBudget(reverse(f'bets:{name}'))
+
+    def test_server_timing_header(self):
+        with self.assertLogs('bets.performance', 'INFO') as logs:
+            response = self.client.get(reverse('bets:roi_by_sport_data'))
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, view;dur=[\d.]+')
+        self.assertEqual([record.levelname for record in logs.records], ['INFO'])
+        self.assertEqual(json.loads(logs.records[0].getMessage())['view'], 'bets:roi_by_sport_data')
+
+    def test_exceeding_budget_raises(self):
+        original = views.dashboard_view.query_budget
+        query_budget(1)(views.dashboard_view)
+        try:
+            with self.assertRaises(QueryBudgetExceeded), self.assertLogs('bets.performance', 'WARNING') as logs:
+                self.client.get(reverse('bets:dashboard'))
+            self.assertIn('over its budget of 1', logs.output[0])
+        finally:
+            query_budget(original)(views.dashboard_view)
+
+
+class RoiBySportTests(TestCase):
+    """roi_by_sport_data returns the segments of every ?by dimension, best first"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_bets()
+        # Bets in a second category, so the category labels come from more than one choice
+        BetType.objects.create(name='Handicap', category='handicap')
+        Bet.objects.filter(pk__in=Bet.objects.filter(sport__code='BB').values('pk')[:40]).update(
+            bet_type=BetType.objects.get(name='Handicap'),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def expected_segments(self, key, label):
+        """Segments computed in Python from the settled Bet rows"""
+        totals = {}
+        for bet in Bet.objects.filter(outcome__in=SETTLED_OUTCOMES).select_related(
+            'sport', 'competition', 'bookmaker', 'bet_type',
+        ):
+            segment = totals.setdefault(key(bet), {'label': label(bet), 'bets': 0, 'staked': 0, 'profit': 0})
+            segment['bets'] += 1
+            segment['staked'] += bet.stake
+            segment['profit'] += bet.profit_loss
+        segments = sorted(
+            (-round(float(row['profit'] * 100 / row['staked']), 6), segment_key, row)
+            for segment_key, row in totals.items() if row['staked'] > 0
+        )
+        return [
+            {
+                'key': segment_key, 'label': row['label'], 'roi': round(-roi, 2), 'total_bets': row['bets'],
+                'staked': float(row['staked']), 'profit': float(row['profit']),
+            }
+            for roi, segment_key, row in segments[:10]
+        ]
+
+    def test_dimensions(self):
+        categories = dict(BetType.CATEGORY_CHOICES)
+        dimensions = {
+            'sport': (lambda bet: bet.sport_id, lambda bet: bet.sport.name),
+            'competition': (lambda bet: bet.competition_id, lambda bet: bet.competition.name),
+            'bookmaker': (lambda bet: bet.bookmaker_id, lambda bet: bet.bookmaker.name),
+            'category': (lambda bet: bet.bet_type.category, lambda bet: categories[bet.bet_type.category]),
+            'confidence_level': (lambda bet: bet.confidence_level, lambda bet: str(bet.confidence_level)),
+        }
+        self.assertEqual(set(dimensions), set(analytics.ROI_DIMENSIONS))
+        for by, (key, label) in dimensions.items():
+            with self.subTest(by):
+                response = self.client.get(reverse('bets:roi_by_sport_data'), {'by': by})
+                self.assertEqual(response.status_code, 200)
+                data = response.json()
+                expected = self.expected_segments(key, label)
+                self.assertGreater(len(expected), 1)
+                self.assertEqual(data['by'], by)
+                self.assertEqual(to_cents(data['segments']), to_cents(expected))
+                self.assertEqual(data['labels'], [segment['label'] for segment in expected])
+                self.assertEqual(data['roi_values'], [segment['roi'] for segment in expected])
+                self.assertEqual('sports' in data, by == 'sport')
+
+        response = self.client.get(reverse('bets:roi_by_sport_data'), {'by': 'category'})
+        self.assertEqual(set(response.json()['labels']), {'Match Result', 'Handicap'})
+
+    def test_unknown_dimension(self):
+        response = self.client.get(reverse('bets:roi_by_sport_data'), {'by': 'team'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('confidence_level', response.json()['message'])
+
+
+class ChartParameterTests(TestCase):
+    """Out-of-range chart parameters are a 400, never a server error"""
+
+    def assertRejected(self, name, params):
+        response = self.client.get(reverse(f'bets:{name}'), params)
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertEqual(response.json()['error'], 'Parâmetros inválidos')
+
+    def test_profit_evolution_range(self):
+        for params in ({'days': '999999999'}, {'days': '3661'}, {'end': '9999-12-31'}, {'start': '2024-02-30'}):
+            with self.subTest(params):
+                self.assertRejected('profit_evolution_data', params)
+        self.assertEqual(self.client.get(reverse('bets:profit_evolution_data'), {'days': '3660'}).status_code, 200)
+
+    def test_monthly_summary_range(self):
+        for params in ({'months': '99999999999'}, {'months': '121'}, {'end': '9999-12'}, {'start': '0001-01'}):
+            with self.subTest(params):
+                self.assertRejected('monthly_summary_data', params)
+        self.assertEqual(self.client.get(reverse('bets:monthly_summary_data'), {'months': '120'}).status_code, 200)
+
+    def test_bankroll_must_be_finite(self):
+        for value in ('nan', 'inf', '-inf'):
+            with self.subTest(value):
+                self.assertRejected('bankroll_data', {'bankroll': value})
+
+
+class AdminChangelistQueryTests(TestCase):
+    """Admin changelists run a fixed number of queries, however many rows they show"""
+
+    CHANGELISTS = ('bet', 'sport', 'competition', 'team', 'bookmaker', 'bettype')
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_bets(count=12)
+        cls.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def add_rows(self):
+        """Another sport with its own competition, teams, bookmaker and bet type, and bets on them"""
+        sport = Sport.objects.create(name='Tennis', code='TN')
+        competition = Competition.objects.create(name='ATP Tour', sport=sport)
+        home = Team.objects.create(name='Sinner', sport=sport)
+        away = Team.objects.create(name='Alcaraz', sport=sport)
+        bookmaker = Bookmaker.objects.create(name='Pinnacle')
+        bet_type = BetType.objects.create(name='Set Handicap', category='handicap')
+        Bet.objects.bulk_create(
+            Bet(
+                date=timezone.now() - timedelta(days=i), sport=sport, competition=competition,
+                home_team=home, away_team=away, bet_type=bet_type, bookmaker=bookmaker,
+                estimated_probability=Decimal(50), bookmaker_odds=Decimal('2.10'), stake=Decimal(10),
+                confidence_level=3, outcome=('win', 'loss', 'pending')[i % 3],
+            )
+            for i in range(12)
+        )
+
+    def test_query_count_does_not_grow_with_rows(self):
+        urls = {name: reverse(f'admin:bets_{name}_changelist') for name in self.CHANGELISTS}
+        counts = {}
+        for name, url in urls.items():
+            self.client.get(url)  # warm up the per-process caches (content types, sessions)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            counts[name] = len(queries)
+
+        self.add_rows()
+        for name, url in urls.items():
+            with self.subTest(name), self.assertNumQueries(counts[name]):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class BetFormOptionsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_bets(count=8)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unbound_form_has_no_team_or_competition_choices(self):
+        form = BetForm()
+        self.assertEqual(list(form.fields['home_team'].queryset), [])
+        self.assertEqual(list(form.fields['competition'].queryset), [])
+
+    def test_team_options_are_limited_to_sport_and_prefix(self):
+        football = Sport.objects.get(code='FB')
+        response = self.client.get(reverse('bets:team_options'), {'sport': football.pk, 'q': 'football h'})
+        self.assertContains(response, 'Football Home', count=2)
+        self.assertNotContains(response, 'Football Away')
+        self.assertNotContains(response, 'Basketball')
+
+    def test_new_team_invalidates_cached_options(self):
+        football = Sport.objects.get(code='FB')
+        url = reverse('bets:team_options')
+        self.assertNotContains(self.client.get(url, {'sport': football.pk}), 'Football Reserves')
+        with self.captureOnCommitCallbacks(execute=True):
+            Team.objects.create(name='Football Reserves', sport=football)
+        self.assertContains(self.client.get(url, {'sport': football.pk}), 'Football Reserves', count=2)
+
+    def test_team_from_another_sport_is_rejected(self):
+        bet = Bet.objects.filter(sport__code='FB').first()
+        other_sport_team = Team.objects.get(name='Basketball Away')
+        form = BetForm({
+            'date': '2024-05-01T20:00', 'sport': bet.sport_id, 'competition': bet.competition_id,
+            'home_team': bet.home_team_id, 'away_team': other_sport_team.pk,
+            'bet_type': bet.bet_type_id, 'bookmaker': bet.bookmaker_id,
+            'estimated_probability': '55', 'bookmaker_odds': '2.00', 'stake': '10', 'confidence_level': '3',
+        })
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors['away_team'], ["A equipa visitante deve pertencer ao desporto selecionado."])
+
+
+class CacheVersionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_bets(count=8)
+
+    def setUp(self):
+        cache.clear()
+
+    def open_bets(self):
+        return self.client.get(reverse('bets:exposure_data')).json()['open']['bets']
+
+    def test_bet_write_invalidates_cached_payload(self):
+        before = self.open_bets()
+        bet = Bet.objects.filter(outcome='win').first()
+        bet.pk = None
+        bet.outcome = 'pending'
+        with self.captureOnCommitCallbacks(execute=True):
+            bet.save()
+        self.assertEqual(self.open_bets(), before + 1)
+
+    def test_version_bumped_by_another_process_invalidates(self):
+        self.open_bets()
+        self.open_bets()
+        self.assertEqual(cache_stats()['payloads']['exposure'], {'hits': 1, 'misses': 1})
+        # Another process only touches the database row, never this process's cache
+        CacheVersion.objects.filter(name='bets').update(version=F('version') + 1)
+        self.open_bets()
+        self.assertEqual(cache_stats()['payloads']['exposure'], {'hits': 1, 'misses': 2})
+
+    def test_recreated_version_does_not_restart_at_one(self):
+        old = get_bets_version()
+        CacheVersion.objects.all().delete()
+        new = get_bets_version()
+        self.assertGreater(new, old)
+        bump_bets_version()
+        self.assertEqual(get_bets_version(), new + 1)
+
+
+class EVBatchTests(TestCase):
+    url = reverse_lazy('bets:ev_batch')
+
+    def post(self, payload):
+        return self.client.post(self.url, json.dumps(payload), content_type='application/json')
+
+    def test_metrics_and_kelly_stake(self):
+        response = self.post({
+            'selections': [
+                {'id': 'a', 'probability': 55, 'odds': 2.0, 'stake': 10},
+                {'id': 'b', 'probability': 40, 'odds': 2.0, 'stake': 10},
+            ],
+            'bankroll': 1000,
+            'kelly_multiplier': 0.5,
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        first, second = data['results']
+        self.assertEqual(first, {
+            'id': 'a', 'ev': 1.0, 'implied_probability': 50.0, 'edge': -5.0,
+            'kelly_fraction': 0.1, 'kelly_stake': 50.0,
+        })
+        self.assertEqual((second['ev'], second['kelly_stake']), (-2.0, 0.0))
+        self.assertEqual(data['summary'], {'positive_ev': 1, 'total_ev': 1.0})
+
+    def test_invalid_selection_is_rejected(self):
+        for selection in ({'probability': 120, 'odds': 2}, {'probability': 50, 'odds': 1}, {'odds': 2}):
+            with self.subTest(selection):
+                response = self.post({'selections': [selection]})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['error'], 'Parâmetros inválidos')
+
+    def test_non_finite_values_are_rejected(self):
+        selection = {'probability': 50, 'odds': 2, 'stake': 10}
+        payloads = [
+            {'selections': [{**selection, 'odds': 1e309}]},
+            {'selections': [{**selection, 'stake': float('nan')}]},
+            {'selections': [selection], 'bankroll': 'inf'},
+        ]
+        for payload in payloads:
+            with self.subTest(payload):
+                response = self.post(payload)
+                self.assertEqual(response.status_code, 400)
+                self.assertNotIn(b'Infinity', response.content)
+
+    def test_requires_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        body = json.dumps({'selections': [{'probability': 55, 'odds': 2.0}]})
+        self.assertEqual(client.post(self.url, body, content_type='application/json').status_code, 403)
+
+        # Pages carry the token for HTMX requests in hx-headers
+        page = client.get(reverse('bets:add_bet'))
+        token = re.search(r'"X-CSRFToken": "([^"]+)"', page.content.decode())[1]
+        response = client.post(self.url, body, content_type='application/json', HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.status_code, 200)
+
+
+def to_cents(value):
+    """Round every Decimal/float in nested results to 2 places (SQLite sums decimals as floats)"""
+    if isinstance(value, dict):
+        return {key: to_cents(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_cents(item) for item in value]
+    if isinstance(value, (Decimal, float)):
+        return round(Decimal(str(value)), 2)
+    return value
+
+
+class BetSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_bets()
+
+    def test_exact_summary(self):
+        queryset = Bet.objects.filter(sport__code='FB', stake__gt=11)
+        summary = analytics.bet_summary(queryset, approximate_above=0)
+        settled = queryset.filter(outcome__in=('win', 'loss', 'push', 'void'))
+        self.assertFalse(summary['approximate'])  # only PostgreSQL samples
+        self.assertEqual(summary['total_bets'], queryset.count())
+        self.assertEqual(to_cents(summary['total_staked']), to_cents(queryset.aggregate(total=Sum('stake'))['total']))
+        self.assertEqual(
+            to_cents(summary['total_profit_loss']), to_cents(settled.aggregate(total=Sum('profit_loss'))['total'])
+        )
+        self.assertEqual(summary['win_rate'], round(queryset.filter(outcome='win').count() * 100 / settled.count(), 2))
+
+    def test_sample_is_scaled_up(self):
+        totals = {
+            'total_bets': 7, 'total_staked': Decimal('70.50'), 'total_profit_loss': -3.25,
+            'avg_odds': Decimal('2.1'), 'completed_bets': 5, 'wins': 2,
+        }
+        scaled = analytics.scale_sample(totals, 2.5)
+        self.assertEqual(scaled, {
+            'total_bets': 280, 'total_staked': Decimal('2820.00'), 'total_profit_loss': Decimal('-130.00'),
+            'avg_odds': Decimal('2.1'), 'completed_bets': 200, 'wins': 80,
+        })
+        self.assertIsNone(analytics.scale_sample({**totals, 'total_staked': None}, 50)['total_staked'])
+
+    def test_sample_applies_to_filtered_scan(self):
+        queryset = Bet.objects.filter(home_team__name__icontains='home', stake__gt=5).order_by('-date')
+        sql, params = analytics.sampled_summary_sql(queryset, 1)
+        inner = sql[sql.index('FROM (') + len('FROM ('):]
+        self.assertRegex(inner, r'^SELECT .* FROM "bets_bet" TABLESAMPLE SYSTEM \(%s\) INNER JOIN .* WHERE ')
+        self.assertNotIn('ORDER BY', sql)
+        self.assertEqual(params[sql.count('%s', 0, sql.index('TABLESAMPLE'))], 1)
+        self.assertEqual(params[-1], Decimal('5'))
+
+
+class ColumnarAnalyticsTests(TestCase):
+    """The NumPy backend returns the same analytics as the SQL one"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_bets()
+
+    def setUp(self):
+        # Each test rolls the bets version back; never reuse a snapshot loaded by another test
+        clear_snapshots()
+        self.columnar = ColumnarAnalytics.current()
+
+    def test_matches_orm_backend(self):
+        today = timezone.localdate()
+        start = today - timedelta(days=90)
+        checks = [
+            ('dashboard_metrics', ()),
+            ('performance_summary', ()),
+            ('monthly_summary', (start, today)),
+            *(('profit_series', (start, today, interval)) for interval in analytics.TRUNC_FUNCTIONS),
+            *(('segment_roi', (by,)) for by in analytics.ROI_DIMENSIONS),
+        ]
+        for name, args in checks:
+            with self.subTest(name, args=args):
+                self.assertEqual(
+                    to_cents(getattr(self.columnar, name)(*args)), to_cents(getattr(analytics, name)(*args))
+                )
+
+    def test_snapshot_reloads_after_writes(self):
+        snapshot = get_snapshot()
+        self.assertIs(get_snapshot(), snapshot)
+        self.assertEqual(len(snapshot), Bet.objects.count())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Bet.objects.filter(outcome='pending').update(stake=Decimal('20'))
+        updated = get_snapshot()
+        with self.assertNumQueries(1):
+            self.assertIs(get_snapshot(), updated)
+        self.assertIsNot(updated, snapshot)
+        self.assertEqual(updated.stake[updated.pending].tolist(), [20.0] * int(updated.pending.sum()))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Bet.objects.filter(pk=Bet.objects.first().pk).delete()
+        self.assertEqual(len(get_snapshot()), Bet.objects.count())
+
+    def test_chunked_load(self):
+        whole = BetSnapshot.load('key')
+        # A count below the real size (rows inserted meanwhile) makes the arrays grow
+        with mock.patch.object(QuerySet, 'count', return_value=50):
+            chunked = BetSnapshot.load('key', chunk_size=7)
+        self.assertEqual(len(chunked), Bet.objects.count())
+        for name, _, dtype in COLUMNS:
+            with self.subTest(name):
+                self.assertEqual(getattr(chunked, name).dtype, np.dtype(dtype))
+                self.assertEqual(getattr(chunked, name).tolist(), getattr(whole, name).tolist())
+        self.assertEqual(sorted(whole.outcome.tolist()), sorted(Bet.objects.values_list('outcome', flat=True)))
+
+
+class BankrollHistoryTests(TestCase):
+    def create_bets(self, outcomes):
+        sport = Sport.objects.create(name='Football', code='FB')
+        competition = Competition.objects.create(name='League', sport=sport)
+        home = Team.objects.create(name='Home', sport=sport)
+        away = Team.objects.create(name='Away', sport=sport)
+        bet_type = BetType.objects.create(name='Match Winner', category='match_result')
+        bookmaker = Bookmaker.objects.create(name='Bet365')
+        start = timezone.now() - timedelta(days=len(outcomes))
+        Bet.objects.bulk_create(
+            Bet(
+                date=start + timedelta(days=i), sport=sport, competition=competition, home_team=home,
+                away_team=away, bet_type=bet_type, bookmaker=bookmaker, estimated_probability=Decimal('50'),
+                bookmaker_odds=Decimal('2.00'), stake=Decimal('10'), confidence_level=3, outcome=outcome,
+            )
+            for i, outcome in enumerate(outcomes)
+        )
+
+    def test_drawdown_and_streaks(self):
+        # Balance: 110 120 110 100 90 90 100 110 120 130 then pending (ignored)
+        self.create_bets(['win', 'win', 'loss', 'loss', 'loss', 'void', 'win', 'win', 'win', 'win', 'pending'])
+        history = analytics.bankroll_history(initial=100)
+
+        self.assertEqual(history['settled_bets'], 10)
+        self.assertEqual(history['final_bankroll'], 130)
+        self.assertEqual(history['max_drawdown']['amount'], 30)
+        self.assertEqual(history['max_drawdown']['percentage'], 25)
+        self.assertEqual(history['longest_drawdown'], {'days': 7, 'bets': 6})
+        self.assertEqual(history['current_drawdown'], 0)
+        self.assertEqual(history['streaks']['longest_win'], 4)
+        self.assertEqual(history['streaks']['longest_loss'], 3)
+        self.assertEqual(history['curve']['bankroll'][-1], 130)
+
+    def test_curve_is_downsampled_keeping_extremes(self):
+        self.create_bets(['win'] * 30 + ['loss'] * 30 + ['win'] * 40)
+        history = analytics.bankroll_history(initial=0, max_points=20)
+        curve = history['curve']['bankroll']
+        self.assertLessEqual(len(curve), 20)
+        # The intermediate peak (300) and trough (0) survive downsampling
+        self.assertIn(300, curve)
+        self.assertIn(0, curve)
+        self.assertEqual(curve[-1], 400)
+
+
+class SimulationTests(TestCase):
+    probabilities = np.array([0.55, 0.40, 0.70] * 20)
+    odds = np.array([2.0, 2.6, 1.5] * 20)
+    stakes = np.full(60, 10.0)
+
+    def test_result_depends_only_on_seed(self):
+        # 3 chunks: in-process and in a two-process pool must agree exactly
+        kwargs = {'paths': simulation.CHUNK_PATHS * 2 + 10, 'seed': 7, 'bankroll': 50}
+        serial = simulation.simulate(self.probabilities, self.odds, self.stakes, workers=1, **kwargs)
+        pooled = simulation.simulate(self.probabilities, self.odds, self.stakes, workers=2, **kwargs)
+        self.assertEqual(serial, pooled)
+        kwargs['seed'] = 8
+        self.assertNotEqual(serial, simulation.simulate(self.probabilities, self.odds, self.stakes, workers=1, **kwargs))
+
+    def test_distribution_matches_expectation(self):
+        result = simulation.simulate(self.probabilities, self.odds, self.stakes, paths=20000, seed=1, bankroll=1000)
+        self.assertAlmostEqual(result['mean_profit'], result['expected_profit'], delta=2)
+        self.assertEqual(result['risk_of_ruin'], 0)
+        self.assertEqual(sum(result['histogram']['counts']), 20000)
+        self.assertEqual(result['bands']['bet'][-1], 60)
+        self.assertLessEqual(result['percentiles']['p5'], result['percentiles']['p95'])
+
+    def test_certain_outcomes(self):
+        result = simulation.simulate(np.ones(4), np.full(4, 2.0), np.full(4, 10.0), paths=100, bankroll=5)
+        self.assertEqual((result['percentiles']['p1'], result['percentiles']['p99']), (40, 40))
+        self.assertEqual(result['risk_of_ruin'], 0)
+
+    def test_endpoint_rejects_bad_parameters(self):
+        for params in ({'source': 'future'}, {'bankroll': 'nan'}, {'bankroll': 'inf'}):
+            with self.subTest(params):
+                response = self.client.get(reverse('bets:simulation_data'), params)
+                self.assertEqual(response.status_code, 400)
+
+
+class BacktestTests(TestCase):
+    # p=0.6 at odds 2.0 is a 20% full Kelly stake; a win then a loss
+    history = {
+        'probability': np.array([0.6, 0.6]),
+        'odds': np.array([2.0, 2.0]),
+        'confidence': np.array([3.0, 3.0]),
+        'returns': np.array([1.0, -1.0]),
+        'dates': np.array([datetime(2024, 1, 1), datetime(2024, 1, 2)]),
+    }
+
+    def test_strategies_replay_stakes(self):
+        configs = backtest.expand_grid(kelly_fractions=[1.0], units=[0.01], max_stakes=[None, 0.1])
+        result = backtest.backtest(self.history, configs, bankroll=1000, workers=1)
+        equity = {
+            (row['strategy'], row['max_stake']): row['equity'] for row in result['results']
+        }
+        self.assertEqual(equity[('flat', None)], [1000, 1010, 1000])
+        self.assertEqual(equity[('confidence', None)], [1000, 1030, 1000])
+        self.assertEqual(equity[('kelly', None)], [1000, 1200, 960])
+        self.assertEqual(equity[('kelly', 0.1)], [1000, 1100, 990])
+        kelly = result['results'][2]
+        self.assertEqual((kelly['turnover'], kelly['roi'], kelly['max_drawdown']), (440, -9.09, 20))
+        self.assertEqual(result['curve']['bet'], [0, 1, 2])
+
+    def test_grid_and_workers(self):
+        configs = backtest.expand_grid(['flat', 'kelly'], kelly_fractions=[0.5, 1.0], units=[0.01], max_stakes=[None])
+        self.assertEqual(len(configs), 3)  # the Kelly fraction does not multiply flat configurations
+        with self.assertRaises(ValueError):
+            backtest.expand_grid(['martingale'])
+
+        seed_bets()
+        history = backtest.load_history()
+        configs = backtest.expand_grid(kelly_fractions=[0.25, 0.5, 1.0], units=[0.01, 0.02], max_stakes=[None, 0.05])
+        serial = backtest.backtest(history, configs, workers=1)
+        self.assertEqual(serial, backtest.backtest(history, configs, workers=2))
+        self.assertEqual(len(serial['results']), len(configs))
+        self.assertEqual(serial['bets'], Bet.objects.exclude(outcome='pending').count())
+
+    def test_endpoint(self):
+        seed_bets()
+        response = self.client.get(reverse('bets:backtest_data'), {'strategy': 'kelly', 'kelly_fraction': '0.5,1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
+        for params in ({'max_stake': '2'}, {'max_stake': 'nan'}, {'bankroll': 'inf'}, {'bankroll': 'nan'},
+                       {'kelly_fraction': 'nan'}, {'kelly_fraction': '1.5'}, {'unit': 'nan'}):
+            with self.subTest(params):
+                response = self.client.get(reverse('bets:backtest_data'), params)
+                self.assertEqual(response.status_code, 400)
+
+
+class ExposureTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_bets()
+
+    def expected_stake(self, query=Q()):
+        return float(Bet.objects.filter(query, outcome='pending').aggregate(total=Sum('stake'))['total'] or 0)
+
+    def test_ledger_follows_bet_writes(self):
+        self.assertEqual(BetExposure.find_drift(), [])
+        bet = Bet.objects.filter(outcome='pending').first()
+        bet.kickoff = timezone.now() + timedelta(days=1)
+        bet.stake = Decimal('50')
+        bet.save()
+        self.assertEqual(BetExposure.find_drift(), [])
+        bet.outcome = 'win'
+        bet.save()
+        Bet.objects.filter(outcome='pending').first().delete()
+        self.assertEqual(BetExposure.find_drift(), [])
+
+        betano, betclic = Bookmaker.objects.get(name='Betano'), Bookmaker.objects.get(name='Betclic')
+        Bet.objects.filter(outcome='pending', bookmaker=betano).update(bookmaker=betclic, stake=Decimal('20'))
+        self.assertEqual(BetExposure.find_drift(), [])
+        settle_bets(Bet.objects.filter(bookmaker__name='Bet365'), 'loss')
+        self.assertEqual(BetExposure.find_drift(), [])
+        self.assertEqual(set(BetExposure.objects.values_list('bookmaker__name', flat=True)), {'Betclic'})
+
+    def test_worst_case_loss(self):
+        team = Team.objects.get(name='Football Away')
+        bookmaker = Bookmaker.objects.get(name='Betano')
+        # Reopen a Basketball bet so two matches are open
+        reopened = Bet.objects.filter(sport__code='BB').first()
+        reopened.outcome = 'pending'
+        reopened.save()
+        with self.assertNumQueries(1):
+            result = exposure.worst_case_loss(teams=[team.pk], bookmakers=[bookmaker.pk])
+        expected = self.expected_stake(Q(home_team=team) | Q(away_team=team) | Q(bookmaker=bookmaker))
+        self.assertAlmostEqual(result['worst_case_loss'], expected, places=2)
+        self.assertAlmostEqual(result['open']['stake'], self.expected_stake(), places=2)
+        self.assertAlmostEqual(result['unaffected_stake'], self.expected_stake() - expected, places=2)
+
+        summary = exposure.exposure_summary()
+        self.assertEqual(summary['open']['bets'], Bet.objects.filter(outcome='pending').count())
+        self.assertEqual(len(summary['by_match']), 2)
+        self.assertEqual(len(summary['by_team']), 4)  # a match's bets count for both of its teams
+        self.assertAlmostEqual(sum(row['stake'] for row in summary['by_bookmaker']), self.expected_stake(), places=2)
+
+    def test_rebuild_command(self):
+        BetExposure.objects.update(stake_sum=0)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_exposure', check=True, stdout=io.StringIO())
+        call_command('rebuild_exposure', stdout=io.StringIO())
+        self.assertEqual(BetExposure.find_drift(), [])
+
+    def test_endpoint_rejects_bad_match(self):
+        response = self.client.get(reverse('bets:exposure_data'), {'match': '12'})
+        self.assertEqual(response.status_code, 400)
+
+
+class SettlementTests(TestCase):
+    """Set-based settlement writes what Bet.save() would, and leaves settled bets alone"""
+
+    STORED_FIELDS = ('outcome', 'profit_loss', 'roi', 'potential_payout', 'expected_value')
+    PRICES = ((Decimal('7.33'), Decimal('1.915')), (Decimal('10'), Decimal('2.10')), (Decimal('25.50'), Decimal('3.333')))
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_bets(8)
+        cls.bulk, cls.saved = Bookmaker.objects.create(name='Bulk'), Bookmaker.objects.create(name='Saved')
+
+    def open_bets(self, bookmaker):
+        """One pending bet per outcome and price, in a fixed order"""
+        template = Bet.objects.first()
+        bets = []
+        for outcome in SETTLED_OUTCOMES:
+            for stake, odds in self.PRICES:
+                template.pk = None
+                template.bookmaker = bookmaker
+                template.stake, template.bookmaker_odds, template.outcome = stake, odds, 'pending'
+                template.notes = outcome
+                template.save()
+                bets.append(Bet.objects.get(pk=template.pk))
+        return bets
+
+    def assertSameAsSave(self, settle):
+        bulk, saved = self.open_bets(self.bulk), self.open_bets(self.saved)
+        settle(bulk)
+        for bet in saved:
+            bet.outcome = bet.notes
+            bet.save()
+
+        for expected, bet in zip(saved, bulk):
+            bet.refresh_from_db()
+            with self.subTest(outcome=bet.notes, stake=bet.stake):
+                self.assertEqual(
+                    [getattr(bet, field) for field in self.STORED_FIELDS],
+                    [getattr(Bet.objects.get(pk=expected.pk), field) for field in self.STORED_FIELDS],
+                )
+
+        def rollups(bookmaker):
+            fields = ('day', 'outcome', *BetDailyRollup.VALUE_FIELDS)
+            return sorted(BetDailyRollup.objects.filter(bookmaker=bookmaker).values_list(*fields))
+
+        self.assertEqual(rollups(self.bulk), rollups(self.saved))
+        self.assertFalse(BetExposure.objects.filter(bookmaker__in=(self.bulk, self.saved)).exists())
+        self.assertEqual(BetDailyRollup.find_drift(), [])
+        self.assertEqual(BetExposure.find_drift(), [])
+
+    def test_settle_bets_matches_save(self):
+        def settle(bets):
+            for outcome in SETTLED_OUTCOMES:
+                settled = settle_bets(Bet.objects.filter(pk__in=[bet.pk for bet in bets if bet.notes == outcome]), outcome)
+                self.assertEqual(settled, len(self.PRICES))
+        self.assertSameAsSave(settle)
+
+    def test_settle_results_matches_save(self):
+        def settle(bets):
+            self.assertEqual(settle_results({bet.pk: bet.notes for bet in bets}, batch_size=5), len(bets))
+        self.assertSameAsSave(settle)
+
+    def test_settled_bets_are_skipped(self):
+        won = Bet.objects.filter(outcome='win').first()
+        before = [getattr(won, field) for field in self.STORED_FIELDS]
+        self.assertEqual(settle_bets(Bet.objects.filter(pk=won.pk), 'loss'), 0)
+        pending = Bet.objects.filter(outcome='pending').first()
+        self.assertEqual(settle_results({won.pk: 'void', pending.pk: 'push'}), 1)
+        won.refresh_from_db()
+        self.assertEqual([getattr(won, field) for field in self.STORED_FIELDS], before)
+        self.assertEqual(Bet.objects.get(pk=pending.pk).profit_loss, 0)
+        self.assertEqual(BetDailyRollup.find_drift(), [])
+
+        with self.assertRaises(ValueError):
+            settle_bets(Bet.objects.all(), 'pending')
+
+
+class CalibrationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_bets()
+
+    def test_scores_match_per_bet_computation(self):
+        settled = Bet.objects.filter(outcome__in=('win', 'loss'))
+        p = np.array([float(bet.estimated_probability) / 100 for bet in settled])
+        y = np.array([bet.outcome == 'win' for bet in settled], dtype=float)
+
+        with self.assertNumQueries(1):
+            report = analytics.calibration_report(bucket_width=10)
+        overall = report['overall']
+        self.assertEqual(overall['bets'], len(p))
+        self.assertAlmostEqual(overall['brier_score'], ((p - y) ** 2).mean(), places=4)
+        self.assertAlmostEqual(overall['log_loss'], -(y * np.log(p) + (1 - y) * np.log(1 - p)).mean(), places=4)
+        self.assertEqual([bucket['lower'] for bucket in overall['buckets']], [40, 50, 60])
+        self.assertEqual(sum(bucket['bets'] for bucket in overall['buckets']), len(p))
+
+    def test_sliced_by_dimension(self):
+        report = analytics.calibration_report(by='sport')
+        self.assertEqual({segment['label'] for segment in report['segments']}, {'Football', 'Basketball'})
+        self.assertEqual(sum(segment['bets'] for segment in report['segments']), report['overall']['bets'])
+
+    def test_certain_forecast_has_finite_log_loss(self):
+        Bet.objects.filter(outcome='loss').update(estimated_probability=Decimal('100'))
+        overall = analytics.calibration_report()['overall']
+        self.assertEqual(overall['buckets'][-1]['upper'], 100)
+        self.assertLess(overall['log_loss'], 10)
+
+
+class ClosingLineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_bets(count=4)
+        cls.kickoff = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        Bet.objects.filter(outcome__in=('win', 'loss')).update(kickoff=cls.kickoff, selection='home')
+
+    def ingest(self, rows):
+        ingester = odds.OddsIngester(chunk_size=2)
+        ingester.run((number, row) for number, row in enumerate(rows, start=1))
+        return ingester
+
+    def price_row(self, bet, minutes_before, price, **changes):
+        row = {
+            'sport': bet.sport.name, 'home_team': bet.home_team.name, 'away_team': bet.away_team.name,
+            'kickoff': self.kickoff.isoformat(), 'bet_type': bet.bet_type.name, 'selection': 'home',
+            'bookmaker': bet.bookmaker.name,
+            'observed_at': (self.kickoff - timedelta(minutes=minutes_before)).isoformat(), 'odds': price,
+        }
+        row.update(changes)
+        return row
+
+    def test_ingest_and_link_closing_line(self):
+        bet = Bet.objects.get(outcome='win')  # taken at 2.10
+        ingester = self.ingest([
+            self.price_row(bet, 120, 2.2),
+            self.price_row(bet, 5, 1.95),  # closing price
+            self.price_row(bet, -10, 1.5),  # in-play, after kickoff
+            self.price_row(bet, 5, 1.95),  # duplicate, ignored
+            self.price_row(bet, 60, 2.0, bookmaker='Unknown Book'),
+        ])
+        self.assertEqual(ingester.error_count, 1)
+        self.assertEqual(OddsSnapshot.objects.count(), 3)
+
+        self.assertEqual(odds.link_closing_lines(), 2)
+        bet.refresh_from_db()
+        self.assertEqual(bet.closing_odds, Decimal('1.95'))
+        self.assertEqual(bet.clv, Decimal('7.69'))  # 2.10 / 1.95 - 1
+        self.assertIsNone(Bet.objects.get(outcome='loss').clv)
+
+        # Changing the odds taken keeps CLV in step, through save() and update()
+        bet.bookmaker_odds = Decimal('1.95')
+        bet.save()
+        self.assertEqual(bet.clv, Decimal('0.00'))
+        Bet.objects.filter(pk=bet.pk).update(bookmaker_odds=Decimal('2.34'))
+        self.assertEqual(Bet.objects.get(pk=bet.pk).clv, Decimal('20.00'))
+
+        self.assertEqual(odds.clv_summary(), {'bets': 1, 'average_clv': 20.0, 'beat_closing_line': 100.0})
+
+    def test_closing_line_lookup_is_one_statement(self):
+        with self.assertNumQueries(1):
+            odds.link_closing_lines()
+
+    def test_admin_change_page_shows_closing_line_fields(self):
+        user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(user)
+        bet = Bet.objects.get(outcome='win')
+        response = self.client.get(reverse('admin:bets_bet_change', args=[bet.pk]))
+        self.assertEqual(response.status_code, 200)
+        form = response.context['adminform'].form
+        self.assertIn('kickoff', form.fields)
+        self.assertIn('selection', form.fields)
+        self.assertContains(response, 'Closing odds')
+        self.assertEqual(self.client.get(reverse('admin:bets_bet_add')).status_code, 200)
+
+
+class FeedConsumerTests(TransactionTestCase):
+    """Feed writes run in a worker thread, so they need real commits"""
+
+    def setUp(self):
+        sport = Sport.objects.create(name='Football', code='FB')
+        Team.objects.create(name='Home', sport=sport)
+        Team.objects.create(name='Away', sport=sport)
+        BetType.objects.create(name='Match Winner', category='match_result')
+        Bookmaker.objects.create(name='Bet365')
+        kickoff = timezone.now().replace(microsecond=0) + timedelta(hours=2)
+        observed = kickoff - timedelta(hours=1)
+
+        def update(selection, minute, price):
+            return json.dumps({
+                'sport': 'Football', 'home_team': 'Home', 'away_team': 'Away', 'kickoff': kickoff.isoformat(),
+                'bet_type': 'Match Winner', 'selection': selection, 'bookmaker': 'Bet365',
+                'observed_at': (observed + timedelta(minutes=minute)).isoformat(), 'odds': price,
+            })
+
+        lines = [update('home', 0, 2.0), update('away', 0, 3.5), update('home', 2, 2.1), 'not json',
+                 update('home', 1, 1.9), update('away', 3, 3.4)]
+        handle, self.path = tempfile.mkstemp(suffix='.ndjson')
+        with os.fdopen(handle, 'w') as feed_file:
+            feed_file.write('\n'.join(lines) + '\n')
+        self.addCleanup(os.remove, self.path)
+
+    def assertLatestQuotes(self, consumer):
+        quotes = dict(OddsQuote.objects.values_list('selection', 'odds'))
+        self.assertEqual(quotes, {'home': Decimal('2.10'), 'away': Decimal('3.40')})
+        self.assertEqual(consumer.metrics.invalid, 1)
+
+    def test_file_updates_are_coalesced_and_upserted(self):
+        async def consume():
+            consumer = feed.FeedConsumer(window=60, queue_size=2)
+            running = asyncio.create_task(consumer.run())
+            await consumer.read_file(self.path)
+            await consumer.stop()
+            await running
+            return consumer
+
+        consumer = asyncio.run(consume())
+        self.assertLatestQuotes(consumer)
+        # One flush of the two latest prices; the queue of 2 made the reader wait
+        self.assertEqual((consumer.metrics.flushes, consumer.metrics.written, consumer.metrics.superseded), (1, 2, 3))
+        self.assertGreater(consumer.metrics.backpressure_waits, 0)
+        self.assertEqual(OddsSnapshot.objects.count(), 2)
+
+    def test_replay_over_unix_socket(self):
+        socket_path = os.path.join(tempfile.mkdtemp(), 'feed.sock')
+
+        async def consume():
+            consumer = feed.FeedConsumer(window=0.01, max_batch=1)
+            running = asyncio.create_task(consumer.run())
+            server = await consumer.serve(path=socket_path)
+            sent = await feed.replay(self.path, path=socket_path)
+            # Let the connection handler queue the last lines before stopping
+            while consumer.metrics.received < sent:
+                await asyncio.sleep(0.01)
+            server.close()
+            await consumer.stop()
+            await running
+            return consumer, sent
+
+        consumer, sent = asyncio.run(consume())
+        self.assertEqual(sent, 6)
+        self.assertLatestQuotes(consumer)
+        # max_batch=1 writes each update at once; the late 1.90 home price is older than the written 2.10
+        self.assertEqual((consumer.metrics.written, consumer.metrics.stale), (4, 1))
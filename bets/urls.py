@@ -10,9 +10,25 @@ urlpatterns = [
     
     # Bet management
     path('add/', views.add_bet_view, name='add_bet'),
+    path('export/', views.export_bets_view, name='export_bets'),
+    
+    # HTMX option endpoints for the dependent selects of the bet form
+    path('options/competitions/', views.competition_options, name='competition_options'),
+    path('options/teams/', views.team_options, name='team_options'),
+    
+    # Expected value: live calculator (HTMX) and batch screening API (JSON)
+    path('calculate-ev/', views.calculate_ev, name='calculate_ev'),
+    path('api/ev/batch/', views.ev_batch_view, name='ev_batch'),
     
     # Chart data endpoints (existing)
     path('chart-data/profit-evolution/', views.profit_evolution_data, name='profit_evolution_data'),
     path('chart-data/roi-by-sport/', views.roi_by_sport_data, name='roi_by_sport_data'),
     path('chart-data/monthly-summary/', views.monthly_summary_data, name='monthly_summary_data'),
+    path('chart-data/bankroll/', views.bankroll_data, name='bankroll_data'),
+    path('chart-data/simulation/', views.simulation_data, name='simulation_data'),
+    path('chart-data/backtest/', views.backtest_data, name='backtest_data'),
+    path('chart-data/calibration/', views.calibration_data, name='calibration_data'),
+    path('chart-data/clv/', views.clv_data, name='clv_data'),
+    path('chart-data/exposure/', views.exposure_data, name='exposure_data'),
+    path('chart-data/cache-stats/', views.cache_stats_view, name='cache_stats'),
 ]
\ No newline at end of file
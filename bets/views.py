@@ -1,16 +1,25 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.db.models import Sum, Avg, Count, Q
-from .models import Bet, Sport, BetType, Bookmaker, Competition, Team
+from .models import Bet, Competition, Team
 from django.utils import timezone 
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 from .forms import BetForm
+from . import analytics, backtest, ev, exposure, odds, simulation
+from .exports import EXPORT_FORMATS, export_queryset, iter_export
+from .cache import cache_stats, cached_json_view, get_options_version, get_or_build
+from .instrumentation import query_budget
 
 # Adicione estas importações no topo do views.py
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.views.decorators.http import require_GET, require_POST
+from functools import lru_cache
+import json
+import math
 import calendar
 
+@query_budget(24)
 def add_bet_view(request):
     """View for adding a new bet"""
     if request.method == 'POST':
@@ -30,127 +39,293 @@ def add_bet_view(request):
     }
     return render(request, 'bets/add_bet.html', context)
 
-def calculate_ev(request):
-    """HTMX view to calculate and display Expected Value in real-time"""
+# Máximo de opções devolvidas pelos selects dependentes (use ?q= para filtrar por prefixo)
+MAX_OPTIONS = 100
+
+
+def _option_filters(request):
+    """Lê sport (id) e q (prefixo do nome) dos parâmetros GET; sport None se inválido"""
     try:
-        estimated_prob = request.GET.get('estimated_probability')
-        odds = request.GET.get('bookmaker_odds')
-        stake = request.GET.get('stake')
-        
-        ev = 0
-        implied_prob = 0
-        potential_profit = 0
-        roi_percentage = 0
-        
-        if estimated_prob and odds and stake:
-            prob = float(estimated_prob) / 100
-            odds_val = float(odds)
-            stake_val = float(stake)
-            
-            # Calculate Expected Value
-            ev = (prob * (odds_val - 1) * stake_val) - ((1 - prob) * stake_val)
-            
-            # Calculate implied probability
-            implied_prob = (1 / odds_val) * 100
-            
-            # Calculate potential profit
-            potential_profit = (odds_val - 1) * stake_val
-            
-            # Calculate ROI percentage
-            roi_percentage = (potential_profit / stake_val) * 100 if stake_val > 0 else 0
-        
-        context = {
-            'ev': round(ev, 2),
-            'implied_prob': round(implied_prob, 2),
-            'estimated_prob': float(estimated_prob) if estimated_prob else 0,
-            'potential_profit': round(potential_profit, 2),
-            'roi_percentage': round(roi_percentage, 2),
-            'ev_positive': ev > 0,
-            'prob_advantage': float(estimated_prob) > implied_prob if estimated_prob else False
-        }
-        
-        return render(request, 'bets/partials/ev_display.html', context)
-    
-    except (ValueError, TypeError):
-        return render(request, 'bets/partials/ev_display.html', {
-            'ev': 0,
-            'implied_prob': 0,
-            'estimated_prob': 0,
-            'potential_profit': 0,
-            'roi_percentage': 0,
-            'ev_positive': False,
-            'prob_advantage': False
+        sport_id = int(request.GET.get('sport', ''))
+    except ValueError:
+        sport_id = None
+    return sport_id, request.GET.get('q', '').strip()[:50]
+
+
+@query_budget(2)
+def competition_options(request):
+    """HTMX: opções do select de competições para o desporto escolhido (?sport=ID&q=prefixo)"""
+    sport_id, prefix = _option_filters(request)
+
+    def build():
+        if sport_id is None:
+            return []
+        return list(
+            Competition.objects.filter(is_active=True, sport_id=sport_id, name__istartswith=prefix)
+            .order_by('name')[:MAX_OPTIONS]
+        )
+
+    competitions = get_or_build(
+        'competition_options', build, {'sport': sport_id, 'q': prefix.lower()}, version=get_options_version()
+    )
+    return render(request, 'bets/partials/competion_options.html', {'competitions': competitions})
+
+
+@query_budget(2)
+def team_options(request):
+    """
+    HTMX: selects de equipa casa/visitante só com as equipas do desporto escolhido.
+    Aceita ?sport=ID, ?q=prefixo e mantém home_team/away_team já selecionadas.
+    """
+    sport_id, prefix = _option_filters(request)
+
+    def build():
+        if sport_id is None:
+            return []
+        return list(
+            Team.objects.filter(is_active=True, sport_id=sport_id, name__istartswith=prefix)
+            .order_by('name')
+            .values('pk', 'name')[:MAX_OPTIONS]
+        )
+
+    teams = get_or_build('team_options', build, {'sport': sport_id, 'q': prefix.lower()}, version=get_options_version())
+    return render(request, 'bets/partials/team_select.html', {
+        'teams': teams,
+        'selected_home': request.GET.get('home_team', ''),
+        'selected_away': request.GET.get('away_team', ''),
+    })
+
+@lru_cache(maxsize=2048)
+def _ev_fragment(estimated_prob, odds, stake):
+    """HTML do cartão de EV para um trio de valores (arredondados), memorizado por processo"""
+    context = {
+        'ev': 0,
+        'implied_prob': 0,
+        'estimated_prob': estimated_prob or 0,
+        'potential_profit': 0,
+        'roi_percentage': 0,
+        'ev_positive': False,
+        'prob_advantage': False,
+    }
+    if estimated_prob is not None and odds and stake is not None:
+        metrics = ev.selection_metrics(estimated_prob, odds, stake)
+        context.update({
+            'ev': round(metrics['ev'], 2),
+            'implied_prob': round(metrics['implied_probability'], 2),
+            'potential_profit': round(metrics['potential_profit'], 2),
+            'roi_percentage': round(metrics['roi_percentage'], 2),
+            'ev_positive': metrics['ev'] > 0,
+            'prob_advantage': estimated_prob > metrics['implied_probability'],
         })
+    return render_to_string('bets/partials/ev_display.html', context)
+
+
+def _rounded_param(request, name):
+    """Parâmetro GET como float arredondado a 2 casas, ou None se vazio/inválido"""
+    try:
+        return round(float(request.GET[name]), 2)
+    except (KeyError, ValueError, TypeError):
+        return None
+
+
+@query_budget(0)
+@require_GET
+def calculate_ev(request):
+    """
+    HTMX view to calculate and display Expected Value in real-time.
+    Sem acesso à base de dados; o fragmento é memorizado para cada combinação de valores.
+    """
+    html = _ev_fragment(
+        _rounded_param(request, 'estimated_probability'),
+        _rounded_param(request, 'bookmaker_odds'),
+        _rounded_param(request, 'stake'),
+    )
+    return HttpResponse(html)
+
+
+# Máximo de seleções aceites por pedido no cálculo de EV em lote
+MAX_EV_BATCH = 2000
+
+
+def _parse_ev_batch(body):
+    """
+    Valida o JSON do cálculo em lote e devolve (probabilidades, odds, stakes, bankroll, kelly_multiplier, ids).
+    Lança ValueError com uma mensagem legível.
+    """
+    try:
+        payload = json.loads(body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise ValueError('O corpo do pedido deve ser JSON válido')
+    if not isinstance(payload, dict) or not isinstance(payload.get('selections'), list):
+        raise ValueError('Esperado um objeto com a lista "selections"')
+
+    selections = payload['selections']
+    if not selections:
+        raise ValueError('"selections" está vazia')
+    if len(selections) > MAX_EV_BATCH:
+        raise ValueError(f'Máximo de {MAX_EV_BATCH} seleções por pedido')
+
+    probabilities, odds, stakes, ids = [], [], [], []
+    for index, selection in enumerate(selections):
+        try:
+            probability = float(selection['probability'])
+            selection_odds = float(selection['odds'])
+            stake = float(selection.get('stake', 0))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            raise ValueError(f'Seleção {index}: probability e odds numéricos são obrigatórios')
+        if not all(map(math.isfinite, (probability, selection_odds, stake))):
+            raise ValueError(f'Seleção {index}: os valores devem ser números finitos')
+        if not 0 <= probability <= 100:
+            raise ValueError(f'Seleção {index}: probability deve estar entre 0 e 100')
+        if not selection_odds > 1:
+            raise ValueError(f'Seleção {index}: odds deve ser maior que 1')
+        if not stake >= 0:
+            raise ValueError(f'Seleção {index}: stake não pode ser negativo')
+        probabilities.append(probability)
+        odds.append(selection_odds)
+        stakes.append(stake)
+        ids.append(selection.get('id', index))
+
+    bankroll = payload.get('bankroll')
+    kelly_multiplier = payload.get('kelly_multiplier', 1)
+    try:
+        bankroll = float(bankroll) if bankroll is not None else None
+        kelly_multiplier = float(kelly_multiplier)
+    except (TypeError, ValueError):
+        raise ValueError('bankroll e kelly_multiplier devem ser numéricos')
+    if not all(map(math.isfinite, (kelly_multiplier, *([bankroll] if bankroll is not None else [])))):
+        raise ValueError('bankroll e kelly_multiplier devem ser números finitos')
+    if bankroll is not None and bankroll < 0:
+        raise ValueError('bankroll não pode ser negativo')
+    if not 0 < kelly_multiplier <= 1:
+        raise ValueError('kelly_multiplier deve estar entre 0 e 1 (ex.: 0.5 para meio Kelly)')
+    return probabilities, odds, stakes, bankroll, kelly_multiplier, ids
+
+
+@query_budget(0)
+@require_POST
+def ev_batch_view(request):
+    """
+    Calcula EV, probabilidade implícita, edge e stake de Kelly para muitas seleções numa só chamada.
+    Corpo JSON: {"selections": [{"id", "probability", "odds", "stake"}, ...], "bankroll", "kelly_multiplier"}.
+    Exige o token CSRF no cabeçalho X-CSRFToken, que as páginas enviam em todos os pedidos HTMX.
+    """
+    try:
+        probabilities, odds, stakes, bankroll, kelly_multiplier, ids = _parse_ev_batch(request.body)
+    except ValueError as e:
+        return JsonResponse({
+            'error': 'Parâmetros inválidos',
+            'message': str(e),
+        }, status=400)
+
+    # Cálculo vetorizado de todas as seleções de uma vez
+    metrics = ev.batch_metrics(probabilities, odds, stakes, bankroll=bankroll, kelly_multiplier=kelly_multiplier)
+    keys = list(metrics)
+    results = [
+        dict(zip(['id', *keys], row))
+        for row in zip(ids, *(metrics[key] for key in keys))
+    ]
+    positive = [result for result in results if result['ev'] > 0]
+    return JsonResponse({
+        'count': len(results),
+        'results': results,
+        'summary': {
+            'positive_ev': len(positive),
+            'total_ev': round(sum(result['ev'] for result in positive), 2),
+        },
+    })
+
+# Limite de intervalo aceite pelos endpoints de gráficos (10 anos)
+MAX_CHART_DAYS = 3660
+
+LABEL_FORMATS = {
+    'day': '%d/%m',
+    'week': '%d/%m',
+    'month': '%b %Y',
+}
+
+
+def _parse_date_range(request, default_days=30):
+    """
+    Lê start/end (YYYY-MM-DD) ou days dos parâmetros GET.
+    Devolve (start_date, end_date) ou lança ValueError (ou OverflowError) com uma mensagem legível.
+    """
+    end_param = request.GET.get('end')
+    start_param = request.GET.get('start')
+    days_param = request.GET.get('days')
+
+    end_date = datetime.strptime(end_param, '%Y-%m-%d').date() if end_param else timezone.localdate()
+    if end_date == date.max:
+        # As consultas vão até ao início do dia seguinte a end
+        raise ValueError('end fora do intervalo suportado')
+    if start_param:
+        start_date = datetime.strptime(start_param, '%Y-%m-%d').date()
+    else:
+        days = int(days_param) if days_param else default_days
+        if days < 1:
+            raise ValueError('days deve ser positivo')
+        if days > MAX_CHART_DAYS:
+            raise ValueError(f'Intervalo máximo de {MAX_CHART_DAYS} dias')
+        start_date = end_date - timedelta(days=days)
 
+    if start_date > end_date:
+        raise ValueError('start deve ser anterior a end')
+    if (end_date - start_date).days > MAX_CHART_DAYS:
+        raise ValueError(f'Intervalo máximo de {MAX_CHART_DAYS} dias')
+    return start_date, end_date
+
+
+@query_budget(5)
+@cached_json_view('profit_evolution')
 def profit_evolution_data(request):
     """
-    Fornece dados JSON para o gráfico de evolução dos lucros (últimos 30 dias)
+    Fornece dados JSON para o gráfico de evolução dos lucros.
+    Por defeito os últimos 30 dias; aceita ?days=N ou ?start=YYYY-MM-DD&end=YYYY-MM-DD
+    e ?interval=day|week|month.
     """
-    print("=== DEBUG: profit_evolution_data called (30 days) ===")
+    try:
+        start_date, end_date = _parse_date_range(request, default_days=30)
+        interval = request.GET.get('interval', 'day')
+        if interval not in analytics.TRUNC_FUNCTIONS:
+            raise ValueError('interval deve ser day, week ou month')
+    except (ValueError, OverflowError) as e:
+        return JsonResponse({
+            'error': 'Parâmetros inválidos',
+            'message': str(e),
+        }, status=400)
     
     try:
-        # Período - últimos 30 dias
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=30)
-        
-        print(f"DEBUG: Date range: {start_date} to {end_date}")
-        
-        # Buscar apostas completadas no período
-        completed_bets = Bet.objects.filter(
-            date__date__gte=start_date,
-            date__date__lte=end_date
-        ).exclude(outcome='pending').order_by('date')
-        
-        print(f"DEBUG: Found {completed_bets.count()} completed bets")
-        
-        # Dicionário para agrupar por dia
-        daily_data = {}
-        
-        # Inicializar todos os dias do período com lucro 0
-        current_date = start_date
-        while current_date <= end_date:
-            day_key = current_date.strftime('%Y-%m-%d')
-            daily_data[day_key] = {
-                'daily_profit': Decimal('0'),
-                'label': current_date.strftime('%d/%m'),  # Formato mais compacto
-                'full_date': current_date
-            }
-            current_date += timedelta(days=1)
-        
-        print(f"DEBUG: Created {len(daily_data)} day slots")
+        # Agrupamento e lucro acumulado calculados na base de dados
+        series = analytics.get_backend().profit_series(start_date, end_date, interval)
         
-        # Processar apostas - agrupar por dia
-        for bet in completed_bets:
-            day_key = bet.date.strftime('%Y-%m-%d')
-            if day_key in daily_data:
-                daily_data[day_key]['daily_profit'] += bet.profit_loss or Decimal('0')
-                print(f"DEBUG: Added bet {bet.id} profit {bet.profit_loss} to {day_key}")
+        label_format = LABEL_FORMATS[interval]
+        if interval != 'month' and start_date.year != end_date.year:
+            label_format += '/%Y'
         
-        # Preparar dados para o gráfico
+        # Preencher os períodos sem apostas, mantendo o acumulado anterior
         labels = []
         daily_profits = []
         cumulative_data = []
         cumulative_profit = Decimal('0')
+        total_bets = 0
         
-        # Processar dados ordenados por data
-        for day_key in sorted(daily_data.keys()):
-            day_info = daily_data[day_key]
-            daily_profit = float(day_info['daily_profit'])
-            cumulative_profit += day_info['daily_profit']
+        for bucket in analytics.iter_buckets(start_date, end_date, interval):
+            row = series.get(bucket)
+            profit = Decimal('0')
+            if row is not None:
+                profit = row['profit_loss'] or Decimal('0')
+                cumulative_profit = row['cumulative'] or Decimal('0')
+                total_bets += row['total_bets'] or 0
             
-            labels.append(day_info['label'])
-            daily_profits.append(daily_profit)
+            labels.append(bucket.strftime(label_format))
+            daily_profits.append(float(profit))
             cumulative_data.append(float(cumulative_profit))
         
         # Calcular estatísticas adicionais
-        total_bets = completed_bets.count()
-        days_with_bets = len([day for day in daily_data.values() if day['daily_profit'] != 0])
+        days_with_bets = len([profit for profit in daily_profits if profit != 0])
         best_day = max(daily_profits) if daily_profits else 0
         worst_day = min(daily_profits) if daily_profits else 0
         
-        print(f"DEBUG: Final data - {len(labels)} days, best day: {best_day}, worst day: {worst_day}")
-        
-        # Resposta JSON
         response_data = {
             'labels': labels,
             'daily_profit': daily_profits,
@@ -158,7 +333,8 @@ def profit_evolution_data(request):
             'period': {
                 'start': start_date.strftime('%d/%m/%Y'),
                 'end': end_date.strftime('%d/%m/%Y'),
-                'days': len(labels)
+                'days': (end_date - start_date).days + 1,
+                'interval': interval,
             },
             'stats': {
                 'total_bets': total_bets,
@@ -168,16 +344,12 @@ def profit_evolution_data(request):
                 'average_daily': float(cumulative_profit / len(labels)) if len(labels) > 0 else 0
             },
             'final_cumulative': float(cumulative_profit),
-            'debug': f'Successfully processed {total_bets} bets across {len(labels)} days'
+            'debug': f'Successfully processed {total_bets} bets across {len(labels)} periods'
         }
         
-        print("DEBUG: Returning JSON response")
         return JsonResponse(response_data)
         
     except Exception as e:
-        print(f"DEBUG: Exception occurred: {str(e)}")
-        import traceback
-        print(f"DEBUG: Traceback: {traceback.format_exc()}")
         return JsonResponse({
             'error': 'Erro ao processar dados',
             'message': str(e),
@@ -185,50 +357,52 @@ def profit_evolution_data(request):
         }, status=500)
 
 
+@query_budget(5)
+@cached_json_view('roi_by_sport')
 def roi_by_sport_data(request):
     """
-    Dados para gráfico de ROI por desporto
+    Dados para gráfico de ROI por desporto.
+    Aceita ?by=sport|competition|bookmaker|category|confidence_level e ?limit=N (máx. 100).
     """
-    print("=== DEBUG: roi_by_sport_data called ===")
+    by = request.GET.get('by', 'sport')
+    try:
+        limit = min(int(request.GET.get('limit', 10)), 100)
+        if by not in analytics.ROI_DIMENSIONS:
+            raise ValueError(f"by deve ser um de: {', '.join(analytics.ROI_DIMENSIONS)}")
+        if limit < 1:
+            raise ValueError('limit deve ser positivo')
+    except ValueError as e:
+        return JsonResponse({
+            'error': 'Parâmetros inválidos',
+            'message': str(e),
+        }, status=400)
     
     try:
-        sports_data = []
-        all_sports = Sport.objects.all()
-        print(f"DEBUG: Found {all_sports.count()} sports")
+        # Agrupamento, ROI, ordenação e limite feitos numa única consulta
+        segments = analytics.get_backend().segment_roi(by=by, limit=limit)
         
-        for sport in all_sports:
-            sport_bets = Bet.objects.filter(sport=sport).exclude(outcome='pending')
-            print(f"DEBUG: Sport {sport.name} has {sport_bets.count()} completed bets")
-            
-            if sport_bets.exists():
-                total_staked = sport_bets.aggregate(Sum('stake'))['stake__sum'] or Decimal('0')
-                total_profit = sport_bets.aggregate(Sum('profit_loss'))['profit_loss__sum'] or Decimal('0')
-                
-                if total_staked > 0:
-                    roi = (float(total_profit) / float(total_staked)) * 100
-                    
-                    sports_data.append({
-                        'sport': sport.name,
-                        'roi': round(roi, 2),
-                        'total_bets': sport_bets.count(),
-                        'profit': float(total_profit)
-                    })
-                    
-                    print(f"DEBUG: {sport.name} - ROI: {roi:.2f}%, Profit: {total_profit}")
-        
-        # Ordenar por ROI
-        sports_data.sort(key=lambda x: x['roi'], reverse=True)
-        print(f"DEBUG: Returning {len(sports_data)} sports with data")
+        response_data = {
+            'by': by,
+            'segments': segments,
+            'labels': [segment['label'] for segment in segments],
+            'roi_values': [segment['roi'] for segment in segments],
+            'debug': f'Processed {len(segments)} segments'
+        }
+        if by == 'sport':
+            # Formato original, mantido para compatibilidade
+            response_data['sports'] = [
+                {
+                    'sport': segment['label'],
+                    'roi': segment['roi'],
+                    'total_bets': segment['total_bets'],
+                    'profit': segment['profit'],
+                }
+                for segment in segments
+            ]
         
-        return JsonResponse({
-            'sports': sports_data[:10],  # Top 10 desportos
-            'labels': [sport['sport'] for sport in sports_data[:10]],
-            'roi_values': [sport['roi'] for sport in sports_data[:10]],
-            'debug': f'Processed {len(sports_data)} sports'
-        })
+        return JsonResponse(response_data)
         
     except Exception as e:
-        print(f"DEBUG: Exception in roi_by_sport_data: {str(e)}")
         return JsonResponse({
             'error': 'Erro ao processar dados de ROI',
             'message': str(e),
@@ -236,52 +410,91 @@ def roi_by_sport_data(request):
         }, status=500)
 
 
+# Limite de meses aceite pelo resumo mensal (10 anos)
+MAX_SUMMARY_MONTHS = 120
+
+
+def _parse_month(value):
+    """Aceita YYYY-MM ou YYYY-MM-DD e devolve o primeiro dia do mês"""
+    fmt = '%Y-%m-%d' if value.count('-') == 2 else '%Y-%m'
+    return datetime.strptime(value, fmt).date().replace(day=1)
+
+
+def _month_offset(month_start, offset):
+    """Primeiro dia do mês deslocado offset meses"""
+    index = month_start.year * 12 + month_start.month - 1 + offset
+    return month_start.replace(year=index // 12, month=index % 12 + 1)
+
+
+def _parse_month_range(request):
+    """
+    Lê ?months=N (últimos N meses, incluindo o atual) ou ?start=YYYY-MM&end=YYYY-MM.
+    Devolve (start_date, end_date) ou lança ValueError (ou OverflowError).
+    """
+    today = timezone.localdate()
+    months_param = request.GET.get('months')
+    start_param = request.GET.get('start')
+    end_param = request.GET.get('end')
+
+    if end_param:
+        end_month = _parse_month(end_param)
+    else:
+        end_month = today.replace(day=1)
+    # Último dia do mês final
+    end_date = _month_offset(end_month, 1) - timedelta(days=1)
+
+    if start_param:
+        start_date = _parse_month(start_param)
+    elif months_param:
+        months = int(months_param)
+        if months < 1:
+            raise ValueError('months deve ser positivo')
+        if months > MAX_SUMMARY_MONTHS:
+            raise ValueError(f'Intervalo máximo de {MAX_SUMMARY_MONTHS} meses')
+        start_date = _month_offset(end_month, -(months - 1))
+    else:
+        # Por defeito: últimos 6 meses
+        start_date = (today - timedelta(days=180)).replace(day=1)
+
+    if start_date > end_date:
+        raise ValueError('start deve ser anterior a end')
+    span = (end_date.year - start_date.year) * 12 + end_date.month - start_date.month + 1
+    if span > MAX_SUMMARY_MONTHS:
+        raise ValueError(f'Intervalo máximo de {MAX_SUMMARY_MONTHS} meses')
+    return start_date, end_date
+
+
+@query_budget(5)
+@cached_json_view('monthly_summary')
 def monthly_summary_data(request):
     """
-    Dados para gráfico de resumo mensal
+    Dados para gráfico de resumo mensal.
+    Por defeito os últimos 6 meses; aceita ?months=N ou ?start=YYYY-MM&end=YYYY-MM (até 10 anos).
     """
-    print("=== DEBUG: monthly_summary_data called ===")
+    try:
+        start_date, end_date = _parse_month_range(request)
+    except (ValueError, OverflowError) as e:
+        return JsonResponse({
+            'error': 'Parâmetros inválidos',
+            'message': str(e),
+        }, status=400)
     
     try:
-        # Últimos 6 meses
-        end_date = timezone.now().date()
-        start_date = end_date - timedelta(days=180)
-        
-        print(f"DEBUG: Monthly summary range: {start_date} to {end_date}")
-        
+        # Uma única consulta agrupada por mês, independentemente do número de meses
         monthly_stats = []
-        current_date = start_date.replace(day=1)
-        
-        while current_date <= end_date:
-            month_bets = Bet.objects.filter(
-                date__year=current_date.year,
-                date__month=current_date.month
-            ).exclude(outcome='pending')
-            
-            print(f"DEBUG: {current_date.strftime('%Y-%m')} has {month_bets.count()} bets")
-            
-            if month_bets.exists():
-                total_staked = month_bets.aggregate(Sum('stake'))['stake__sum'] or Decimal('0')
-                total_profit = month_bets.aggregate(Sum('profit_loss'))['profit_loss__sum'] or Decimal('0')
-                wins = month_bets.filter(outcome='win').count()
-                total_completed = month_bets.count()
-                win_rate = (wins / total_completed * 100) if total_completed > 0 else 0
-                
-                monthly_stats.append({
-                    'month': f"{calendar.month_name[current_date.month][:3]} {current_date.year}",
-                    'profit': float(total_profit),
-                    'staked': float(total_staked),
-                    'win_rate': round(win_rate, 2),
-                    'bets_count': total_completed
-                })
+        for row in analytics.get_backend().monthly_summary(start_date, end_date):
+            month = row['month']
+            total_completed = row['total_bets'] or 0
+            wins = row['wins'] or 0
+            win_rate = (wins / total_completed * 100) if total_completed > 0 else 0
             
-            # Próximo mês
-            if current_date.month == 12:
-                current_date = current_date.replace(year=current_date.year + 1, month=1)
-            else:
-                current_date = current_date.replace(month=current_date.month + 1)
-        
-        print(f"DEBUG: Generated {len(monthly_stats)} monthly stats")
+            monthly_stats.append({
+                'month': f"{calendar.month_name[month.month][:3]} {month.year}",
+                'profit': float(row['profit_loss'] or 0),
+                'staked': float(row['total_staked'] or 0),
+                'win_rate': round(win_rate, 2),
+                'bets_count': total_completed
+            })
         
         return JsonResponse({
             'monthly_data': monthly_stats,
@@ -289,11 +502,14 @@ def monthly_summary_data(request):
             'profits': [item['profit'] for item in monthly_stats],
             'staked': [item['staked'] for item in monthly_stats],
             'win_rates': [item['win_rate'] for item in monthly_stats],
+            'period': {
+                'start': start_date.strftime('%Y-%m'),
+                'end': end_date.strftime('%Y-%m'),
+            },
             'debug': f'Generated {len(monthly_stats)} months of data'
         })
         
     except Exception as e:
-        print(f"DEBUG: Exception in monthly_summary_data: {str(e)}")
         return JsonResponse({
             'error': 'Erro ao processar dados mensais',
             'message': str(e),
@@ -301,148 +517,350 @@ def monthly_summary_data(request):
         }, status=500)
 
 
-def dashboard_view(request):
-    """View para o dashboard principal de análise de apostas"""
-    
-    # Estatísticas gerais
-    all_bets = Bet.objects.all()
-    completed_bets = all_bets.exclude(outcome='pending')
-    
-    # Métricas principais
-    total_bets = all_bets.count()
-    total_staked = all_bets.aggregate(Sum('stake'))['stake__sum'] or Decimal('0')
-    total_profit_loss = completed_bets.aggregate(Sum('profit_loss'))['profit_loss__sum'] or Decimal('0')
-    
-    # Taxa de vitórias
-    if completed_bets.count() > 0:
-        wins = completed_bets.filter(outcome='win').count()
-        win_rate = round((wins / completed_bets.count()) * 100, 2)
-    else:
-        win_rate = 0
-    
-    # ROI geral
-    if total_staked > 0:
-        roi = round((float(total_profit_loss) / float(total_staked)) * 100, 2)
-    else:
-        roi = 0
-    
-    # Apostas pendentes
-    pending_bets = all_bets.filter(outcome='pending').count()
-    pending_stake = all_bets.filter(outcome='pending').aggregate(Sum('stake'))['stake__sum'] or Decimal('0')
-    
-    # Odds média
-    avg_odds = all_bets.aggregate(Avg('bookmaker_odds'))['bookmaker_odds__avg'] or 0
-    if avg_odds:
-        avg_odds = round(float(avg_odds), 2)
-    
-    # Valor esperado médio (apenas de apostas com dados completos)
-    bets_with_data = all_bets.filter(
-        estimated_probability__isnull=False,
-        bookmaker_odds__isnull=False,
-        stake__isnull=False
-    )
-    
-    total_ev = 0
-    ev_count = 0
-    for bet in bets_with_data:
-        if bet.expected_value is not None:
-            total_ev += bet.expected_value
-            ev_count += 1
-    
-    avg_expected_value = round(total_ev / ev_count, 2) if ev_count > 0 else 0
+# Limites do número de pontos devolvidos na curva da banca
+MIN_CURVE_POINTS = 10
+MAX_CURVE_POINTS = 5000
+
+
+@query_budget(3)
+@cached_json_view('bankroll')
+def bankroll_data(request):
+    """
+    Curva da banca, drawdown máximo e sequências de vitórias/derrotas de todo o histórico.
+    Aceita ?bankroll=<banca inicial> e ?points=N (pontos da curva, 10 a 5000; por defeito 500).
+    Fica em cache até à próxima escrita de apostas (por exemplo, uma liquidação).
+    """
+    try:
+        initial = float(request.GET.get('bankroll', 0))
+        points = int(request.GET.get('points', 500))
+        if not math.isfinite(initial):
+            raise ValueError('bankroll deve ser um número finito')
+        if initial < 0:
+            raise ValueError('bankroll não pode ser negativo')
+        if not MIN_CURVE_POINTS <= points <= MAX_CURVE_POINTS:
+            raise ValueError(f'points deve estar entre {MIN_CURVE_POINTS} e {MAX_CURVE_POINTS}')
+    except ValueError as e:
+        return JsonResponse({
+            'error': 'Parâmetros inválidos',
+            'message': str(e),
+        }, status=400)
     
-    # Estatísticas dos últimos 30 dias
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    recent_bets = all_bets.filter(date__gte=thirty_days_ago)
-    recent_completed = recent_bets.exclude(outcome='pending')
+    try:
+        # Uma única passagem, em streaming, pelas apostas liquidadas ordenadas por data
+        return JsonResponse(analytics.bankroll_history(initial=initial, max_points=points))
+        
+    except Exception as e:
+        return JsonResponse({
+            'error': 'Erro ao processar dados da banca',
+            'message': str(e),
+            'debug': 'Exception in bankroll_data'
+        }, status=500)
+
+
+# Larguras de balde aceites pelo relatório de calibração (dividem 100)
+CALIBRATION_BUCKET_WIDTHS = (1, 2, 4, 5, 10, 20, 25)
+
+
+@query_budget(2)
+@cached_json_view('calibration')
+def calibration_data(request):
+    """
+    Calibração das probabilidades estimadas: Brier score, log loss e curva de fiabilidade.
+    Aceita ?width=N (largura dos baldes em %, por defeito 5) e
+    ?by=sport|category|bookmaker|confidence_level para dividir por segmento.
+    """
+    by = request.GET.get('by') or None
+    try:
+        width = int(request.GET.get('width', 5))
+        if width not in CALIBRATION_BUCKET_WIDTHS:
+            raise ValueError(f"width deve ser um de: {', '.join(map(str, CALIBRATION_BUCKET_WIDTHS))}")
+        if by is not None and by not in analytics.CALIBRATION_DIMENSIONS:
+            raise ValueError(f"by deve ser um de: {', '.join(analytics.CALIBRATION_DIMENSIONS)}")
+    except ValueError as e:
+        return JsonResponse({
+            'error': 'Parâmetros inválidos',
+            'message': str(e),
+        }, status=400)
     
-    recent_profit_loss = recent_completed.aggregate(Sum('profit_loss'))['profit_loss__sum'] or Decimal('0')
-    recent_staked = recent_bets.aggregate(Sum('stake'))['stake__sum'] or Decimal('0')
+    try:
+        # Agrupamento em baldes e agregação feitos numa única consulta
+        return JsonResponse(analytics.calibration_report(by=by, bucket_width=width))
+        
+    except Exception as e:
+        return JsonResponse({
+            'error': 'Erro ao processar dados de calibração',
+            'message': str(e),
+            'debug': 'Exception in calibration_data'
+        }, status=500)
+
+
+@query_budget(2)
+@cached_json_view('clv')
+def clv_data(request):
+    """
+    Closing line value agregado: CLV médio e percentagem de apostas que bateram a linha de fecho.
+    Aceita os mesmos filtros da exportação: ?start, ?end, ?sport, ?bookmaker e ?outcome.
+    """
+    try:
+        queryset = export_queryset(
+            start=request.GET.get('start'),
+            end=request.GET.get('end'),
+            sport=request.GET.get('sport'),
+            bookmaker=request.GET.get('bookmaker'),
+            outcome=request.GET.get('outcome'),
+        )
+    except ValueError as e:
+        return JsonResponse({
+            'error': 'Parâmetros inválidos',
+            'message': str(e),
+        }, status=400)
     
-    # Tendência (comparação com 30 dias anteriores)
-    sixty_days_ago = timezone.now() - timedelta(days=60)
-    previous_period = all_bets.filter(
-        date__gte=sixty_days_ago, 
-        date__lt=thirty_days_ago
-    ).exclude(outcome='pending')
+    try:
+        return JsonResponse(odds.clv_summary(queryset))
+        
+    except Exception as e:
+        return JsonResponse({
+            'error': 'Erro ao processar dados de CLV',
+            'message': str(e),
+            'debug': 'Exception in clv_data'
+        }, status=500)
+
+
+def _id_list(request, name):
+    """Ids inteiros de um parâmetro GET repetido ou separado por vírgulas"""
+    return [int(item) for value in request.GET.getlist(name) for item in value.split(',') if item.strip()]
+
+
+@query_budget(7)
+@cached_json_view('exposure')
+def exposure_data(request):
+    """
+    Exposição das apostas pendentes, lida do livro BetExposure.
+    Sem parâmetros devolve a exposição por jogo, equipa, competição e casa de apostas (?limit=N, 10 por omissão).
+    Com ?team=, ?match=<casa>-<fora>, ?competition= e/ou ?bookmaker= (ids, repetíveis) devolve a perda
+    máxima se todas as apostas ligadas a qualquer um deles perderem, numa única consulta.
+    """
+    try:
+        teams = _id_list(request, 'team')
+        competitions = _id_list(request, 'competition')
+        bookmakers = _id_list(request, 'bookmaker')
+        matches = []
+        for value in request.GET.getlist('match'):
+            home_team, separator, away_team = value.partition('-')
+            if not separator:
+                raise ValueError('match deve ter o formato <casa>-<fora>')
+            matches.append((int(home_team), int(away_team)))
+        limit = int(request.GET.get('limit', 10))
+        if limit < 1:
+            raise ValueError('limit deve ser positivo')
+    except ValueError as e:
+        return JsonResponse({
+            'error': 'Parâmetros inválidos',
+            'message': str(e),
+        }, status=400)
     
-    previous_profit_loss = previous_period.aggregate(Sum('profit_loss'))['profit_loss__sum'] or Decimal('0')
+    try:
+        if teams or matches or competitions or bookmakers:
+            return JsonResponse(exposure.worst_case_loss(teams, matches, competitions, bookmakers))
+        return JsonResponse(exposure.exposure_summary(limit))
+        
+    except Exception as e:
+        return JsonResponse({
+            'error': 'Erro ao calcular a exposição',
+            'message': str(e),
+            'debug': 'Exception in exposure_data'
+        }, status=500)
+
+
+# Limite de caminhos por pedido de simulação
+MAX_SIMULATION_PATHS = 200000
+
+
+@query_budget(2)
+@cached_json_view('simulation')
+def simulation_data(request):
+    """
+    Simulação Monte Carlo da banca a partir das probabilidades estimadas.
+    Aceita ?source=pending|history, ?paths=N (máx. 200000), ?seed=N e ?bankroll=<banca inicial>.
+    O resultado depende apenas da semente, por isso fica em cache até à próxima escrita.
+    """
+    try:
+        source = request.GET.get('source', 'pending')
+        paths = int(request.GET.get('paths', 10000))
+        seed = int(request.GET.get('seed', 0))
+        bankroll = float(request.GET['bankroll']) if request.GET.get('bankroll') else None
+        if source not in simulation.SOURCES:
+            raise ValueError(f"source deve ser um de: {', '.join(simulation.SOURCES)}")
+        if not 1 <= paths <= MAX_SIMULATION_PATHS:
+            raise ValueError(f'paths deve estar entre 1 e {MAX_SIMULATION_PATHS}')
+        if seed < 0:
+            raise ValueError('seed não pode ser negativa')
+        if bankroll is not None and not math.isfinite(bankroll):
+            raise ValueError('bankroll deve ser um número finito')
+        if bankroll is not None and bankroll <= 0:
+            raise ValueError('bankroll deve ser positivo')
+    except ValueError as e:
+        return JsonResponse({
+            'error': 'Parâmetros inválidos',
+            'message': str(e),
+        }, status=400)
     
-    # Calcular tendência de lucro
-    if previous_profit_loss != 0:
-        profit_trend = round(((float(recent_profit_loss) - float(previous_profit_loss)) / float(abs(previous_profit_loss))) * 100, 2)
-    elif recent_profit_loss > 0:
-        profit_trend = 100  # 100% de melhoria se antes era 0 e agora é positivo
-    else:
-        profit_trend = 0
+    try:
+        # Simulação vetorizada, repartida por um conjunto de processos
+        probabilities, odds, stakes = simulation.load_selections(source)
+        result = simulation.simulate(probabilities, odds, stakes, paths=paths, seed=seed, bankroll=bankroll)
+        result['source'] = source
+        return JsonResponse(result)
+        
+    except Exception as e:
+        return JsonResponse({
+            'error': 'Erro ao simular a banca',
+            'message': str(e),
+            'debug': 'Exception in simulation_data'
+        }, status=500)
+
+
+# Limite de configurações por pedido de backtest
+MAX_BACKTEST_CONFIGS = 500
+
+
+def _float_list(request, name, default):
+    """Lista de números separados por vírgulas de um parâmetro GET"""
+    value = request.GET.get(name)
+    if not value:
+        return default
+    return [float(item) for item in value.split(',') if item.strip()]
+
+
+@query_budget(2)
+@cached_json_view('backtest')
+def backtest_data(request):
+    """
+    Backtest das estratégias de staking sobre o histórico de apostas fechadas.
+    Aceita listas separadas por vírgulas: ?strategy=flat,kelly,confidence, ?kelly_fraction=0.25,0.5,1,
+    ?unit=0.01 (fração da banca inicial por aposta) e ?max_stake=0.05 (fração da banca atual; "none" sem
+    limite), além de ?bankroll=<banca inicial>. Cada combinação é uma configuração (máx. 500).
+    """
+    try:
+        strategies = [item for item in request.GET.get('strategy', '').split(',') if item] or backtest.STRATEGIES
+        max_stakes = [
+            None if item.strip().lower() == 'none' else float(item)
+            for item in request.GET.get('max_stake', 'none').split(',') if item.strip()
+        ]
+        bankroll = float(request.GET.get('bankroll', 1000))
+        if not math.isfinite(bankroll):
+            raise ValueError('bankroll deve ser um número finito')
+        if bankroll <= 0:
+            raise ValueError('bankroll deve ser positivo')
+        configs = backtest.expand_grid(
+            strategies,
+            kelly_fractions=_float_list(request, 'kelly_fraction', [1.0]),
+            units=_float_list(request, 'unit', [0.01]),
+            max_stakes=max_stakes or [None],
+        )
+        if len(configs) > MAX_BACKTEST_CONFIGS:
+            raise ValueError(f'No máximo {MAX_BACKTEST_CONFIGS} configurações por pedido')
+    except ValueError as e:
+        return JsonResponse({
+            'error': 'Parâmetros inválidos',
+            'message': str(e),
+        }, status=400)
     
-    # Estatísticas por desporto
-    sports_stats = []
-    for sport in Sport.objects.all():
-        sport_bets = completed_bets.filter(sport=sport)
-        if sport_bets.exists():
-            sport_profit = sport_bets.aggregate(Sum('profit_loss'))['profit_loss__sum'] or Decimal('0')
-            sport_wins = sport_bets.filter(outcome='win').count()
-            sport_total = sport_bets.count()
-            sport_win_rate = round((sport_wins / sport_total) * 100, 2) if sport_total > 0 else 0
-            
-            sports_stats.append({
-                'sport': sport,
-                'total_bets': sport_total,
-                'profit_loss': sport_profit,
-                'win_rate': sport_win_rate
-            })
+    try:
+        # Uma consulta para o histórico; as configurações são repartidas por um conjunto de processos
+        result = backtest.backtest(backtest.load_history(), configs, bankroll=bankroll)
+        return JsonResponse(result)
+        
+    except Exception as e:
+        return JsonResponse({
+            'error': 'Erro ao executar o backtest',
+            'message': str(e),
+            'debug': 'Exception in backtest_data'
+        }, status=500)
+
+
+def _build_dashboard_payload():
+    """Dados agregados do dashboard (cacheáveis)"""
+    metrics = analytics.get_backend().dashboard_metrics()
     
     # Últimas apostas (últimas 10)
-    latest_bets = all_bets.order_by('-date', '-created_at')[:10]
-    
-    # Top bookmakers por volume
-    bookmaker_stats = []
-    for bookmaker in Bookmaker.objects.all():
-        bm_bets = completed_bets.filter(bookmaker=bookmaker)
-        if bm_bets.exists():
-            bm_profit = bm_bets.aggregate(Sum('profit_loss'))['profit_loss__sum'] or Decimal('0')
-            bm_total = bm_bets.count()
-            bm_staked = all_bets.filter(bookmaker=bookmaker).aggregate(Sum('stake'))['stake__sum'] or Decimal('0')
-            
-            bookmaker_stats.append({
-                'bookmaker': bookmaker,
-                'total_bets': bm_total,
-                'total_staked': bm_staked,
-                'profit_loss': bm_profit
-            })
+    metrics['latest_bets'] = list(
+        Bet.objects.select_related(
+            'sport', 'competition', 'home_team', 'away_team', 'bet_type'
+        ).order_by('-date', '-created_at')[:10]
+    )
+    return metrics
+
+
+@query_budget(10)
+def dashboard_view(request):
+    """View para o dashboard principal de análise de apostas"""
     
-    # Ordenar por volume apostado
-    bookmaker_stats.sort(key=lambda x: x['total_staked'], reverse=True)
+    # Métricas agregadas e últimas apostas ficam em cache até à próxima escrita
+    metrics = get_or_build('dashboard', _build_dashboard_payload)
+    latest_bets = metrics['latest_bets']
     
     context = {
         # Métricas principais
-        'total_bets': total_bets,
-        'total_staked': total_staked,
-        'total_profit_loss': total_profit_loss,
-        'win_rate': win_rate,
-        'roi': roi,
-        'pending_bets': pending_bets,
-        'pending_stake': pending_stake,
-        'avg_odds': avg_odds,
-        'avg_expected_value': avg_expected_value,
+        'total_bets': metrics['total_bets'],
+        'total_staked': metrics['total_staked'],
+        'total_profit_loss': metrics['total_profit_loss'],
+        'win_rate': metrics['win_rate'],
+        'roi': metrics['roi'],
+        'pending_bets': metrics['pending_bets'],
+        'pending_stake': metrics['pending_stake'],
+        'avg_odds': metrics['avg_odds'],
+        'avg_expected_value': metrics['avg_expected_value'],
         
         # Estatísticas recentes
-        'recent_profit_loss': recent_profit_loss,
-        'recent_staked': recent_staked,
-        'profit_trend': profit_trend,
+        'recent_profit_loss': metrics['recent_profit_loss'],
+        'recent_staked': metrics['recent_staked'],
+        'profit_trend': metrics['profit_trend'],
         
         # Listas
-        'sports_stats': sports_stats[:5],  # Top 5 desportos
+        'sports_stats': metrics['sports_stats'],  # Top 5 desportos
         'latest_bets': latest_bets,
-        'bookmaker_stats': bookmaker_stats[:5],  # Top 5 bookmakers
+        'bookmaker_stats': metrics['bookmaker_stats'],  # Top 5 bookmakers
         
         # Status de tendência
-        'profit_trend_positive': profit_trend > 0,
-        'roi_positive': roi > 0,
-        'ev_positive': avg_expected_value > 0,
+        'profit_trend_positive': metrics['profit_trend'] > 0,
+        'roi_positive': metrics['roi'] > 0,
+        'ev_positive': metrics['avg_expected_value'] > 0,
     }
     
     return render(request, 'bets/dashboard.html', context)
 
 
+@query_budget(1)
+def cache_stats_view(request):
+    """Contadores de hits/misses da cache de analytics"""
+    return JsonResponse(cache_stats())
+
+
+@query_budget(5)
+def export_bets_view(request):
+    """
+    Exporta as apostas em CSV ou NDJSON, em streaming (memória constante).
+    Aceita ?format=csv|ndjson, ?start=YYYY-MM-DD, ?end=YYYY-MM-DD, ?sport=, ?bookmaker= e ?outcome=.
+    """
+    fmt = request.GET.get('format', 'csv')
+    try:
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"format deve ser um de: {', '.join(EXPORT_FORMATS)}")
+        queryset = export_queryset(
+            start=request.GET.get('start'),
+            end=request.GET.get('end'),
+            sport=request.GET.get('sport'),
+            bookmaker=request.GET.get('bookmaker'),
+            outcome=request.GET.get('outcome'),
+        )
+    except ValueError as e:
+        return JsonResponse({
+            'error': 'Parâmetros inválidos',
+            'message': str(e),
+        }, status=400)
+
+    response = StreamingHttpResponse(iter_export(queryset, fmt), content_type=EXPORT_FORMATS[fmt])
+    filename = f"bets-{timezone.localdate():%Y%m%d}.{fmt}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -1,4 +1,5 @@
 import os
+import sys
 from pathlib import Path
 from decouple import config
 
@@ -15,6 +16,9 @@ SECRET_KEY = "django-insecure-qwi3yc*n+&=+z!ww8_=++yyfb&w)7y$$-hpdtps-fyv=p(schz
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+# Running under manage.py test
+TESTING = sys.argv[1:2] == ['test']
+
 ALLOWED_HOSTS = ['localhost', '127.0.0.1']
 
 
@@ -33,6 +37,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its query count and timings cover the whole middleware stack
+    "bets.instrumentation.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -79,6 +85,61 @@ DATABASES = {
 }
 
 
+# Cache
+# The analytics cache (bets/cache.py) is keyed by a bets version stored in the
+# database, so writes from any process invalidate it and the in-process locmem
+# backend stays correct with several workers. A shared backend (Redis/Memcached)
+# lets the workers also share the cached payloads.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sportbets',
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
+    }
+}
+
+# Seconds a cached analytics payload is kept (it is also dropped on any bet write)
+BETS_CACHE_TIMEOUT = 60 * 60
+
+# Bets admin summary: above this planner row estimate (PostgreSQL only), aggregate a
+# BETS_SUMMARY_SAMPLE_PERCENT % block sample of the table instead. None = always exact.
+BETS_SUMMARY_APPROXIMATE_ABOVE = None
+BETS_SUMMARY_SAMPLE_PERCENT = 1
+
+# Dashboard and chart analytics: 'orm' (SQL over the daily rollups) or 'columnar'
+# (NumPy over an in-memory snapshot of the Bet table, see bets.columnar)
+BETS_ANALYTICS_BACKEND = 'orm'
+
+# Worker processes for Monte Carlo simulations and backtests (None = one per CPU)
+BETS_PARALLEL_WORKERS = None
+
+# Per-request Server-Timing header and 'bets.performance' log line (bets.instrumentation)
+BETS_SERVER_TIMING = True
+# Raise instead of logging a warning when a view exceeds its @query_budget (tests turn it on)
+BETS_QUERY_BUDGET_STRICT = False
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        # One JSON line per request at INFO and query budget overruns as warnings;
+        # the test client makes thousands of requests, so tests only show the warnings
+        'bets.performance': {
+            'handlers': ['console'],
+            'level': 'WARNING' if TESTING else 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 